@@ -1,4 +1,4 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, abort, send_file, session, make_response
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, abort, send_file, session, make_response, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_bcrypt import Bcrypt
@@ -7,9 +7,12 @@ from flask_wtf.csrf import CSRFProtect
 from flask_compress import Compress
 from flask_caching import Cache
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 from datetime import datetime, timedelta
 from itsdangerous import URLSafeTimedSerializer
+from markupsafe import Markup
 import os
+import re
 from functools import wraps
 
 # Configuration de l'application
@@ -19,13 +22,69 @@ app = Flask(__name__)
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 app.config['SECRET_KEY'] = 'quartier-daromes-secret-key-2024'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'database', 'quartier.db')
+# Base de données: SQLite par défaut, PostgreSQL via DATABASE_URL (postgresql://utilisateur:mdp@hôte/base)
+database_url = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(basedir, 'database', 'quartier.db')
+if database_url.startswith('postgres://'):  # Ancien préfixe de certains hébergeurs
+    database_url = 'postgresql://' + database_url[len('postgres://'):]
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Pool de connexions du moteur principal (valeurs par défaut de toutes les connexions)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # secondes (coupures côté serveur)
+    'pool_pre_ping': not database_url.startswith('sqlite')
+}
+
+# Connexions en lecture seule avec leur propre pool: les lectures du catalogue, de la
+# recherche et du blog n'attendent pas les écritures (panier, commandes, admin) qui
+# passent par le moteur principal. SQLite: même fichier ouvert en mode=ro (+ PRAGMA
+# query_only). PostgreSQL: réplique indiquée par DATABASE_READER_URL (sinon tout
+# passe par le moteur principal).
+reader_url = os.environ.get('DATABASE_READER_URL')
+if not reader_url and database_url.startswith('sqlite'):
+    from sqlalchemy.engine import make_url
+    sqlite_path = make_url(database_url).database
+    if sqlite_path and sqlite_path != ':memory:':
+        reader_url = 'sqlite:///file:' + sqlite_path + '?mode=ro&uri=true'
+app.config['SQLALCHEMY_BINDS'] = {}
+if reader_url:
+    app.config['SQLALCHEMY_BINDS']['reader'] = {
+        'url': reader_url,
+        'pool_size': int(os.environ.get('DB_READER_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_READER_MAX_OVERFLOW', 5)),
+        'pool_timeout': 10
+    }
 app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'static', 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Coût bcrypt (2^rounds itérations): les hachages existants sont mis à jour à la connexion
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+
+# Cache disque des images redimensionnées à la demande (/img/...)
+app.config['IMAGE_CACHE_FOLDER'] = os.path.join(basedir, 'cache', 'images')
+app.config['IMAGE_CACHE_MAX_BYTES'] = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 500 * 1024 * 1024))  # 500MB
+# Taille du cache suivie en mémoire, recomptée sur disque au plus toutes les N secondes (écritures des autres workers)
+app.config['IMAGE_CACHE_RESCAN_INTERVAL'] = int(os.environ.get('IMAGE_CACHE_RESCAN_INTERVAL', 300))
+
+# Sitemap généré depuis la base (/sitemap.xml), fichiers mis en cache sur disque
+app.config['SITEMAP_FOLDER'] = os.path.join(basedir, 'cache', 'sitemap')
+app.config['SITEMAP_BASE_URL'] = os.environ.get('SITEMAP_BASE_URL', 'https://quartierdaromes.com')
+
 # Configuration Flask-Caching
-app.config['CACHE_TYPE'] = 'SimpleCache'  # En production: 'RedisCache'
+# Cache partagé entre processus (workers gunicorn, applications client et admin):
+# versions du panier, de l'index des codes promo et des déclinaisons d'images y sont
+# invalidées par un processus et lues par les autres. SimpleCache (mémoire d'un seul
+# processus) ne convient qu'au serveur de développement avec une seule application.
+if os.environ.get('CACHE_REDIS_URL'):
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = os.environ['CACHE_REDIS_URL']
+else:
+    app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'FileSystemCache')
+    app.config['CACHE_DIR'] = os.environ.get('CACHE_DIR', os.path.join(basedir, 'cache', 'flask'))
+    app.config['CACHE_THRESHOLD'] = 10000  # entrées avant élagage (FileSystemCache)
 app.config['CACHE_DEFAULT_TIMEOUT'] = 300  # 5 minutes
 app.config['CACHE_KEY_PREFIX'] = 'quartier_'
 
@@ -43,17 +102,139 @@ os.makedirs(os.path.join(basedir, 'static', 'uploads'), exist_ok=True)
 os.makedirs(os.path.join(basedir, 'static', 'css'), exist_ok=True)
 os.makedirs(os.path.join(basedir, 'static', 'js'), exist_ok=True)
 os.makedirs(os.path.join(basedir, 'static', 'images'), exist_ok=True)
+os.makedirs(app.config['IMAGE_CACHE_FOLDER'], exist_ok=True)
+os.makedirs(app.config['SITEMAP_FOLDER'], exist_ok=True)
 
 # Import des modèles et initialisation de db
-from models import db, User, Product, Order, OrderItem, Category, Message, CartItem, WishlistItem, BlogPost, LoyaltyPoints, LoyaltyTransaction, LoyaltyReward, Review, Notification, LoginAttempt
+from models import db, User, Product, Order, OrderItem, Category, Message, CartItem, WishlistItem, BlogPost, LoyaltyPoints, LoyaltyTransaction, LoyaltyReward, Review, Notification, LoginAttempt, LoginAttemptDaily
 
 # Initialiser db avec l'application
 db.init_app(app)
 
+# Routes GET dont les requêtes SELECT passent par le moteur en lecture seule
+app.config['DB_READER_ENDPOINTS'] = {
+    'index', 'collections', 'product_detail', 'decants', 'compare_products',
+    'blog', 'blog_post', 'search_products', 'search_suggestions', 'quick_search',
+    'sitemap_index', 'sitemap_file'
+}
+
+def set_writer_pragmas(dbapi_connection, connection_record):
+    """SQLite: journal WAL, les lectures (moteur de lecture) ne bloquent plus les écritures, et inversement"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode = WAL')
+    cursor.execute('PRAGMA busy_timeout = 5000')
+    cursor.close()
+
+def set_reader_pragmas(dbapi_connection, connection_record):
+    """Filet de sécurité: le moteur de lecture refuse toute écriture"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA query_only = ON')
+    cursor.close()
+
+def set_reader_read_only(dbapi_connection, connection_record):
+    """Filet de sécurité PostgreSQL: transactions en lecture seule sur la réplique"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY')
+    cursor.close()
+    dbapi_connection.commit()
+
+with app.app_context():
+    from sqlalchemy import event
+    if db.engines[None].dialect.name == 'sqlite':
+        event.listen(db.engines[None], 'connect', set_writer_pragmas)
+    if 'reader' in db.engines:
+        reader_engine = db.engines['reader']
+        event.listen(reader_engine, 'connect', set_reader_pragmas if reader_engine.dialect.name == 'sqlite' else set_reader_read_only)
+
+@app.before_request
+def route_reads_to_reader():
+    """Activer le moteur de lecture pour les routes catalogue en GET (voir RoutingSession)"""
+    g.db_reader = request.method in ('GET', 'HEAD') and request.endpoint in app.config['DB_READER_ENDPOINTS']
+
+# ========== COMPATIBILITÉ SQLITE / POSTGRESQL ==========
+# La recherche, les tris et l'upsert du panier passent par ces fonctions pour donner
+# le même résultat sur les deux moteurs. Recherche: plein texte FTS5 sur SQLite
+# (table products_fts, voir migrate_search_fts.py), tsvector sur PostgreSQL (index
+# GIN déclarés dans models.py), LIKE tant qu'aucun index plein texte n'existe.
+from models import PRODUCT_SEARCH_COLUMNS, product_search_document
+
+search_backends = {}  # URL du moteur -> ('fts5', 'tsvector' ou 'like', date de vérification)
+# LIKE est revérifié régulièrement: migrate_search_fts.py lancé serveur démarré est
+# pris en compte sans redémarrer les workers
+app.config['SEARCH_BACKEND_RECHECK'] = 60  # secondes
+
+def search_backend():
+    """Méthode de recherche du moteur principal (vérifiée une fois par processus, LIKE revérifié)"""
+    from sqlalchemy import text
+    engine = db.engine
+    key = str(engine.url)
+    backend, checked_at = search_backends.get(key, (None, None))
+    if backend is None or (backend == 'like' and time.monotonic() - checked_at > app.config['SEARCH_BACKEND_RECHECK']):
+        if engine.dialect.name == 'postgresql':
+            backend = 'tsvector'
+        elif engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                has_fts = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")).first()
+            backend = 'fts5' if has_fts else 'like'
+        else:
+            backend = 'like'
+        search_backends[key] = (backend, time.monotonic())
+    return backend
+
+def search_words(query):
+    """Mots recherchés (lettres et chiffres uniquement: rien ne passe dans la syntaxe FTS / tsquery)"""
+    return re.findall(r'\w+', query.lower())[:8]
+
+def product_search_filter(query, columns=PRODUCT_SEARCH_COLUMNS):
+    """
+    Critère "le produit correspond à la recherche" sur les colonnes données
+    
+    Plein texte: chaque mot doit commencer un mot du produit ("dio sau" trouve
+    "Dior Sauvage"). Sans index plein texte: sous-chaîne insensible à la casse.
+    """
+    from sqlalchemy import func, or_, text, column
+    words = search_words(query)
+    backend = search_backend()
+    
+    if words and backend == 'fts5':
+        match = '{' + ' '.join(columns) + '} : (' + ' AND '.join(f'"{word}"*' for word in words) + ')'
+        matching_ids = text('SELECT rowid FROM products_fts WHERE products_fts MATCH :search_match')
+        return Product.id.in_(matching_ids.bindparams(search_match=match).columns(column('rowid')))
+    
+    if words and backend == 'tsvector':
+        tsquery = func.to_tsquery(text("'simple'"), ' & '.join(f'{word}:*' for word in words))
+        return product_search_document(columns).bool_op('@@')(tsquery)
+    
+    search_term = f"%{query}%"
+    return or_(*(getattr(Product, name).ilike(search_term) for name in columns))
+
+def order_nulls_last(expression, descending=True):
+    """
+    Tri avec les NULL en dernier sur tous les moteurs (PostgreSQL les place en tête
+    d'un tri décroissant, SQLite en fin): (expression IS NULL, expression)
+    """
+    return (expression.is_(None), expression.desc() if descending else expression.asc())
+
+def dialect_insert(table):
+    """INSERT ... ON CONFLICT du moteur principal (même API sur SQLite et PostgreSQL)"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
 # Initialisation des autres extensions
 bcrypt = Bcrypt(app)
 mail = Mail(app)
 csrf = CSRFProtect(app)
+# Compression dynamique: seulement au-delà d'1 Ko, niveaux rapides (le HTML change à chaque requête).
+# Les réponses en streaming et les fichiers statiques précompressés ne passent pas par Flask-Compress.
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 5
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_STREAMS'] = False
+app.config['STATIC_PRECOMPRESSED'] = True
 compress = Compress(app)
 cache = Cache(app)
 
@@ -63,22 +244,98 @@ login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Veuillez vous connecter pour accéder à cette page.'
 
+# Cache des utilisateurs (évite un SELECT users à chaque requête authentifiée)
+from collections import OrderedDict
+from sqlalchemy.orm import make_transient_to_detached
+import threading
+import time
+
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))  # secondes
+app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+
+# Les colonnes restent dans la mémoire du processus; la version de chaque utilisateur
+# est dans le cache partagé: une modification faite par un autre worker ou par
+# l'application admin invalide la copie de tous les processus.
+user_cache = OrderedDict()  # (user_id, version) -> (expiration, colonnes)
+user_cache_lock = threading.Lock()
+
+def user_version(user_id):
+    """Version courante d'un utilisateur (jeton partagé changé à chaque modification du compte)"""
+    key = f'user_version_{user_id}'
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, timeout=0)
+    return version
+
+def invalidate_user_cache(user_id):
+    """Invalider l'utilisateur en cache (tous les processus) après une modification de son compte"""
+    cache.set(f'user_version_{user_id}', time.time_ns(), timeout=0)
+
+def cache_user(user, version):
+    """Mémoriser les colonnes d'un utilisateur (jamais l'instance liée à la session)"""
+    columns = {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+    # Une invalidation pendant la lecture a changé la version: ne pas stocker
+    if user_version(user.id) != version:
+        return
+    with user_cache_lock:
+        user_cache[(user.id, version)] = (time.monotonic() + app.config['USER_CACHE_TTL'], columns)
+        user_cache.move_to_end((user.id, version))
+        while len(user_cache) > app.config['USER_CACHE_SIZE']:
+            user_cache.popitem(last=False)
+
 # Configuration du login manager
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    version = user_version(user_id)
+    with user_cache_lock:
+        entry = user_cache.get((user_id, version))
+        if entry and entry[0] > time.monotonic():
+            user_cache.move_to_end((user_id, version))
+            columns = entry[1]
+        else:
+            columns = None
+    
+    if columns is None:
+        user = User.query.get(user_id)
+        if user:
+            cache_user(user, version)
+        return user
+    
+    # Rattacher une copie à la session sans SELECT: les relations paresseuses
+    # (orders...) restent chargeables depuis les templates
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
 
 # Context processor pour injecter datetime dans les templates
 @app.context_processor
 def inject_now():
     return {'now': datetime.now()}
 
+# Compteur du panier DB conservé en session pour éviter un COUNT à chaque rendu
+def adjust_cart_count(delta):
+    """Mettre à jour le compteur en session (ignoré s'il n'est pas encore connu)"""
+    if session.get('cart_count') is not None:
+        session['cart_count'] = max(0, session['cart_count'] + delta)
+
+def reset_cart_count(count=None):
+    """Fixer le compteur, ou l'effacer pour forcer un recomptage au prochain rendu"""
+    if count is None:
+        session.pop('cart_count', None)
+    else:
+        session['cart_count'] = count
+
 # Context processor pour injecter le compteur du panier
 @app.context_processor
 def inject_cart_count():
     if current_user.is_authenticated:
-        # Compter les articles dans le panier DB
-        cart_count = CartItem.query.filter_by(user_id=current_user.id).count()
+        # Compteur en session, COUNT en base uniquement s'il est absent
+        cart_count = session.get('cart_count')
+        if cart_count is None:
+            cart_count = CartItem.query.filter_by(user_id=current_user.id).count()
+            session['cart_count'] = cart_count
     else:
         # Compter les articles dans le panier session
         cart = session.get('cart', {})
@@ -102,8 +359,136 @@ def admin_required(f):
     return decorated_function
 
 # ========== SYSTÈME DE NOTIFICATIONS ==========
+# Diffusion temps réel (SSE): pub/sub en mémoire dans le processus, suivi de la
+# séquence notifications.id pour recevoir celles créées par un autre processus, et
+# version partagée (cache) des lectures pour y recevoir les "marquer comme lu"
+import json
+import queue
+from collections import deque
+
+app.config['NOTIFICATION_TAIL_INTERVAL'] = 0.5  # secondes entre deux lectures de la séquence
+app.config['NOTIFICATION_HEARTBEAT'] = 15  # secondes (garde la connexion SSE ouverte)
+app.config['NOTIFICATION_RESYNC_INTERVAL'] = 60  # secondes: état complet renvoyé (écritures hors application)
+# Un flux occupe un thread du worker tant que la page est ouverte: au-delà, le
+# navigateur se rabat sur l'interrogation périodique (défaut: la moitié des threads)
+app.config['NOTIFICATION_MAX_STREAMS'] = int(os.environ.get(
+    'NOTIFICATION_MAX_STREAMS', max(1, int(os.environ.get('WEB_THREADS', 8)) // 2)
+))
+
+def notification_payload(notification):
+    """Représentation JSON d'une notification (API et flux SSE)"""
+    return {
+        'id': notification.id,
+        'type': notification.type,
+        'title': notification.title,
+        'message': notification.message,
+        'link': notification.link,
+        'icon': notification.icon,
+        'color': notification.color,
+        'created_at': notification.created_at.strftime('%d/%m/%Y %H:%M')
+    }
+
+def notification_snapshot():
+    """État complet du badge: nombre de non lues, 10 dernières et dernier id de la séquence"""
+    unread = Notification.query.filter_by(is_read=False).order_by(Notification.created_at.desc()).limit(10).all()
+    return {
+        'count': Notification.query.filter_by(is_read=False).count(),
+        'notifications': [notification_payload(n) for n in unread],
+        'last_id': db.session.query(db.func.max(Notification.id)).scalar() or 0
+    }
+
+def notifications_read_version():
+    """Version partagée des lectures (changée à chaque "marquer comme lu", tous processus)"""
+    return cache.get('notifications_read_version')
+
+def bump_notifications_read_version():
+    cache.set('notifications_read_version', time.time_ns(), timeout=0)
+
+class StreamLimitReached(Exception):
+    """Trop de flux SSE ouverts dans ce processus"""
+
+class NotificationBroker:
+    """Pub/sub en mémoire: une file par connexion SSE"""
+    
+    def __init__(self):
+        self.subscribers = set()
+        self.recent_ids = deque(maxlen=1000)  # Évite les doublons publication directe / suivi de séquence
+        self.lock = threading.Lock()
+        self.tail_thread = None
+        self.last_id = None
+        self.read_version = None
+        self.synced_at = 0
+    
+    def subscribe(self, max_streams=None):
+        """
+        Nouvelle file d'événements (à appeler avant de lire l'état initial: rien ne
+        se perd entre les deux). Le suivi part de la séquence actuelle.
+        """
+        subscriber = queue.Queue(maxsize=100)
+        with self.lock:
+            if max_streams and len(self.subscribers) >= max_streams:
+                raise StreamLimitReached()
+            if self.last_id is None:
+                self.last_id = db.session.query(db.func.max(Notification.id)).scalar() or 0
+                self.read_version = notifications_read_version()
+                self.synced_at = time.monotonic()
+            self.subscribers.add(subscriber)
+            if self.tail_thread is None:
+                self.tail_thread = threading.Thread(target=self.tail, daemon=True)
+                self.tail_thread.start()
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+    
+    def publish(self, event, data):
+        with self.lock:
+            if event == 'notification':
+                if data['id'] in self.recent_ids:
+                    return
+                self.recent_ids.append(data['id'])
+            subscribers = list(self.subscribers)
+        
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                pass  # Client trop lent: il rattrapera au prochain chargement de page
+    
+    def poll(self):
+        """
+        Un tour de suivi: nouvelles lignes de la séquence, puis état complet si un
+        autre processus a marqué des notifications comme lues (ou périodiquement)
+        """
+        with app.app_context():
+            notifications = Notification.query.filter(Notification.id > self.last_id).order_by(Notification.id).all()
+            for notification in notifications:
+                self.last_id = notification.id
+                self.publish('notification', notification_payload(notification))
+            
+            read_version = notifications_read_version()
+            resync_due = time.monotonic() - self.synced_at > app.config['NOTIFICATION_RESYNC_INTERVAL']
+            if read_version != self.read_version or resync_due:
+                self.read_version = read_version
+                self.synced_at = time.monotonic()
+                self.publish('snapshot', notification_snapshot())
+    
+    def tail(self):
+        """Suivre la base pour tous les flux du processus (une seule requête par tour)"""
+        while True:
+            time.sleep(app.config['NOTIFICATION_TAIL_INTERVAL'])
+            if not self.subscribers:
+                continue
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Erreur suivi des notifications: {e}")
+
+notification_broker = NotificationBroker()
+
 def create_notification(notif_type, title, message, link=None, icon='bell', color='info'):
-    """Créer une nouvelle notification pour l'admin"""
+    """Créer une nouvelle notification pour l'admin (diffusée aux dashboards ouverts)"""
     notification = Notification(
         type=notif_type,
         title=title,
@@ -114,6 +499,7 @@ def create_notification(notif_type, title, message, link=None, icon='bell', colo
     )
     db.session.add(notification)
     db.session.commit()
+    notification_broker.publish('notification', notification_payload(notification))
     return notification
 
 # ========== SYSTÈME D'ENVOI D'EMAILS ==========
@@ -174,16 +560,445 @@ def send_password_reset_email(user, token):
         html_body=html
     )
 
+# ========== IMAGES RESPONSIVE (SRCSET) ==========
+from compress_images import ImageCompressor, RESPONSIVE_WIDTHS, VARIANTS_DIRNAME, variant_formats
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+# Nombre de threads dédiés au traitement des images uploadées
+app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+
+image_compressor = ImageCompressor({
+    'max_width': 1200,
+    'max_height': 1200,
+    'jpeg_quality': 85,
+    'png_optimize': True,
+    'create_thumbs': True,
+    'thumb_size': (400, 400),
+    'create_variants': False,  # Générées après le remplacement de l'original
+    'variant_widths': RESPONSIVE_WIDTHS,
+    'variant_quality': 80,
+    'backup': False,
+    'preserve_exif': True,
+    'formats': ['.jpg', '.jpeg', '.png', '.webp']
+})
+
+# Pool de traitement en arrière-plan: l'upload est enregistré tel quel puis optimisé
+image_executor = ThreadPoolExecutor(max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='image-worker')
+image_jobs = {}  # chemin relatif à static/ -> 'pending', 'processing', 'done' ou 'error'
+image_jobs_lock = threading.Lock()
+
+def static_relative_path(filepath):
+    """Chemin d'un fichier relatif au dossier static/ (ex: 'uploads/photo.webp')"""
+    return os.path.relpath(os.path.abspath(filepath), app.static_folder).replace(os.sep, '/')
+
+def set_image_status(filepath, status):
+    with image_jobs_lock:
+        image_jobs[static_relative_path(filepath)] = status
+
+def get_image_status(filename):
+    """Statut du traitement d'une image de static/ (None si aucun traitement connu)"""
+    with image_jobs_lock:
+        return image_jobs.get(filename)
+
+def optimize_uploaded_image(filepath):
+    """Compresser une image uploadée et remplacer l'original de façon atomique si le gain est réel"""
+    root, extension = os.path.splitext(filepath)
+    tmp_path = f"{root}.processing{extension}"
+    result = image_compressor.compress_image(filepath, tmp_path)
+    if not result['success']:
+        return False
+    if result['compressed_size'] < result['original_size']:
+        os.replace(tmp_path, filepath)
+        return True
+    os.remove(tmp_path)
+    return False
+
+def process_uploaded_image(filepath):
+    """Tâche exécutée par le pool: optimisation puis déclinaisons responsive"""
+    set_image_status(filepath, 'processing')
+    try:
+        # L'image a pu être remplacée ou supprimée entre-temps
+        if not os.path.exists(filepath):
+            set_image_status(filepath, 'error')
+            return
+        with app.app_context():
+            optimize_uploaded_image(filepath)
+            generate_image_variants(filepath)
+        set_image_status(filepath, 'done')
+    except Exception as e:
+        print(f"Erreur traitement image {filepath}: {e}")
+        set_image_status(filepath, 'error')
+
+def schedule_image_processing(filepath):
+    """Confier une image uploadée au pool; l'original reste servi jusqu'à la fin du traitement"""
+    set_image_status(filepath, 'pending')
+    image_executor.submit(process_uploaded_image, filepath)
+
+def generate_image_variants(filepath):
+    """Générer les déclinaisons responsive (160/320/640/1200px) d'une image uploadée"""
+    if filepath.rsplit('.', 1)[-1].lower() == 'svg':
+        return []
+    try:
+        variants = image_compressor.create_variants(filepath, filepath)
+    except Exception as e:
+        print(f"Erreur génération déclinaisons {filepath}: {e}")
+        return []
+    # Invalider l'index des déclinaisons pour cette image
+    relative_path = static_relative_path(filepath)
+    for fmt in variant_formats():
+        cache.delete(f'variants_{fmt}_{relative_path}')
+    return variants
+
+def remove_image_variants(filepath):
+    """Supprimer les déclinaisons responsive d'une image"""
+    directory, filename = os.path.split(filepath)
+    variants_dir = os.path.join(directory, VARIANTS_DIRNAME)
+    stem = os.path.splitext(filename)[0]
+    if not os.path.isdir(variants_dir):
+        return
+    for name in os.listdir(variants_dir):
+        if re.fullmatch(re.escape(stem) + r'_\d+w\.\w+', name):
+            os.remove(os.path.join(variants_dir, name))
+
+def get_variant_widths(filename, fmt):
+    """Largeurs disponibles pour une image de static/ dans un format donné (mises en cache)"""
+    cache_key = f'variants_{fmt}_{filename}'
+    widths = cache.get(cache_key)
+    if widths is None:
+        directory, name = os.path.split(filename)
+        variants_dir = os.path.join(app.static_folder, directory, VARIANTS_DIRNAME)
+        pattern = re.compile(re.escape(os.path.splitext(name)[0]) + r'_(\d+)w\.' + re.escape(fmt))
+        widths = []
+        if os.path.isdir(variants_dir):
+            for entry in os.listdir(variants_dir):
+                match = pattern.fullmatch(entry)
+                if match:
+                    widths.append(int(match.group(1)))
+        widths.sort()
+        cache.set(cache_key, widths)
+    return widths
+
+@app.template_global()
+def image_srcset(filename, fmt='webp'):
+    """Construire la valeur srcset d'une image de static/ à partir de ses déclinaisons"""
+    directory, name = os.path.split(filename)
+    stem = os.path.splitext(name)[0]
+    return ', '.join(
+        f"{url_for('static', filename=f'{directory}/{VARIANTS_DIRNAME}/{stem}_{width}w.{fmt}'.lstrip('/'))} {width}w"
+        for width in get_variant_widths(filename, fmt)
+    )
+
+@app.template_global()
+def responsive_sources(filename, sizes='100vw'):
+    """Balises <source> (AVIF puis WebP) à placer dans un <picture> avant le <img> de repli"""
+    sources = []
+    for fmt in variant_formats():
+        srcset = image_srcset(filename, fmt)
+        if srcset:
+            sources.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{sizes}">')
+    return Markup('\n'.join(sources))
+
+# ========== ASSETS STATIQUES VERSIONNÉS ==========
+from build_assets import BUNDLES, MANIFEST_PATH
+
+asset_manifest = {'mtime': None, 'entries': {}}
+
+def get_asset_manifest():
+    """Manifeste produit par build_assets.py (rechargé si le fichier a changé)"""
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if mtime != asset_manifest['mtime']:
+        with open(MANIFEST_PATH, encoding='utf-8') as f:
+            asset_manifest['entries'] = json.load(f)
+        asset_manifest['mtime'] = mtime
+    return asset_manifest['entries']
+
+@app.template_global()
+def asset_url(filename):
+    """Équivalent de url_for('static', filename=...) qui renvoie la version empreintée si elle existe"""
+    return url_for('static', filename=get_asset_manifest().get(filename, filename))
+
+@app.template_global()
+def asset_tags(bundle):
+    """Balise du bundle versionné, ou des fichiers sources si build_assets.py n'a pas été lancé"""
+    manifest = get_asset_manifest()
+    files = [manifest[bundle]] if bundle in manifest else BUNDLES[bundle]
+    if bundle.endswith('.css'):
+        tags = [f'<link rel="stylesheet" href="{url_for("static", filename=f)}">' for f in files]
+    else:
+        tags = [f'<script src="{url_for("static", filename=f)}"></script>' for f in files]
+    return Markup('\n    '.join(tags))
+
+# ========== FICHIERS STATIQUES PRÉCOMPRESSÉS ==========
+import mimetypes
+
+PRECOMPRESSED_ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+def send_static_precompressed(filename):
+    """Servir la version .br/.gz générée par build_assets.py si le client l'accepte"""
+    if app.config['STATIC_PRECOMPRESSED']:
+        source_path = safe_join(app.static_folder, filename)
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if not request.accept_encodings[encoding]:
+                continue
+            compressed_path = f"{source_path}{suffix}" if source_path else None
+            try:
+                # Ignorer une version compressée plus ancienne que la source
+                if os.stat(compressed_path).st_mtime < os.stat(source_path).st_mtime:
+                    continue
+            except (OSError, TypeError):
+                continue
+            response = send_file(
+                compressed_path,
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                conditional=True,
+                max_age=app.get_send_file_max_age(filename)
+            )
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+    return app.send_static_file(filename)
+
+app.view_functions['static'] = send_static_precompressed
+
 # Hook after_request pour optimisations de cache
 @app.after_request
 def add_cache_headers(response):
     """Ajouter des headers de cache pour les fichiers statiques"""
-    if request.path.startswith('/static/'):
+    if request.path.startswith('/static/dist/'):
+        # Fichiers versionnés par build_assets.py: le nom change avec le contenu
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = 31536000
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    elif request.path.startswith('/static/'):
         # Cache les fichiers statiques pendant 1 an
         response.cache_control.max_age = 31536000
         response.cache_control.public = True
+    elif request.path.startswith('/img/') and response.status_code in (200, 304):
+        # Images redimensionnées: l'URL change avec la source, donc immuables
+        response.cache_control.max_age = 31536000
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+# ========== REQUÊTES CONDITIONNELLES (ETag / Last-Modified) ==========
+# Un visiteur qui revient sur une page inchangée reçoit un 304 sans rendu de template.
+# Les pages HTML affichent un en-tête propre au visiteur (connexion, compteur du
+# panier): il fait partie de l'ETag pour ne jamais resservir un en-tête périmé.
+import hashlib
+
+def content_etag(*parts):
+    """ETag calculé à partir des parties qui décrivent le contenu (réponses JSON publiques)"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def csrf_etag_part():
+    """
+    Jeton CSRF de la session + tranche de temps: une page en cache (304) ne garde
+    jamais un jeton de formulaire plus vieux que la moitié de WTF_CSRF_TIME_LIMIT
+    """
+    token = session.get(app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+    time_limit = app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if not time_limit:
+        return (token,)
+    return (token, int(time.time() // max(1, time_limit // 2)))
+
+def page_etag(*parts):
+    """ETag d'une page: parties qui décrivent le contenu + état du visiteur (compte, panier, jeton CSRF)"""
+    if current_user.is_authenticated:
+        viewer = (current_user.get_id(), session.get('cart_count'))
+    else:
+        viewer = (None, len(session.get('cart', {})))
+    return content_etag(*parts, *viewer, *csrf_etag_part())
+
+def not_modified(etag, last_modified=None):
+    """
+    Le client a-t-il déjà cette version ? If-None-Match est prioritaire sur
+    If-Modified-Since; le suffixe :gzip / :br ajouté par Flask-Compress est ignoré
+    
+    last_modified=None pour les pages propres au visiteur: la date ne décrit que le
+    contenu, seul l'ETag (page_etag) tient compte du visiteur.
+    """
+    if session.get('_flashes'):
+        # Messages à afficher: la page en cache ne les contient pas
+        return False
+    if request.if_none_match:
+        return request.if_none_match.star_tag or any(
+            tag.split(':', 1)[0] == etag for tag in request.if_none_match.as_set(include_weak=True)
+        )
+    if last_modified and request.if_modified_since:
+        return request.if_modified_since.replace(tzinfo=None) >= last_modified.replace(microsecond=0)
+    return False
+
+def conditional_response(etag, last_modified, render, private=True):
+    """
+    Réponse avec ETag / Last-Modified, ou 304 si le client a déjà cette version
+    
+    Args:
+        etag: valeur de page_etag() (ou content_etag() pour une réponse publique)
+        last_modified: datetime UTC naïf (updated_at) ou None
+        render: fonction sans argument appelée seulement si la page a changé
+        private: False pour une réponse identique pour tous les visiteurs
+    """
+    # If-Modified-Since seulement pour les réponses publiques (voir not_modified)
+    if request.method in ('GET', 'HEAD') and not_modified(etag, None if private else last_modified):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Toujours revalidé (revalidation gratuite grâce au 304)
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.cache_control.no_cache = True
     return response
 
+# ========== REDIMENSIONNEMENT D'IMAGES À LA DEMANDE ==========
+from PIL import Image, ImageOps
+
+IMAGE_MIMETYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png'
+}
+
+resize_locks = {}  # clé de cache -> verrou, pour dédupliquer les premières requêtes simultanées
+resize_locks_guard = threading.Lock()
+
+# Taille estimée du cache d'images de ce processus: None = pas encore comptée sur disque
+image_cache_usage = {'bytes': None, 'scanned_at': 0}
+image_cache_usage_lock = threading.Lock()
+
+def resized_image_key(source_path, width, fmt):
+    """Adresse de la variante: empreinte de la source (chemin, taille, mtime) + paramètres"""
+    stat = os.stat(source_path)
+    fingerprint = f"{source_path}:{stat.st_size}:{stat.st_mtime_ns}:{width}:{fmt}"
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+def resized_image_path(key, fmt):
+    return os.path.join(app.config['IMAGE_CACHE_FOLDER'], key[:2], f"{key}.{fmt}")
+
+def render_resized_image(source_path, target_path, width, fmt):
+    """Redimensionner la source (sans agrandissement) et l'écrire atomiquement dans le cache"""
+    img = ImageOps.exif_transpose(Image.open(source_path))
+    if img.width > width:
+        img = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS)
+    if fmt == 'jpeg' and img.mode != 'RGB':
+        img = img.convert('RGB')
+    elif img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA')
+    
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    # Fichier temporaire propre au processus et au thread (plusieurs workers gunicorn)
+    tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        img.save(tmp_path, format=fmt.upper(), quality=80)
+        os.replace(tmp_path, target_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def evict_image_cache():
+    """
+    Parcourir le cache et supprimer les variantes les moins récemment servies
+    tant que le quota disque est dépassé (met à jour la taille estimée)
+    """
+    entries = []
+    total_size = 0
+    for root, _dirs, files in os.walk(app.config['IMAGE_CACHE_FOLDER']):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+    
+    quota = app.config['IMAGE_CACHE_MAX_BYTES']
+    removed = 0
+    if total_size > quota:
+        # Descendre à 90% du quota pour ne pas relancer l'éviction à chaque écriture
+        for _mtime, size, path in sorted(entries):
+            if total_size <= quota * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            removed += 1
+    
+    with image_cache_usage_lock:
+        image_cache_usage.update({'bytes': total_size, 'scanned_at': time.monotonic()})
+    return removed
+
+def record_image_cache_write(size):
+    """
+    Ajouter une variante à la taille estimée du cache: le disque n'est parcouru
+    qu'au dépassement du quota ou quand le dernier comptage est trop ancien
+    """
+    with image_cache_usage_lock:
+        stale = (image_cache_usage['bytes'] is None or
+                 time.monotonic() - image_cache_usage['scanned_at'] >= app.config['IMAGE_CACHE_RESCAN_INTERVAL'])
+        if not stale:
+            image_cache_usage['bytes'] += size
+            if image_cache_usage['bytes'] <= app.config['IMAGE_CACHE_MAX_BYTES']:
+                return 0
+    return evict_image_cache()
+
+@app.route('/img/<path:filename>')
+def resized_image(filename):
+    """Servir une image uploadée redimensionnée: /img/<fichier>?w=320&fmt=webp"""
+    width = request.args.get('w', type=int)
+    fmt = request.args.get('fmt', 'webp').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    
+    # Largeurs et formats limités pour borner la taille du cache
+    if width not in RESPONSIVE_WIDTHS or fmt not in IMAGE_MIMETYPES:
+        abort(400)
+    if fmt in ('avif', 'webp') and fmt not in variant_formats():
+        abort(400)
+    
+    source_path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    if source_path is None or not os.path.isfile(source_path) or filename.lower().endswith('.svg'):
+        abort(404)
+    
+    key = resized_image_key(source_path, width, fmt)
+    target_path = resized_image_path(key, fmt)
+    
+    if os.path.exists(target_path):
+        # Rafraîchir la date d'accès pour l'éviction LRU
+        os.utime(target_path)
+    else:
+        with resize_locks_guard:
+            lock = resize_locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                # Une requête concurrente a peut-être déjà produit la variante
+                if not os.path.exists(target_path):
+                    try:
+                        render_resized_image(source_path, target_path, width, fmt)
+                    except Exception as e:
+                        print(f"Erreur redimensionnement {filename}: {e}")
+                        abort(404)
+                    record_image_cache_write(os.path.getsize(target_path))
+        finally:
+            # Toujours libérer l'entrée, même si la requête se termine par abort()
+            with resize_locks_guard:
+                resize_locks.pop(key, None)
+    
+    return send_file(target_path, mimetype=IMAGE_MIMETYPES[fmt], etag=key, conditional=True, max_age=31536000)
+
 # Routes principales - Côté Client
 @app.route('/')
 def index():
@@ -220,8 +1035,40 @@ def index():
                          new_products=new_products,
                          recent_blog_posts=recent_blog_posts)
 
+# Validateurs du catalogue: une requête agrégée au lieu du rendu complet
+def last_change(model, *criteria):
+    """
+    (max(updated_at), nombre de lignes) des lignes concernées
+    
+    Le nombre détecte les suppressions, que max(updated_at) ne voit pas.
+    """
+    from sqlalchemy import func
+    return tuple(db.session.query(func.max(model.updated_at), func.count(model.id)).filter(*criteria).one())
+
+def review_version(*criteria):
+    """Version des avis: (nombre, dernier id) — un avis est ajouté ou supprimé, jamais modifié"""
+    from sqlalchemy import func
+    return tuple(db.session.query(func.count(Review.id), func.max(Review.id)).filter(*criteria).one())
+
+def latest_change(*changes):
+    """Date de dernière modification (Last-Modified) parmi plusieurs last_change()"""
+    dates = [change[0] for change in changes if change[0]]
+    return max(dates) if dates else None
+
 @app.route('/collections')
 def collections():
+    """Catalogue filtrable (304 si produits, avis, catégories et marques sont inchangés)"""
+    from models import Brand
+    changes = (last_change(Product), last_change(Category), last_change(Brand))
+    return conditional_response(
+        page_etag('collections', request.full_path, changes, review_version()),
+        latest_change(*changes),
+        render_collections
+    )
+
+def render_collections():
+    """Rendu de la page /collections"""
+    from sqlalchemy import func
     # Récupérer les paramètres de filtre
     category_filter = request.args.get('category')
     format_filter = request.args.get('format')  # 'collection', 'complet' ou 'decant'
@@ -237,12 +1084,7 @@ def collections():
     
     # Appliquer le filtre de recherche
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Product.name.ilike(search_term)) | 
-            (Product.brand.ilike(search_term)) |
-            (Product.description.ilike(search_term))
-        )
+        query = query.filter(product_search_filter(search))
     
     # Appliquer le filtre de catégorie
     if category_filter:
@@ -291,7 +1133,7 @@ def collections():
         # Tri par note moyenne (nécessite une jointure avec reviews)
         from sqlalchemy import func
         query = query.outerjoin(Review).group_by(Product.id).order_by(
-            func.avg(Review.rating).desc().nullslast()
+            *order_nulls_last(func.avg(Review.rating))
         )
     elif sort_by == 'popularity':
         # Tri par nombre d'avis
@@ -340,8 +1182,18 @@ def collections():
 
 @app.route('/product/<int:product_id>')
 def product_detail(product_id):
-    from models import Review
+    """Fiche produit (304 si le produit, les produits similaires et les avis sont inchangés)"""
     product = Product.query.get_or_404(product_id)
+    related = last_change(Product, Product.category_id == product.category_id, Product.id != product.id)
+    return conditional_response(
+        page_etag('product', product.id, product.updated_at, related, review_version(Review.product_id == product.id)),
+        latest_change((product.updated_at,), related),
+        lambda: render_product_detail(product)
+    )
+
+def render_product_detail(product):
+    """Rendu de la fiche produit"""
+    product_id = product.id
     related_products = Product.query.filter(
         Product.category_id == product.category_id,
         Product.id != product.id
@@ -425,6 +1277,16 @@ def add_review(product_id):
 
 @app.route('/decants')
 def decants():
+    """Liste des décants (304 si aucun décant n'a changé)"""
+    change = last_change(Product, Product.product_type == 'decant')
+    return conditional_response(
+        page_etag('decants', request.full_path, change),
+        change[0],
+        render_decants
+    )
+
+def render_decants():
+    """Rendu de la page /decants"""
     # Récupérer les paramètres de filtre
     size_filter = request.args.get('size')
     price_min = request.args.get('price_min', type=float)
@@ -510,6 +1372,223 @@ def contact():
 def about():
     return render_template('about.html')
 
+# ========== SITEMAP ==========
+# /sitemap.xml est un index qui pointe vers des fichiers de 50 000 URL au plus
+# (produits, marques, catégories, articles du blog, pages fixes). Chaque fichier
+# est écrit sur disque avec une signature de ses lignes (nombre, max(updated_at),
+# premier et dernier id): seuls les fichiers dont les lignes ont changé sont régénérés.
+from xml.sax.saxutils import escape as xml_escape
+
+app.config['SITEMAP_MAX_URLS'] = 50000  # limite du protocole sitemap par fichier
+app.config['SITEMAP_CHECK_INTERVAL'] = 300  # secondes entre deux vérifications des signatures
+
+sitemap_lock = threading.Lock()
+sitemap_state = {'checked_at': 0}
+
+def sitemap_sources():
+    """
+    Sections du sitemap: requête (id, updated_at, key) et construction de l'URL
+    
+    Returns:
+        dict: nom de section -> (requête, fonction key -> chemin)
+    """
+    from models import Brand
+    return {
+        'produits': (
+            db.session.query(Product.id, Product.updated_at, Product.id.label('key')),
+            lambda key: url_for('product_detail', product_id=key)
+        ),
+        'marques': (
+            db.session.query(Brand.id, Brand.updated_at, Brand.name.label('key')).filter(Brand.is_active == True),
+            lambda key: url_for('collections', brand=key)
+        ),
+        'categories': (
+            db.session.query(Category.id, Category.updated_at, Category.name.label('key')).filter(Category.is_active == True),
+            lambda key: url_for('collections', category=key)
+        ),
+        'blog': (
+            db.session.query(BlogPost.id, BlogPost.updated_at, BlogPost.slug.label('key')).filter(BlogPost.is_published == True),
+            lambda key: url_for('blog_post', slug=key)
+        )
+    }
+
+def sitemap_pages():
+    """Pages fixes et filtres de format des collections: (chemin, lastmod)"""
+    catalog_lastmod = last_change(Product)[0]
+    blog_lastmod = last_change(BlogPost, BlogPost.is_published == True)[0]
+    pages = [
+        (url_for('index'), catalog_lastmod),
+        (url_for('collections'), catalog_lastmod),
+        (url_for('decants'), last_change(Product, Product.product_type == 'decant')[0]),
+        (url_for('blog'), blog_lastmod),
+        (url_for('rewards'), None),
+        (url_for('about'), None),
+        (url_for('contact'), None)
+    ]
+    for format_filter, product_type in (('collection', 'collection'), ('complet', 'parfum'), ('decant', 'decant')):
+        pages.append((url_for('collections', format=format_filter), last_change(Product, Product.product_type == product_type)[0]))
+    return pages
+
+def sitemap_shard_signatures(query):
+    """
+    Signature de chaque fichier d'une section, en une requête (numérotation des lignes)
+    
+    Returns:
+        dict: numéro de fichier -> [nombre, max(updated_at), premier id, dernier id]
+    """
+    from sqlalchemy import func
+    rows = query.subquery()
+    numbered = db.session.query(
+        rows.c.id,
+        rows.c.updated_at,
+        # Division entière (op '/' entre deux entiers): le "/" de SQLAlchemy 2 serait une division réelle
+        (func.row_number().over(order_by=rows.c.id) - 1).op('/', precedence=8)(app.config['SITEMAP_MAX_URLS']).label('shard')
+    ).subquery()
+    signatures = db.session.query(
+        numbered.c.shard,
+        func.count(),
+        func.max(numbered.c.updated_at),
+        func.min(numbered.c.id),
+        func.max(numbered.c.id)
+    ).group_by(numbered.c.shard).all()
+    return {
+        int(shard): [count, last.isoformat() if last else None, first_id, last_id]
+        for shard, count, last, first_id, last_id in signatures
+    }
+
+def sitemap_lastmod(value):
+    """Date W3C pour <lastmod> (updated_at est en UTC)"""
+    return value.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+def write_sitemap_file(filename, lines):
+    """Écrire un fichier du sitemap ligne par ligne, remplacé atomiquement"""
+    path = os.path.join(app.config['SITEMAP_FOLDER'], filename)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line)
+    os.replace(temp_path, path)
+
+def sitemap_urlset(entries):
+    """Lignes XML d'un <urlset> à partir de (chemin, lastmod)"""
+    base_url = app.config['SITEMAP_BASE_URL']
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for path, lastmod in entries:
+        yield f'  <url><loc>{xml_escape(base_url + path)}</loc>'
+        if lastmod:
+            yield f'<lastmod>{sitemap_lastmod(lastmod)}</lastmod>'
+        yield '</url>\n'
+    yield '</urlset>\n'
+
+def load_sitemap_manifest():
+    """Signatures et dates des fichiers déjà écrits"""
+    try:
+        with open(os.path.join(app.config['SITEMAP_FOLDER'], 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def refresh_sitemap(force=False):
+    """
+    Régénérer les fichiers du sitemap dont les lignes ont changé (au plus une
+    vérification toutes les SITEMAP_CHECK_INTERVAL secondes, sauf force=True)
+    
+    Returns:
+        dict: fichiers écrits et supprimés
+    """
+    with sitemap_lock:
+        if not force and time.monotonic() - sitemap_state['checked_at'] < app.config['SITEMAP_CHECK_INTERVAL']:
+            return {'written': [], 'removed': []}
+        
+        with app.test_request_context():
+            manifest = load_sitemap_manifest()
+            shards = {}
+            written = []
+            
+            # Pages fixes: petite section, la liste elle-même sert de signature
+            pages = sitemap_pages()
+            signature = [[path, sitemap_lastmod(lastmod) if lastmod else None] for path, lastmod in pages]
+            shards['pages-1.xml'] = {'signature': signature, 'lastmod': max((lastmod for _, lastmod in pages if lastmod), default=None)}
+            if manifest.get('pages-1.xml', {}).get('signature') != signature:
+                write_sitemap_file('pages-1.xml', sitemap_urlset(pages))
+                written.append('pages-1.xml')
+            
+            for section, (query, build_path) in sitemap_sources().items():
+                for shard, signature in sitemap_shard_signatures(query).items():
+                    filename = f'{section}-{shard + 1}.xml'
+                    count, last, first_id, last_id = signature
+                    shards[filename] = {
+                        'signature': signature,
+                        'lastmod': datetime.fromisoformat(last) if last else None
+                    }
+                    if manifest.get(filename, {}).get('signature') == signature:
+                        continue
+                    
+                    # Lecture en flux des lignes du fichier (bornées par id, pas d'OFFSET)
+                    model_id = query.column_descriptions[0]['expr']
+                    rows = query.filter(model_id >= first_id, model_id <= last_id).order_by(model_id).yield_per(1000)
+                    entries = [0]
+                    def shard_entries():
+                        for row in rows:
+                            entries[0] += 1
+                            yield build_path(row.key), row.updated_at
+                    write_sitemap_file(filename, sitemap_urlset(shard_entries()))
+                    written.append(filename)
+                    
+                    # Le fichier doit contenir exactement les lignes de sa signature (sinon: lignes
+                    # modifiées entre les deux requêtes, ou découpage faux). Pas de signature
+                    # enregistrée: le fichier sera réécrit à la prochaine vérification.
+                    if entries[0] != count:
+                        print(f"Sitemap {filename}: {entries[0]} URL écrites pour {count} lignes")
+                        shards[filename]['signature'] = None
+            
+            removed = [filename for filename in manifest if filename not in shards]
+            for filename in removed:
+                try:
+                    os.remove(os.path.join(app.config['SITEMAP_FOLDER'], filename))
+                except OSError:
+                    pass
+            
+            if written or removed or not os.path.exists(os.path.join(app.config['SITEMAP_FOLDER'], 'sitemap.xml')):
+                write_sitemap_file('sitemap.xml', sitemap_index_lines(shards))
+                write_sitemap_file('manifest.json', [json.dumps({
+                    filename: {'signature': shard['signature']} for filename, shard in shards.items()
+                })])
+        
+        sitemap_state['checked_at'] = time.monotonic()
+        return {'written': written, 'removed': removed}
+
+def sitemap_index_lines(shards):
+    """Lignes XML du <sitemapindex> qui liste les fichiers du sitemap"""
+    base_url = app.config['SITEMAP_BASE_URL']
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for filename, shard in sorted(shards.items()):
+        yield f'  <sitemap><loc>{xml_escape(base_url + url_for("sitemap_file", filename=filename))}</loc>'
+        if shard['lastmod']:
+            yield f'<lastmod>{sitemap_lastmod(shard["lastmod"])}</lastmod>'
+        yield '</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+@app.route('/sitemap.xml')
+def sitemap_index():
+    """Index du sitemap (fichiers régénérés seulement si leurs lignes ont changé)"""
+    refresh_sitemap()
+    return send_file(os.path.join(app.config['SITEMAP_FOLDER'], 'sitemap.xml'),
+                     mimetype='application/xml', conditional=True, max_age=3600)
+
+@app.route('/sitemap/<filename>')
+def sitemap_file(filename):
+    """Un fichier du sitemap (section-numéro.xml)"""
+    if not re.fullmatch(r'[a-z]+-\d+\.xml', filename):
+        abort(404)
+    refresh_sitemap()
+    path = os.path.join(app.config['SITEMAP_FOLDER'], filename)
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='application/xml', conditional=True, max_age=3600)
+
 # ========== COMPARATEUR DE PRODUITS ==========
 @app.route('/compare')
 def compare_products():
@@ -580,7 +1659,7 @@ def register():
             return redirect(url_for('register'))
         
         # Créer le nouvel utilisateur (toujours en tant que client, jamais admin)
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_password = hash_password(password)
         user = User(
             username=username,
             email=email,
@@ -602,32 +1681,206 @@ def register():
     
     return render_template('register.html')
 
-def check_login_attempts(ip_address, max_attempts=5, lockout_minutes=15):
-    """Vérifier si l'IP est bloquée pour tentatives de connexion excessives"""
-    cutoff_time = datetime.utcnow() - timedelta(minutes=lockout_minutes)
-    
-    # Compter les tentatives échouées récentes
-    recent_attempts = LoginAttempt.query.filter(
-        LoginAttempt.ip_address == ip_address,
-        LoginAttempt.attempt_time > cutoff_time,
-        LoginAttempt.success == False
-    ).count()
+# Limitation des connexions: fenêtre glissante dans le cache partagé (par IP et par
+# identifiant, commune à tous les workers) et journal LoginAttempt écrit par lots en
+# arrière-plan
+import atexit
+
+app.config['LOGIN_MAX_ATTEMPTS_IP'] = 5
+app.config['LOGIN_MAX_ATTEMPTS_USER'] = 10  # Même identifiant depuis plusieurs IP (credential stuffing)
+app.config['LOGIN_LOCKOUT_MINUTES'] = 15
+app.config['LOGIN_WINDOW_BUCKETS'] = 15  # Précision de la fenêtre glissante (15 min / 15 = 1 min)
+app.config['LOGIN_AUDIT_BATCH_SIZE'] = 100
+app.config['LOGIN_AUDIT_FLUSH_INTERVAL'] = 2  # secondes
+
+class SlidingWindowLimiter:
+    """
+    Compteur d'échecs à fenêtre glissante dans un cache partagé entre processus
+    
+    La fenêtre est découpée en tranches: un compteur par (clé, tranche), qui expire
+    après la fenêtre. Le nombre d'échecs est la somme des tranches de la fenêtre.
+    
+    atomic_inc: cache.inc() atomique et sans changer l'expiration (Redis). Sinon
+    (FileSystemCache, SimpleCache), inc() relit puis réécrit avec l'expiration par
+    défaut: le compteur est réécrit avec la sienne, sous verrou du processus (deux
+    échecs simultanés dans deux workers peuvent n'être comptés qu'une fois).
+    """
+    
+    def __init__(self, store, atomic_inc=False, buckets=15):
+        self.store = store
+        self.atomic_inc = atomic_inc
+        self.buckets = buckets
+        self.lock = threading.Lock()
+    
+    def _keys(self, key, window):
+        """(clés des tranches de la fenêtre, de la plus ancienne à la courante), expiration"""
+        bucket_size = max(1, window // self.buckets)
+        current = int(time.time() // bucket_size)
+        prefix = 'login_failures_' + '_'.join(str(part) for part in key)
+        keys = [f'{prefix}_{index}' for index in range(current - self.buckets + 1, current + 1)]
+        return keys, window + bucket_size
+    
+    def count(self, key, window):
+        keys, _ = self._keys(key, window)
+        return sum(value or 0 for value in self.store.get_many(*keys))
+    
+    def hit(self, key, window):
+        """Enregistrer un échec et renvoyer le nombre d'échecs dans la fenêtre"""
+        keys, timeout = self._keys(key, window)
+        current = keys[-1]
+        if not self.store.add(current, 1, timeout=timeout):
+            if self.atomic_inc:
+                self.store.inc(current)
+            else:
+                with self.lock:
+                    self.store.set(current, (self.store.get(current) or 0) + 1, timeout=timeout)
+        return self.count(key, window)
     
-    if recent_attempts >= max_attempts:
-        return False, f'Trop de tentatives de connexion. Veuillez réessayer dans {lockout_minutes} minutes.'
+    def reset(self, key, window):
+        keys, _ = self._keys(key, window)
+        self.store.delete_many(*keys)
+
+login_limiter = SlidingWindowLimiter(
+    cache, atomic_inc=app.config['CACHE_TYPE'] == 'RedisCache', buckets=app.config['LOGIN_WINDOW_BUCKETS']
+)
+
+def login_limit_keys(ip_address, username):
+    """Clés du limiteur avec leur limite respective"""
+    keys = [(('ip', ip_address), app.config['LOGIN_MAX_ATTEMPTS_IP'])]
+    if username:
+        keys.append((('user', username.strip().lower()), app.config['LOGIN_MAX_ATTEMPTS_USER']))
+    return keys
+
+def check_login_attempts(ip_address, username=None):
+    """Vérifier si l'IP ou l'identifiant est bloqué pour tentatives excessives (sans requête SQL)"""
+    lockout_minutes = app.config['LOGIN_LOCKOUT_MINUTES']
+    for key, max_attempts in login_limit_keys(ip_address, username):
+        if login_limiter.count(key, lockout_minutes * 60) >= max_attempts:
+            return False, f'Trop de tentatives de connexion. Veuillez réessayer dans {lockout_minutes} minutes.'
     
     return True, None
 
-def record_login_attempt(ip_address, username, success):
-    """Enregistrer une tentative de connexion"""
-    attempt = LoginAttempt(
-        ip_address=ip_address,
-        username=username,
-        success=success,
-        user_agent=request.headers.get('User-Agent', '')[:500]
+def register_login_failure(ip_address, username):
+    """Compter un échec et renvoyer le nombre de tentatives restantes"""
+    window = app.config['LOGIN_LOCKOUT_MINUTES'] * 60
+    return min(
+        max_attempts - login_limiter.hit(key, window)
+        for key, max_attempts in login_limit_keys(ip_address, username)
     )
-    db.session.add(attempt)
+
+def reset_login_failures(ip_address, username):
+    """Connexion réussie: remettre les compteurs à zéro"""
+    window = app.config['LOGIN_LOCKOUT_MINUTES'] * 60
+    for key, _ in login_limit_keys(ip_address, username):
+        login_limiter.reset(key, window)
+
+login_audit_queue = queue.Queue(maxsize=10000)
+login_audit_state = {'thread': None, 'dropped': 0}
+login_audit_lock = threading.Lock()
+
+def flush_login_attempts():
+    """Écrire en une seule transaction les tentatives en attente"""
+    rows = []
+    while len(rows) < 1000:
+        try:
+            rows.append(login_audit_queue.get_nowait())
+        except queue.Empty:
+            break
+    if not rows:
+        return 0
+    
+    with app.app_context():
+        try:
+            db.session.execute(LoginAttempt.__table__.insert(), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erreur écriture des tentatives de connexion: {e}")
+            return 0
+    return len(rows)
+
+def login_audit_writer():
+    """Thread d'écriture: un lot toutes les LOGIN_AUDIT_FLUSH_INTERVAL secondes ou dès qu'il est plein"""
+    while True:
+        deadline = time.monotonic() + app.config['LOGIN_AUDIT_FLUSH_INTERVAL']
+        while login_audit_queue.qsize() < app.config['LOGIN_AUDIT_BATCH_SIZE'] and time.monotonic() < deadline:
+            time.sleep(0.1)
+        while flush_login_attempts():
+            pass
+
+def record_login_attempt(ip_address, username, success):
+    """Enregistrer une tentative de connexion (écriture différée, par lots)"""
+    try:
+        login_audit_queue.put_nowait({
+            'ip_address': ip_address,
+            'username': username,
+            'success': success,
+            'user_agent': request.headers.get('User-Agent', '')[:500],
+            'attempt_time': datetime.utcnow()
+        })
+    except queue.Full:
+        # Vague d'attaque: le limiteur reste actif, seul le journal est écrêté
+        login_audit_state['dropped'] += 1
+        return
+    
+    with login_audit_lock:
+        if login_audit_state['thread'] is None:
+            login_audit_state['thread'] = threading.Thread(target=login_audit_writer, daemon=True)
+            login_audit_state['thread'].start()
+
+# Ne pas perdre les tentatives en attente à l'arrêt
+atexit.register(flush_login_attempts)
+
+# Hachage des mots de passe: pool borné pour que les rafales de connexions
+# ne monopolisent pas le CPU au détriment du reste du site
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+app.config['PASSWORD_HASH_QUEUE_LIMIT'] = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 16))
+
+password_executor = ThreadPoolExecutor(max_workers=app.config['PASSWORD_HASH_WORKERS'], thread_name_prefix='password')
+password_slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_WORKERS'] + app.config['PASSWORD_HASH_QUEUE_LIMIT'])
+
+class PasswordPoolBusy(Exception):
+    """File d'attente du hachage pleine: la requête est refusée au lieu d'attendre"""
+
+def run_password_task(func, *args):
+    """Exécuter un calcul bcrypt dans le pool (bcrypt libère le GIL pendant le calcul)"""
+    if not password_slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        return password_executor.submit(func, *args).result()
+    finally:
+        password_slots.release()
+
+def hash_password(password):
+    """Hacher un mot de passe avec le coût configuré (BCRYPT_LOG_ROUNDS)"""
+    return run_password_task(bcrypt.generate_password_hash, password).decode('utf-8')
+
+def verify_password(password_hash, password):
+    """Vérifier un mot de passe dans le pool borné"""
+    return run_password_task(bcrypt.check_password_hash, password_hash, password)
+
+def rehash_password_if_needed(user, password):
+    """Connexion réussie: re-hacher si le coût du hachage stocké diffère du coût configuré"""
+    try:
+        rounds = int(user.password.split('$')[2])
+    except (IndexError, ValueError):
+        return
+    if rounds == app.config['BCRYPT_LOG_ROUNDS']:
+        return
+    
+    try:
+        user.password = hash_password(password)
+    except PasswordPoolBusy:
+        return  # Sera fait à la prochaine connexion
     db.session.commit()
+    invalidate_user_cache(user.id)
+
+@app.errorhandler(PasswordPoolBusy)
+def password_pool_busy(e):
+    flash('Trop de connexions simultanées. Veuillez réessayer dans quelques secondes.', 'warning')
+    response = redirect(request.referrer or url_for('index'))
+    response.headers['Retry-After'] = '5'
+    return response
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -637,52 +1890,35 @@ def login():
     ip_address = request.remote_addr
     
     if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        remember = request.form.get('remember', False)
+        
         # Vérifier les tentatives de connexion
-        allowed, error_message = check_login_attempts(ip_address)
+        allowed, error_message = check_login_attempts(ip_address, email)
         if not allowed:
             flash(error_message, 'danger')
             return render_template('login.html'), 429  # Too Many Requests
         
-        email = request.form.get('email')
-        password = request.form.get('password')
-        remember = request.form.get('remember', False)
-        
         user = User.query.filter_by(email=email).first()
         
-        if user and bcrypt.check_password_hash(user.password, password):
+        if user and verify_password(user.password, password):
             # Connexion réussie
+            rehash_password_if_needed(user, password)
             record_login_attempt(ip_address, user.username, True)
+            reset_login_failures(ip_address, email)
             login_user(user, remember=remember)
             
             # Fusionner le panier session avec le panier DB
             cart_session = session.get('cart', {})
             if cart_session:
-                for product_id_str, quantity in cart_session.items():
-                    product_id = int(product_id_str)
-                    
-                    # Vérifier si le produit est déjà dans le panier DB
-                    cart_item = CartItem.query.filter_by(
-                        user_id=user.id,
-                        product_id=product_id
-                    ).first()
-                    
-                    if cart_item:
-                        # Ajouter la quantité du panier session
-                        cart_item.quantity += quantity
-                    else:
-                        # Créer un nouveau CartItem
-                        cart_item = CartItem(
-                            user_id=user.id,
-                            product_id=product_id,
-                            quantity=quantity
-                        )
-                        db.session.add(cart_item)
+                merge_session_cart(user.id, cart_session)
                 
                 # Vider le panier session
                 session.pop('cart', None)
             
-            # Nettoyer les anciennes tentatives échouées de cet utilisateur
-            LoginAttempt.query.filter_by(ip_address=ip_address, success=False).delete()
+            # Le panier DB a pu changer: recompter au prochain rendu
+            reset_cart_count()
             db.session.commit()
             
             next_page = request.args.get('next')
@@ -693,12 +1929,7 @@ def login():
             record_login_attempt(ip_address, email, False)
             
             # Compter les tentatives restantes
-            cutoff_time = datetime.utcnow() - timedelta(minutes=15)
-            remaining_attempts = 5 - LoginAttempt.query.filter(
-                LoginAttempt.ip_address == ip_address,
-                LoginAttempt.attempt_time > cutoff_time,
-                LoginAttempt.success == False
-            ).count()
+            remaining_attempts = register_login_failure(ip_address, email)
             
             if remaining_attempts > 0:
                 flash(f'Email ou mot de passe incorrect. Il vous reste {remaining_attempts} tentative(s).', 'danger')
@@ -711,6 +1942,7 @@ def login():
 @login_required
 def logout():
     logout_user()
+    reset_cart_count()
     flash('Vous avez été déconnecté avec succès.', 'info')
     return redirect(url_for('index'))
 
@@ -764,9 +1996,10 @@ def reset_password(token):
             return redirect(url_for('reset_password', token=token))
         
         # Mettre à jour le mot de passe
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_password = hash_password(password)
         user.password = hashed_password
         db.session.commit()
+        invalidate_user_cache(user.id)
         
         flash('Votre mot de passe a été réinitialisé avec succès !', 'success')
         return redirect(url_for('login'))
@@ -812,13 +2045,14 @@ def update_profile():
     # Changement de mot de passe
     if new_password:
         if new_password == confirm_password:
-            user.password = bcrypt.generate_password_hash(new_password).decode('utf-8')
+            user.password = hash_password(new_password)
             flash('Mot de passe mis à jour avec succès.', 'success')
         else:
             flash('Les mots de passe ne correspondent pas.', 'danger')
             return redirect(url_for('profile'))
     
     db.session.commit()
+    invalidate_user_cache(user.id)
     flash('Profil mis à jour avec succès.', 'success')
     return redirect(url_for('profile'))
 
@@ -838,30 +2072,305 @@ def order_detail(order_id):
     return render_template('order_detail.html', order=order)
 
 # Routes du panier
+from sqlalchemy.orm import joinedload
+
+class SessionCartItem:
+    """Objet similaire à CartItem pour afficher le panier session dans les templates"""
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+        self.id = f"session_{product.id}"
+
+def session_cart_products(cart_data):
+    """Charger les produits du panier session en une seule requête IN"""
+    product_ids = {int(product_id) for product_id in cart_data}
+    if not product_ids:
+        return {}
+    return {product.id: product for product in Product.query.filter(Product.id.in_(product_ids)).all()}
+
+def upsert_cart_items(rows):
+    """
+    Ajouter des lignes au panier DB en une seule requête:
+    INSERT ... ON CONFLICT(user_id, product_id) DO UPDATE (quantités additionnées)
+    """
+    stmt = dialect_insert(CartItem.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'product_id'],
+        set_={'quantity': CartItem.__table__.c.quantity + stmt.excluded.quantity}
+    )
+    db.session.execute(stmt)
+
+def cart_totals(user_id=None):
+    """
+    Totaux du panier: lignes (count), unités (items) et montant (total)
+    Panier DB: une seule requête agrégée. Sans user_id: panier session.
+    """
+    if user_id is None:
+        cart_data = session.get('cart', {})
+        products = session_cart_products(cart_data)
+        lines = [(products[int(product_id)], quantity) for product_id, quantity in cart_data.items() if int(product_id) in products]
+        return {
+            'count': len(cart_data),
+            'items': sum(quantity for _, quantity in lines),
+            'total': round(sum(product.price * quantity for product, quantity in lines), 2)
+        }
+    
+    from sqlalchemy import func
+    count, items, total = db.session.query(
+        func.count(CartItem.id),
+        func.coalesce(func.sum(CartItem.quantity), 0),
+        func.coalesce(func.sum(CartItem.quantity * Product.price), 0)
+    ).outerjoin(Product, Product.id == CartItem.product_id).filter(CartItem.user_id == user_id).one()
+    return {'count': count, 'items': int(items), 'total': round(float(total), 2)}
+
+def add_product_to_cart(product, quantity):
+    """Ajouter un produit au panier (DB ou session) et renvoyer les nouveaux totaux"""
+    if current_user.is_authenticated:
+        # Panier DB: upsert, pas de doublon même en cas de double clic
+        upsert_cart_items([{
+            'user_id': current_user.id,
+            'product_id': product.id,
+            'quantity': quantity,
+            'added_at': datetime.utcnow()
+        }])
+        db.session.commit()
+        bump_cart_version(current_user.id)
+        totals = cart_totals(current_user.id)
+        reset_cart_count(totals['count'])
+    else:
+        # Panier session pour visiteurs
+        cart = session.get('cart', {})
+        product_id_str = str(product.id)
+        cart[product_id_str] = cart.get(product_id_str, 0) + quantity
+        session['cart'] = cart
+        session.modified = True
+        totals = cart_totals()
+    return totals
+
+def merge_session_cart(user_id, cart_data):
+    """
+    Fusionner le panier session dans le panier DB en un seul upsert
+    (index unique uq_cart_items_user_product, voir migrate_cart_unique.py)
+    """
+    products = session_cart_products(cart_data)
+    rows = [
+        {'user_id': user_id, 'product_id': int(product_id), 'quantity': quantity, 'added_at': datetime.utcnow()}
+        for product_id, quantity in cart_data.items()
+        if int(product_id) in products  # Ignorer les produits supprimés entre-temps
+    ]
+    if rows:
+        upsert_cart_items(rows)
+        bump_cart_version(user_id)
+
+# Moteur de promotions: codes Coupon et Promotion réunis dans un index en mémoire
+# Chaque processus a sa copie; la version partagée (cache) la fait recharger partout
+# dès qu'un processus modifie un code. L'utilisation est toujours vérifiée en base.
+app.config['PROMO_INDEX_TTL'] = 60  # secondes (filet de sécurité: écritures hors de l'application)
+
+class PromoCode:
+    """Code promo (coupon ou promotion) normalisé pour l'index en mémoire"""
+    
+    def __init__(self, source, promo_id, code, discount_type, discount_value, min_purchase,
+                 max_uses, used_count, is_active, valid_from, valid_until):
+        self.source = source  # 'coupon' ou 'promotion'
+        self.id = promo_id
+        self.code = code
+        self.discount_type = discount_type
+        self.discount_value = discount_value
+        self.min_purchase = min_purchase or 0
+        self.max_uses = max_uses
+        self.used_count = used_count or 0
+        self.is_active = is_active
+        self.valid_from = valid_from
+        self.valid_until = valid_until
+    
+    def is_valid(self):
+        """Vérifier si le code est utilisable maintenant"""
+        if not self.is_active:
+            return False
+        if self.max_uses and self.used_count >= self.max_uses:
+            return False
+        now = datetime.utcnow()
+        if self.valid_from and now < self.valid_from:
+            return False
+        if self.valid_until and now > self.valid_until:
+            return False
+        return True
+    
+    def calculate_discount(self, total):
+        """Calculer la réduction"""
+        if self.discount_type == 'percentage':
+            return total * (self.discount_value / 100)
+        else:  # fixed
+            return min(self.discount_value, total)
+
+promo_index = {}  # code -> PromoCode
+promo_index_state = {'loaded_at': None, 'version': None}
+promo_index_lock = threading.Lock()
+
+def promo_index_version():
+    """Version partagée de l'index (jeton changé à chaque écriture sur les codes promo)"""
+    version = cache.get('promo_index_version')
+    if version is None:
+        version = time.time_ns()
+        cache.set('promo_index_version', version, timeout=0)
+    return version
+
+def refresh_promo_index():
+    """Recharger tous les codes (coupons prioritaires sur les promotions de même code)"""
+    from models import Coupon, Promotion
+    version = promo_index_version()
+    index = {}
+    for promotion in Promotion.query.all():
+        index[promotion.code.upper()] = PromoCode(
+            'promotion', promotion.id, promotion.code, promotion.discount_type, promotion.discount_value,
+            promotion.min_purchase, promotion.max_uses, promotion.current_uses, promotion.is_active,
+            promotion.start_date, promotion.end_date
+        )
+    for coupon in Coupon.query.all():
+        index[coupon.code.upper()] = PromoCode(
+            'coupon', coupon.id, coupon.code, coupon.discount_type, coupon.discount_value,
+            coupon.min_purchase, coupon.max_uses, coupon.used_count, coupon.is_active,
+            coupon.valid_from, coupon.valid_until
+        )
+    
+    with promo_index_lock:
+        promo_index.clear()
+        promo_index.update(index)
+        promo_index_state['loaded_at'] = time.monotonic()
+        promo_index_state['version'] = version
+
+def invalidate_promo_index():
+    """Forcer le rechargement de l'index dans tous les processus après une écriture sur les codes promo"""
+    cache.set('promo_index_version', time.time_ns(), timeout=0)
+    with promo_index_lock:
+        promo_index_state['loaded_at'] = None
+
+def find_promo_code(code):
+    """Trouver un code promo dans l'index (rechargé s'il est absent, expiré ou modifié ailleurs)"""
+    loaded_at = promo_index_state['loaded_at']
+    if (loaded_at is None or time.monotonic() - loaded_at > app.config['PROMO_INDEX_TTL']
+            or promo_index_state['version'] != promo_index_version()):
+        refresh_promo_index()
+    return promo_index.get(code.upper())
+
+def redeem_promo_code(source, promo_id):
+    """
+    Incrémenter l'utilisation d'un code de façon atomique (dans la transaction
+    en cours): UPDATE ... WHERE used_count < max_uses, aucune sur-utilisation
+    même avec des commandes simultanées
+    
+    L'index en mémoire n'est pas modifié (la transaction peut encore être
+    annulée): l'appelant appelle invalidate_promo_index() après le commit.
+    
+    Returns:
+        bool: True si le code a été consommé, False s'il n'est plus valide
+    """
+    from models import Coupon, Promotion
+    model, counter, valid_from, valid_until = (
+        (Coupon, Coupon.used_count, Coupon.valid_from, Coupon.valid_until) if source == 'coupon'
+        else (Promotion, Promotion.current_uses, Promotion.start_date, Promotion.end_date)
+    )
+    now = datetime.utcnow()
+    updated = model.query.filter(
+        model.id == promo_id,
+        model.is_active == True,
+        db.or_(model.max_uses == None, model.max_uses == 0, db.func.coalesce(counter, 0) < model.max_uses),
+        db.or_(valid_from == None, valid_from <= now),
+        db.or_(valid_until == None, valid_until >= now)
+    ).update({counter: db.func.coalesce(counter, 0) + 1}, synchronize_session=False)
+    return bool(updated)
+
+# Moteur de prix du panier: un devis par (utilisateur, version du panier, code promo)
+SHIPPING_FEE = 30  # DH
+FREE_SHIPPING_THRESHOLD = 200  # DH, montant après réduction
+app.config['CART_QUOTE_TIMEOUT'] = 60  # secondes (borne la prise en compte d'un changement de prix)
+
+def cart_version(user_id):
+    """Version courante du panier DB (jeton changé à chaque modification)"""
+    key = f'cart_version_{user_id}'
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, timeout=0)
+    return version
+
+def bump_cart_version(user_id):
+    """Invalider les devis mémorisés après une modification du panier"""
+    cache.set(f'cart_version_{user_id}', time.time_ns(), timeout=0)
+
+def price_cart(user_id, coupon_code=''):
+    """
+    Calculer le devis du panier: sous-total (une requête agrégée), réduction du
+    code promo, frais de livraison et points fidélité gagnés (1 DH = 1 point)
+    
+    Returns:
+        dict: valeurs simples, mémorisables dans le cache
+    """
+    totals = cart_totals(user_id)
+    subtotal = totals['total']
+    quote = {
+        'count': totals['count'],
+        'items': totals['items'],
+        'subtotal': subtotal,
+        'discount': 0,
+        'promo': None,  # {'source', 'id', 'code'} du code appliqué
+        'coupon_error': None
+    }
+    
+    # Appliquer le code promo si fourni (index en mémoire, pas de requête)
+    if coupon_code:
+        coupon = find_promo_code(coupon_code)
+        if coupon and coupon.is_valid():
+            if subtotal >= coupon.min_purchase:
+                quote['discount'] = coupon.calculate_discount(subtotal)
+                quote['promo'] = {'source': coupon.source, 'id': coupon.id, 'code': coupon.code}
+            else:
+                quote['coupon_error'] = f'Achat minimum de {coupon.min_purchase} DH requis pour ce code promo.'
+        elif coupon:
+            quote['coupon_error'] = 'Ce code promo n\'est plus valide.'
+        else:
+            quote['coupon_error'] = 'Code promo invalide.'
+    
+    total = subtotal - quote['discount']
+    shipping_fee = SHIPPING_FEE if total < FREE_SHIPPING_THRESHOLD else 0
+    quote.update({
+        'total': total,
+        'shipping_fee': shipping_fee,
+        'final_total': total + shipping_fee,
+        'points_earned': int(round(total)),
+        'free_shipping_threshold': FREE_SHIPPING_THRESHOLD
+    })
+    return quote
+
+def get_cart_quote(user_id, coupon_code='', fresh=False):
+    """Devis mémorisé par version du panier (fresh=True pour le recalculer, ex: commande)"""
+    key = f'cart_quote_{user_id}_{cart_version(user_id)}_{coupon_code}'
+    if not fresh:
+        quote = cache.get(key)
+        if quote is not None:
+            return quote
+    
+    quote = price_cart(user_id, coupon_code)
+    cache.set(key, quote, timeout=app.config['CART_QUOTE_TIMEOUT'])
+    return quote
+
 @app.route('/cart')
 def cart():
     if current_user.is_authenticated:
-        # Panier DB pour utilisateurs connectés
-        cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
-        total = sum(item.product.price * item.quantity for item in cart_items)
+        # Panier DB pour utilisateurs connectés (produits chargés par jointure)
+        cart_items = CartItem.query.options(joinedload(CartItem.product)).filter_by(user_id=current_user.id).all()
+        # Même moteur de calcul que la commande (devis mémorisé par version du panier)
+        total = get_cart_quote(current_user.id)['subtotal']
     else:
         # Panier session pour visiteurs
         cart_data = session.get('cart', {})
-        cart_items = []
-        total = 0
-        
-        for product_id, quantity in cart_data.items():
-            product = Product.query.get(int(product_id))
-            if product:
-                # Créer un objet similaire à CartItem pour le template
-                class SessionCartItem:
-                    def __init__(self, product, quantity):
-                        self.product = product
-                        self.quantity = quantity
-                        self.id = f"session_{product.id}"
-                
-                cart_items.append(SessionCartItem(product, quantity))
-                total += product.price * quantity
+        products = session_cart_products(cart_data)
+        cart_items = [
+            SessionCartItem(products[int(product_id)], quantity)
+            for product_id, quantity in cart_data.items() if int(product_id) in products
+        ]
+        total = cart_totals()['total']
     
     return render_template('cart.html', cart_items=cart_items, total=total)
 
@@ -870,40 +2379,36 @@ def add_to_cart(product_id):
     product = Product.query.get_or_404(product_id)
     quantity = int(request.form.get('quantity', 1))
     
-    if current_user.is_authenticated:
-        # Panier DB pour utilisateurs connectés
-        cart_item = CartItem.query.filter_by(
-            user_id=current_user.id,
-            product_id=product_id
-        ).first()
-        
-        if cart_item:
-            cart_item.quantity += quantity
-        else:
-            cart_item = CartItem(
-                user_id=current_user.id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            db.session.add(cart_item)
-        
-        db.session.commit()
-    else:
-        # Panier session pour visiteurs
-        cart = session.get('cart', {})
-        product_id_str = str(product_id)
-        
-        if product_id_str in cart:
-            cart[product_id_str] += quantity
-        else:
-            cart[product_id_str] = quantity
-        
-        session['cart'] = cart
-        session.modified = True
+    add_product_to_cart(product, quantity)
     
     flash(f'{product.name} a été ajouté au panier!', 'success')
     return redirect(request.referrer or url_for('index'))
 
+@app.route('/api/cart/add/<int:product_id>', methods=['POST'])
+def api_add_to_cart(product_id):
+    """Variante JSON de add_to_cart (pas de redirection ni de rendu de page)"""
+    product = Product.query.get_or_404(product_id)
+    try:
+        quantity = int(request.form.get('quantity', 1))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Quantité invalide'}), 400
+    if quantity < 1:
+        return jsonify({'success': False, 'message': 'Quantité invalide'}), 400
+    
+    totals = add_product_to_cart(product, quantity)
+    
+    return jsonify({
+        'success': True,
+        'message': f'{product.name} a été ajouté au panier!',
+        'product': {'id': product.id, 'name': product.name, 'price': product.price},
+        **totals
+    })
+
+@app.route('/api/cart/count')
+def api_cart_count():
+    """Compteur du panier pour les badges (même source que le context processor)"""
+    return jsonify({'count': inject_cart_count()['cart_count']})
+
 @app.route('/remove_from_cart/<item_id>')
 def remove_from_cart(item_id):
     if current_user.is_authenticated:
@@ -912,6 +2417,8 @@ def remove_from_cart(item_id):
         if cart_item.user_id == current_user.id:
             db.session.delete(cart_item)
             db.session.commit()
+            adjust_cart_count(-1)
+            bump_cart_version(current_user.id)
             flash('Produit retiré du panier.', 'info')
     else:
         # Panier session
@@ -972,39 +2479,24 @@ def remove_from_wishlist(item_id):
 @app.route('/checkout', methods=['GET', 'POST'])
 @login_required
 def checkout():
-    from models import Coupon
-    cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
+    cart_items = CartItem.query.options(joinedload(CartItem.product)).filter_by(user_id=current_user.id).all()
     
     if not cart_items:
         flash('Votre panier est vide.', 'warning')
         return redirect(url_for('cart'))
     
-    # Calculer le total
-    subtotal = sum(item.product.price * item.quantity for item in cart_items)
-    discount = 0
-    coupon = None
+    # Calculer le total (devis mémorisé en GET, recalculé pour passer la commande)
     coupon_code = request.form.get('coupon_code', '').strip().upper() if request.method == 'POST' else ''
+    quote = get_cart_quote(current_user.id, coupon_code, fresh=request.method == 'POST')
+    if quote['coupon_error']:
+        flash(quote['coupon_error'], 'warning')
     
-    # Appliquer le coupon si fourni
-    if coupon_code:
-        coupon = Coupon.query.filter_by(code=coupon_code).first()
-        if coupon and coupon.is_valid():
-            if subtotal >= coupon.min_purchase:
-                discount = coupon.calculate_discount(subtotal)
-            else:
-                flash(f'Achat minimum de {coupon.min_purchase} DH requis pour ce code promo.', 'warning')
-                coupon = None
-        elif coupon:
-            flash('Ce code promo n\'est plus valide.', 'warning')
-            coupon = None
-        else:
-            flash('Code promo invalide.', 'warning')
-    
-    total = subtotal - discount
-    
-    # Calculer les frais de livraison
-    shipping_fee = 30 if total < 200 else 0
-    final_total = total + shipping_fee
+    coupon = quote['promo']
+    subtotal = quote['subtotal']
+    discount = quote['discount']
+    total = quote['total']
+    shipping_fee = quote['shipping_fee']
+    final_total = quote['final_total']
     
     if request.method == 'POST':
         action = request.form.get('action')
@@ -1023,9 +2515,11 @@ def checkout():
         db.session.add(order)
         db.session.flush()  # Récupérer l'ID de la commande
         
-        # Incrémenter l'utilisation du coupon
-        if coupon:
-            coupon.used_count += 1
+        # Incrémenter l'utilisation du code promo (atomique, pas de sur-utilisation)
+        if coupon and not redeem_promo_code(coupon['source'], coupon['id']):
+            db.session.rollback()
+            flash('Ce code promo n\'est plus valide.', 'warning')
+            return redirect(url_for('checkout'))
         
         # Générer le numéro de commande unique avec l'ID maintenant disponible
         order.order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{order.id:04d}"
@@ -1053,22 +2547,22 @@ def checkout():
             db.session.add(loyalty_account)
             db.session.flush()
         
-        # Calculer les points gagnés (arrondi à l'entier le plus proche)
-        points_earned = int(round(total))
-        loyalty_account.points += points_earned
-        loyalty_account.total_earned += points_earned
-        
-        # Créer une transaction de fidélité
-        loyalty_transaction = LoyaltyTransaction(
-            loyalty_id=loyalty_account.id,
-            points=points_earned,
-            transaction_type='purchase',
-            description=f'Achat - Commande {order.order_number}',
+        # Points gagnés (arrondi à l'entier le plus proche, calculés par le devis)
+        points_earned = quote['points_earned']
+        record_loyalty_transaction(
+            loyalty_account.id,
+            points_earned,
+            'purchase',
+            f'Achat - Commande {order.order_number}',
             order_id=order.id
         )
-        db.session.add(loyalty_transaction)
         
         db.session.commit()
+        reset_cart_count(0)
+        bump_cart_version(current_user.id)
+        if coupon:
+            # Utilisation validée: recharger le compteur du code dans tous les processus
+            invalidate_promo_index()
         
         # Créer une notification pour l'admin
         create_notification(
@@ -1150,6 +2644,8 @@ def checkout():
                          shipping_fee=shipping_fee,
                          final_total=final_total,
                          coupon=coupon,
+                         points_earned=quote['points_earned'],
+                         free_shipping_threshold=quote['free_shipping_threshold'],
                          loyalty_points=loyalty_points)
 
 @app.route('/order/<int:order_id>')
@@ -1161,13 +2657,159 @@ def order_confirmation(order_id):
         return redirect(url_for('index'))
     return render_template('order_confirmation.html', order=order)
 
+# ========== JOURNAL FIDÉLITÉ ==========
+# loyalty_transactions est un journal en ajout seul: chaque ligne porte le solde
+# du compte après l'opération (balance_after). L'historique se lit par pages via
+# un curseur sur l'index (loyalty_id, created_at, id), sans jamais relire tout le
+# journal; la cohérence solde / journal est vérifiée par reconcile_loyalty_accounts()
+# lancée périodiquement par maintenance.py.
+app.config['LOYALTY_HISTORY_PAGE_SIZE'] = 20
+
+# Niveaux fidélité: nom:seuil de points gagnés (total_earned), une seule table pour tout le site
+app.config['LOYALTY_TIERS'] = os.environ.get('LOYALTY_TIERS', 'bronze:0,silver:500,gold:1000,platinum:2000')
+loyalty_tiers = []
+
+def load_loyalty_tiers():
+    """
+    Lire la table des niveaux depuis la configuration (une fois, puis en mémoire)
+    
+    Returns:
+        list: [(seuil, nom), ...] trié par seuil croissant
+    """
+    tiers = []
+    for entry in app.config['LOYALTY_TIERS'].split(','):
+        name, threshold = entry.split(':')
+        tiers.append((int(threshold), name.strip().lower()))
+    loyalty_tiers[:] = sorted(tiers)
+    return loyalty_tiers
+
+def loyalty_tier_expression(total_earned):
+    """Expression SQL CASE donnant le niveau pour une valeur de total_earned"""
+    from sqlalchemy import case
+    tiers = loyalty_tiers or load_loyalty_tiers()
+    return case(
+        *[(total_earned >= threshold, name) for threshold, name in reversed(tiers[1:])],
+        else_=tiers[0][1]
+    )
+
+
+def record_loyalty_transaction(account_id, points, transaction_type, description, **fields):
+    """
+    Appliquer un mouvement de points au compte et l'inscrire au journal, dans la
+    transaction en cours (commit par l'appelant)
+    
+    Le solde est modifié par un UPDATE atomique côté base; pour une dépense,
+    la condition points >= montant est vérifiée dans ce même UPDATE: deux
+    échanges simultanés ne peuvent pas rendre le solde négatif. Le solde relu
+    ensuite est celui de notre écriture (la ligne reste verrouillée jusqu'au commit).
+    
+    Args:
+        account_id: id du LoyaltyPoints
+        points: positif = gagné, négatif = dépensé
+        
+    Returns:
+        LoyaltyTransaction: ligne ajoutée au journal, ou None si points insuffisants
+    """
+    from sqlalchemy import func
+    values = {
+        LoyaltyPoints.points: func.coalesce(LoyaltyPoints.points, 0) + points,
+        LoyaltyPoints.updated_at: datetime.utcnow()
+    }
+    if points >= 0:
+        # Le niveau ne dépend que de total_earned: recalculé dans le même UPDATE
+        total_earned = func.coalesce(LoyaltyPoints.total_earned, 0) + points
+        values[LoyaltyPoints.total_earned] = total_earned
+        values[LoyaltyPoints.tier] = loyalty_tier_expression(total_earned)
+    else:
+        values[LoyaltyPoints.total_spent] = func.coalesce(LoyaltyPoints.total_spent, 0) - points
+    
+    conditions = [LoyaltyPoints.id == account_id]
+    if points < 0:
+        conditions.append(LoyaltyPoints.points >= -points)
+    
+    if not LoyaltyPoints.query.filter(*conditions).update(values, synchronize_session=False):
+        return None
+    
+    balance_after = db.session.query(LoyaltyPoints.points).filter(LoyaltyPoints.id == account_id).scalar()
+    transaction = LoyaltyTransaction(
+        loyalty_id=account_id,
+        points=points,
+        balance_after=balance_after,
+        transaction_type=transaction_type,
+        description=description,
+        **fields
+    )
+    db.session.add(transaction)
+    return transaction
+
+def spend_points_on_reward(account_id, reward, cost, transaction_type, description):
+    """
+    Échanger des points contre une récompense (routes /rewards et /loyalty)
+    
+    Args:
+        cost: points déduits, ceux que la route a vérifiés et affichés
+    
+    Returns:
+        LoyaltyTransaction: ligne du journal, ou None si points insuffisants
+    """
+    from sqlalchemy import func
+    transaction = record_loyalty_transaction(
+        account_id,
+        -cost,
+        transaction_type,
+        description,
+        reward_id=reward.id
+    )
+    if transaction:
+        LoyaltyReward.query.filter(LoyaltyReward.id == reward.id).update(
+            {LoyaltyReward.times_redeemed: func.coalesce(LoyaltyReward.times_redeemed, 0) + 1},
+            synchronize_session=False
+        )
+    return transaction
+
+def loyalty_history_page(loyalty_id, before_id=None, per_page=None):
+    """
+    Une page de l'historique, de la plus récente à la plus ancienne
+    
+    Pagination par curseur: `before_id` est la dernière transaction de la page
+    précédente, la page suivante commence juste après elle dans l'ordre
+    (created_at, id). Le coût ne dépend pas de la profondeur de la page.
+    
+    Returns:
+        tuple: (transactions, curseur de la page suivante ou None)
+    """
+    from sqlalchemy import or_, and_
+    per_page = per_page or app.config['LOYALTY_HISTORY_PAGE_SIZE']
+    query = LoyaltyTransaction.query.filter(LoyaltyTransaction.loyalty_id == loyalty_id)
+    
+    if before_id:
+        anchor = db.session.query(LoyaltyTransaction.created_at).filter(
+            LoyaltyTransaction.id == before_id,
+            LoyaltyTransaction.loyalty_id == loyalty_id
+        ).scalar()
+        if anchor is not None:
+            query = query.filter(or_(
+                LoyaltyTransaction.created_at < anchor,
+                and_(LoyaltyTransaction.created_at == anchor, LoyaltyTransaction.id < before_id)
+            ))
+    
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    transactions = query.order_by(
+        LoyaltyTransaction.created_at.desc(),
+        LoyaltyTransaction.id.desc()
+    ).limit(per_page + 1).all()
+    
+    next_cursor = transactions[per_page - 1].id if len(transactions) > per_page else None
+    return transactions[:per_page], next_cursor
+
 # Route Programme Fidélité
 @app.route('/rewards')
 def rewards():
     """Page du programme fidélité"""
     loyalty_points = None
     transactions = []
-    current_lang = get_locale()
+    next_cursor = None
+    current_lang = session.get('lang', 'fr')
     
     if current_user.is_authenticated:
         # Récupérer ou créer le compte fidélité de l'utilisateur
@@ -1177,10 +2819,11 @@ def rewards():
             db.session.add(loyalty_points)
             db.session.commit()
         
-        # Récupérer l'historique des transactions
-        transactions = LoyaltyTransaction.query.filter_by(
-            loyalty_id=loyalty_points.id
-        ).order_by(LoyaltyTransaction.created_at.desc()).all()
+        # Récupérer une page de l'historique des transactions
+        transactions, next_cursor = loyalty_history_page(
+            loyalty_points.id,
+            before_id=request.args.get('avant', type=int)
+        )
     
     # Récupérer les récompenses disponibles
     rewards = LoyaltyReward.query.filter_by(is_active=True).order_by(LoyaltyReward.points_required).all()
@@ -1197,6 +2840,7 @@ def rewards():
     return render_template('rewards.html',
                          loyalty_points=loyalty_points,
                          transactions=transactions,
+                         next_cursor=next_cursor,
                          rewards=rewards,
                          current_lang=current_lang)
 
@@ -1211,28 +2855,17 @@ def redeem_reward(reward_id):
         flash('Vous n\'avez pas encore de compte fidélité.', 'warning')
         return redirect(url_for('rewards'))
     
-    # Vérifier si l'utilisateur a assez de points
-    if loyalty_points.points < reward.points_required:
+    # Vérifier si l'utilisateur a assez de points (coût affiché par rewards.html)
+    cost = reward.points_required
+    if loyalty_points.points < cost:
         flash('Points insuffisants pour cette récompense.', 'warning')
         return redirect(url_for('rewards'))
     
-    # Déduire les points
-    loyalty_points.points -= reward.points_required
-    loyalty_points.total_spent += reward.points_required
-    
-    # Créer une transaction
-    transaction = LoyaltyTransaction(
-        loyalty_id=loyalty_points.id,
-        points=-reward.points_required,
-        balance_after=loyalty_points.points,
-        transaction_type='redemption',
-        description=f'Échange - {reward.name}',
-        reward_id=reward_id
-    )
-    db.session.add(transaction)
-    
-    # Incrémenter le compteur d'utilisation de la récompense
-    reward.times_redeemed += 1
+    # Déduire les points (atomique) et inscrire la transaction au journal
+    if not spend_points_on_reward(loyalty_points.id, reward, cost, 'redemption', f'Échange - {reward.name}'):
+        db.session.rollback()
+        flash('Points insuffisants pour cette récompense.', 'warning')
+        return redirect(url_for('rewards'))
     
     db.session.commit()
     
@@ -1253,26 +2886,25 @@ def admin_login():
     ip_address = request.remote_addr
     
     if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        
         # Vérifier les tentatives de connexion
-        allowed, error_message = check_login_attempts(ip_address)
+        allowed, error_message = check_login_attempts(ip_address, email)
         if not allowed:
             flash(error_message, 'danger')
-            return render_template('/admin/admin_login.html'), 429  # Too Many Requests
-        
-        email = request.form.get('email')
-        password = request.form.get('password')
+            return render_template('admin_login.html'), 429  # Too Many Requests
         
         user = User.query.filter_by(email=email).first()
         
         # Vérifier que l'utilisateur existe ET qu'il est admin
-        if user and user.is_admin and bcrypt.check_password_hash(user.password, password):
+        if user and user.is_admin and verify_password(user.password, password):
             # Connexion admin réussie
+            rehash_password_if_needed(user, password)
             record_login_attempt(ip_address, user.username, True)
+            reset_login_failures(ip_address, email)
             login_user(user, remember=True)
-            
-            # Nettoyer les anciennes tentatives échouées
-            LoginAttempt.query.filter_by(ip_address=ip_address, success=False).delete()
-            db.session.commit()
+            reset_cart_count()
             
             flash(f'Bienvenue Administrateur {user.username}!', 'success')
             return redirect(url_for('admin_dashboard'))
@@ -1281,12 +2913,7 @@ def admin_login():
             record_login_attempt(ip_address, email, False)
             
             # Compter les tentatives restantes
-            cutoff_time = datetime.utcnow() - timedelta(minutes=15)
-            remaining_attempts = 5 - LoginAttempt.query.filter(
-                LoginAttempt.ip_address == ip_address,
-                LoginAttempt.attempt_time > cutoff_time,
-                LoginAttempt.success == False
-            ).count()
+            remaining_attempts = register_login_failure(ip_address, email)
             
             if remaining_attempts > 0:
                 flash(f'Identifiants admin incorrects. Il vous reste {remaining_attempts} tentative(s).', 'danger')
@@ -1564,6 +3191,7 @@ def admin_add_brand():
                     filename = f"brand_{new_brand.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
                     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                     file.save(filepath)
+                    schedule_image_processing(filepath)
                     logo_url = f"uploads/{filename}"
                     new_brand.logo_url = logo_url
                 else:
@@ -1602,6 +3230,7 @@ def admin_edit_brand(brand_id):
                     filename = f"brand_{brand.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
                     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                     file.save(filepath)
+                    schedule_image_processing(filepath)
                     brand.logo_url = f"uploads/{filename}"
                 else:
                     flash('Format d\'image non supporté. Utilisez PNG, JPG, JPEG, GIF, SVG ou WEBP.', 'warning')
@@ -1687,6 +3316,7 @@ def admin_add_coupon():
     
     db.session.add(coupon)
     db.session.commit()
+    invalidate_promo_index()
     
     flash(f'Code promo "{code}" créé avec succès !', 'success')
     return redirect(url_for('admin_coupons'))
@@ -1698,6 +3328,7 @@ def admin_toggle_coupon(coupon_id):
     coupon = Coupon.query.get_or_404(coupon_id)
     coupon.is_active = not coupon.is_active
     db.session.commit()
+    invalidate_promo_index()
     
     status = "activé" if coupon.is_active else "désactivé"
     flash(f'Code promo "{coupon.code}" {status} avec succès !', 'success')
@@ -1711,6 +3342,7 @@ def admin_delete_coupon(coupon_id):
     code = coupon.code
     db.session.delete(coupon)
     db.session.commit()
+    invalidate_promo_index()
     flash(f'Code promo "{code}" supprimé avec succès !', 'success')
     return redirect(url_for('admin_coupons'))
 
@@ -1754,6 +3386,7 @@ def admin_add_product():
                     filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
                     filepath = os.path.join('static', 'uploads', filename)
                     file.save(filepath)
+                    schedule_image_processing(filepath)
                     image_url = filename
                 else:
                     flash('Format d\'image non supporté. Utilisez PNG, JPG, JPEG, GIF ou WEBP.', 'warning')
@@ -1814,11 +3447,13 @@ def admin_edit_product(product_id):
                         old_image_path = os.path.join('static', 'uploads', product.image_url)
                         if os.path.exists(old_image_path):
                             os.remove(old_image_path)
+                        remove_image_variants(old_image_path)
                     
                     filename = secure_filename(file.filename)
                     filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
                     filepath = os.path.join('static', 'uploads', filename)
                     file.save(filepath)
+                    schedule_image_processing(filepath)
                     product.image_url = filename
                 else:
                     flash('Format d\'image non supporté.', 'warning')
@@ -1828,7 +3463,8 @@ def admin_edit_product(product_id):
         return redirect(url_for('admin_products'))
     
     categories = Category.query.all()
-    return render_template('admin/edit_product.html', product=product, categories=categories)
+    image_status = get_image_status(f'uploads/{product.image_url}') if product.image_url else None
+    return render_template('admin/edit_product.html', product=product, categories=categories, image_status=image_status)
 
 @app.route('/admin/products/delete/<int:product_id>', methods=['POST'])
 @admin_required
@@ -2091,8 +3727,10 @@ def update_cart_quantity():
         cart_item = CartItem.query.get_or_404(int(item_id))
         
         if cart_item.user_id == current_user.id:
+            # Le nombre de lignes ne change pas: cart_count en session reste valide
             cart_item.quantity = quantity
             db.session.commit()
+            bump_cart_version(current_user.id)
             return jsonify({'success': True, 'message': 'Quantité mise à jour'})
         
         return jsonify({'success': False, 'message': 'Accès refusé'}), 403
@@ -2112,8 +3750,12 @@ def update_cart_quantity():
 
 @app.route('/api/search')
 def search_products():
+    change = last_change(Product)
+    return conditional_response(content_etag('api_search', request.full_path, change), change[0], render_search_products, private=False)
+
+def render_search_products():
     query = request.args.get('q', '')
-    products = Product.query.filter(Product.name.contains(query)).limit(10).all()
+    products = Product.query.filter(product_search_filter(query, ('name',))).limit(10).all()
     results = [{
         'id': p.id,
         'name': p.name,
@@ -2183,13 +3825,153 @@ def filter_products_ajax():
     })
 
 # ===== ROUTES BLOG =====
+# Le contenu TinyMCE est nettoyé et rendu en HTML à l'enregistrement (content_html,
+# content_en_html): l'affichage d'un article ne fait plus aucun traitement du contenu.
+# Les listes sont mises en cache par (page, catégorie, langue) et invalidées par la
+# version du blog lue en base (last_change): un article ajouté, modifié, publié ou
+# supprimé par l'administration (autre processus) change la clé partout.
+from html.parser import HTMLParser
+from html import escape as html_escape
+
+app.config['BLOG_LIST_CACHE_TIMEOUT'] = 300  # secondes (borne aussi le retard du nombre de vues)
+
+BLOG_ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'b', 'em', 'i', 'u', 's',
+    'blockquote', 'ul', 'ol', 'li', 'a', 'img', 'figure', 'figcaption', 'span', 'div',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td', 'pre', 'code', 'sub', 'sup'
+}
+BLOG_ALLOWED_ATTRIBUTES = {
+    '*': {'class', 'style'},
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'th': {'colspan', 'rowspan'},
+    'td': {'colspan', 'rowspan'}
+}
+BLOG_DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'svg', 'math'}
+BLOG_VOID_TAGS = {'br', 'hr', 'img'}
+
+class BlogHTMLSanitizer(HTMLParser):
+    """Nettoyage par liste blanche du HTML produit par l'éditeur du blog"""
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output = []
+        self.open_tags = []
+        self.dropped_depth = 0
+    
+    @staticmethod
+    def safe_url(value):
+        """
+        URL nettoyée, ou None si son schéma est refusé (javascript:, data:, vbscript: ...)
+        Liens relatifs, http(s) et mailto acceptés.
+        
+        Les navigateurs ignorent tabulations, retours à la ligne et caractères de contrôle
+        dans une URL ("java\tscript:" s'exécute): le schéma est lu sans eux ni espaces.
+        Les références de caractères (java&#9;script:) sont déjà décodées par HTMLParser.
+        """
+        url = re.sub(r'[\x00-\x1f\x7f]', '', value).strip()
+        scheme = re.match(r'([^/?#]*?):', re.sub(r'\s', '', url))
+        if scheme and scheme.group(1).lower() not in ('http', 'https', 'mailto'):
+            return None
+        return url
+    
+    def clean_attributes(self, tag, attrs):
+        allowed = BLOG_ALLOWED_ATTRIBUTES['*'] | BLOG_ALLOWED_ATTRIBUTES.get(tag, set())
+        cleaned = []
+        for name, value in attrs:
+            value = value or ''
+            if name not in allowed:
+                continue
+            if name in ('href', 'src'):
+                value = self.safe_url(value)
+                if value is None:
+                    continue
+            if name == 'style' and re.search(r'url\(|expression|javascript:', re.sub(r'[\x00-\x20\x7f]', '', value), re.IGNORECASE):
+                continue
+            cleaned.append((name, value))
+        if tag == 'a' and ('target', '_blank') in cleaned:
+            cleaned.append(('rel', 'noopener noreferrer'))
+        if tag == 'img':
+            cleaned.append(('loading', 'lazy'))
+        return ''.join(f' {name}="{html_escape(value)}"' for name, value in cleaned)
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOG_DROPPED_TAGS:
+            self.dropped_depth += 1
+        elif not self.dropped_depth and tag in BLOG_ALLOWED_TAGS:
+            self.output.append(f'<{tag}{self.clean_attributes(tag, attrs)}>')
+            if tag not in BLOG_VOID_TAGS:
+                self.open_tags.append(tag)
+    
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.open_tags and tag not in BLOG_VOID_TAGS:
+            self.handle_endtag(tag)
+    
+    def handle_endtag(self, tag):
+        if tag in BLOG_DROPPED_TAGS:
+            self.dropped_depth = max(0, self.dropped_depth - 1)
+        elif not self.dropped_depth and tag in self.open_tags:
+            # Fermer aussi les balises restées ouvertes à l'intérieur
+            while self.open_tags:
+                open_tag = self.open_tags.pop()
+                self.output.append(f'</{open_tag}>')
+                if open_tag == tag:
+                    break
+    
+    def handle_data(self, data):
+        if not self.dropped_depth:
+            self.output.append(html_escape(data, quote=False))
+    
+    def render(self, content):
+        self.feed(content or '')
+        self.close()
+        self.output.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        return ''.join(self.output)
+
+def render_blog_content(content):
+    """HTML nettoyé d'un contenu d'article (None si vide)"""
+    if not content:
+        return None
+    return BlogHTMLSanitizer().render(content)
+
+def blog_version():
+    """
+    Version courante du blog: une requête agrégée (max(updated_at), nombre)
+    
+    Lue en base et non dans le cache: les processus admin et client ne partagent
+    pas leur mémoire. Les vues (flush_blog_views) ne modifient pas updated_at.
+    """
+    return content_etag(*last_change(BlogPost))
+
+def blog_lang():
+    """Langue d'affichage du blog"""
+    return session.get('lang', 'fr')
+
 @app.route('/blog')
 def blog():
     """Liste des articles de blog avec pagination"""
     page = request.args.get('page', 1, type=int)
     category = request.args.get('category')
     search = request.args.get('search', '')
-    
+    lang = blog_lang()
+    
+    # Liste déjà rendue pour (page, catégorie, langue): aucune requête SQL
+    cache_key = f'blog_list_{blog_version()}_{page}_{category}_{lang}'
+    listing = None if search else cache.get(cache_key)
+    if listing is None:
+        listing = render_blog_list(page, category, search, lang)
+        if not search:
+            cache.set(cache_key, listing, timeout=app.config['BLOG_LIST_CACHE_TIMEOUT'])
+    
+    return render_template('blog.html',
+                         blog_list_html=Markup(listing['html']),
+                         total=listing['total'],
+                         current_category=category,
+                         search=search)
+
+def render_blog_list(page, category, search, lang):
+    """Rendre la grille d'articles et la pagination d'une page de la liste"""
     query = BlogPost.query.filter_by(is_published=True)
     
     # Filtre par catégorie
@@ -2209,39 +3991,108 @@ def blog():
         page=page, per_page=6, error_out=False
     )
     
-    posts = pagination.items
-    
-    # Catégories de blog disponibles
-    blog_categories = db.session.query(BlogPost.blog_category).filter(
-        BlogPost.is_published == True,
-        BlogPost.blog_category.isnot(None)
-    ).distinct().all()
-    blog_categories = [cat[0] for cat in blog_categories if cat[0]]
-    
-    return render_template('blog.html', 
-                         posts=posts, 
+    html = render_template('includes/blog_list.html',
+                         posts=pagination.items,
                          pagination=pagination,
-                         blog_categories=blog_categories,
                          current_category=category,
-                         search=search)
+                         lang=lang)
+    return {'html': html, 'total': pagination.total}
+
+# Compteur de vues du blog: cumulé en mémoire et écrit par lots, la lecture
+# d'un article ne déclenche plus de transaction d'écriture sur la base
+app.config['BLOG_VIEWS_FLUSH_INTERVAL'] = 30  # secondes
+app.config['BLOG_VIEWS_FLUSH_SIZE'] = 200  # vues en attente avant écriture anticipée
+
+blog_views_pending = {}  # post_id -> vues non encore écrites
+blog_views_state = {'thread': None, 'total': 0}
+blog_views_lock = threading.Lock()
+blog_views_wakeup = threading.Event()
+
+def flush_blog_views():
+    """Écrire les vues en attente en un seul UPDATE groupé (executemany)"""
+    from sqlalchemy import bindparam, func
+    with blog_views_lock:
+        if not blog_views_pending:
+            return 0
+        counts = dict(blog_views_pending)
+        blog_views_pending.clear()
+        blog_views_state['total'] = 0
+    
+    table = BlogPost.__table__
+    statement = table.update().where(table.c.id == bindparam('post_id')).values(
+        views=func.coalesce(table.c.views, 0) + bindparam('count'),
+        # Sans cela onupdate avance updated_at: chaque lot de vues invaliderait le cache du blog
+        updated_at=table.c.updated_at
+    )
+    with app.app_context():
+        try:
+            db.session.execute(statement, [{'post_id': post_id, 'count': count} for post_id, count in counts.items()])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erreur écriture des vues du blog: {e}")
+            # Remettre les vues en attente pour le prochain lot
+            with blog_views_lock:
+                for post_id, count in counts.items():
+                    blog_views_pending[post_id] = blog_views_pending.get(post_id, 0) + count
+                    blog_views_state['total'] += count
+            return 0
+    return sum(counts.values())
+
+def blog_views_writer():
+    """Thread d'écriture: un lot toutes les BLOG_VIEWS_FLUSH_INTERVAL secondes ou dès BLOG_VIEWS_FLUSH_SIZE vues"""
+    while True:
+        blog_views_wakeup.wait(app.config['BLOG_VIEWS_FLUSH_INTERVAL'])
+        blog_views_wakeup.clear()
+        flush_blog_views()
+
+def record_blog_view(post_id):
+    """Compter une vue d'article (écriture différée, par lots)"""
+    with blog_views_lock:
+        blog_views_pending[post_id] = blog_views_pending.get(post_id, 0) + 1
+        blog_views_state['total'] += 1
+        if blog_views_state['total'] >= app.config['BLOG_VIEWS_FLUSH_SIZE']:
+            blog_views_wakeup.set()
+        if blog_views_state['thread'] is None:
+            blog_views_state['thread'] = threading.Thread(target=blog_views_writer, daemon=True)
+            blog_views_state['thread'].start()
+
+# Ne pas perdre les vues en attente à l'arrêt
+atexit.register(flush_blog_views)
 
 @app.route('/blog/<slug>')
 def blog_post(slug):
     """Afficher un article de blog"""
     post = BlogPost.query.filter_by(slug=slug, is_published=True).first_or_404()
     
-    # Incrémenter les vues
-    post.views += 1
-    db.session.commit()
+    # Incrémenter les vues (écrites par lots, affichées avec quelques secondes de décalage)
+    record_blog_view(post.id)
     
-    # Articles similaires (même catégorie)
-    related_posts = BlogPost.query.filter(
-        BlogPost.blog_category == post.blog_category,
-        BlogPost.id != post.id,
-        BlogPost.is_published == True
-    ).limit(3).all()
+    lang = blog_lang()
+    last_modified = post.updated_at or post.created_at
     
-    return render_template('blog_post.html', post=post, related_posts=related_posts)
+    def render():
+        # Contenu déjà nettoyé à l'enregistrement (repli sur le contenu brut avant migration)
+        if lang == 'en' and post.content_en:
+            content_html = post.content_en_html or post.content_en
+        else:
+            content_html = post.content_html or post.content
+        
+        # Articles similaires (même catégorie)
+        related_posts = BlogPost.query.filter(
+            BlogPost.blog_category == post.blog_category,
+            BlogPost.id != post.id,
+            BlogPost.is_published == True
+        ).limit(3).all()
+        
+        return render_template('blog_post.html', post=post, content_html=content_html, related_posts=related_posts)
+    
+    # Lecteur qui revient sur un article inchangé: 304 sans rendu
+    return conditional_response(
+        page_etag('blog_post', post.id, last_modified, lang, blog_version()),
+        last_modified,
+        render
+    )
 
 # ===== ROUTES PROGRAMME FIDELITÉ =====
 @app.route('/loyalty')
@@ -2256,9 +4107,7 @@ def loyalty_program():
         db.session.commit()
     
     # Récupérer les transactions récentes
-    transactions = LoyaltyTransaction.query.filter_by(
-        loyalty_id=loyalty_account.id
-    ).order_by(LoyaltyTransaction.created_at.desc()).limit(20).all()
+    transactions, _ = loyalty_history_page(loyalty_account.id)
     
     # Récupérer les récompenses disponibles
     rewards = LoyaltyReward.query.filter_by(is_active=True).order_by(LoyaltyReward.points_cost).all()
@@ -2279,23 +4128,17 @@ def redeem_loyalty_reward(reward_id):
         flash('Compte de fidélité introuvable.', 'danger')
         return redirect(url_for('loyalty_program'))
     
-    # Vérifier si l'utilisateur a assez de points
-    if loyalty_account.points < reward.points_cost:
-        flash(f'Points insuffisants. Il vous manque {reward.points_cost - loyalty_account.points} points.', 'warning')
+    # Vérifier si l'utilisateur a assez de points (coût saisi par l'admin)
+    cost = reward.points_cost if reward.points_cost is not None else reward.points_required
+    if loyalty_account.points < cost:
+        flash(f'Points insuffisants. Il vous manque {cost - loyalty_account.points} points.', 'warning')
         return redirect(url_for('loyalty_program'))
     
-    # Déduire les points
-    loyalty_account.points -= reward.points_cost
-    loyalty_account.total_spent += reward.points_cost
-    
-    # Créer une transaction
-    transaction = LoyaltyTransaction(
-        loyalty_id=loyalty_account.id,
-        points=-reward.points_cost,
-        transaction_type='reward',
-        description=f'Récompense : {reward.name}'
-    )
-    db.session.add(transaction)
+    # Déduire les points (atomique) et inscrire la transaction au journal
+    if not spend_points_on_reward(loyalty_account.id, reward, cost, 'reward', f'Récompense : {reward.name}'):
+        db.session.rollback()
+        flash('Points insuffisants pour cette récompense.', 'warning')
+        return redirect(url_for('loyalty_program'))
     
     # Si la récompense est une réduction, créer un coupon
     if reward.reward_type == 'discount':
@@ -2317,6 +4160,7 @@ def redeem_loyalty_reward(reward_id):
         )
         db.session.add(coupon)
         db.session.commit()
+        invalidate_promo_index()
         
         flash(f'Félicitations ! Votre code promo : {code} (valide 30 jours)', 'success')
     else:
@@ -2389,6 +4233,7 @@ def admin_add_blog_post():
                     filename = f"blog_{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
                     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                     file.save(filepath)
+                    schedule_image_processing(filepath)
                     image_url = f"uploads/{filename}"
         
         # Récupérer slug ou générer
@@ -2420,6 +4265,8 @@ def admin_add_blog_post():
             slug=slug,
             content=content,
             content_en=content_en,
+            content_html=render_blog_content(content),
+            content_en_html=render_blog_content(content_en),
             excerpt=excerpt,
             excerpt_en=excerpt_en,
             blog_category=blog_category,
@@ -2446,6 +4293,8 @@ def admin_edit_blog_post(post_id):
         post.title_en = request.form.get('title_en')
         post.content = request.form.get('content')
         post.content_en = request.form.get('content_en')
+        post.content_html = render_blog_content(post.content)
+        post.content_en_html = render_blog_content(post.content_en)
         post.excerpt = request.form.get('excerpt')
         post.excerpt_en = request.form.get('excerpt_en')
         post.blog_category = request.form.get('blog_category')
@@ -2466,6 +4315,7 @@ def admin_edit_blog_post(post_id):
                     filename = f"blog_{datetime.now().strftime('%Y%m%d%H%M%S')}_{filename}"
                     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                     file.save(filepath)
+                    schedule_image_processing(filepath)
                     post.image_url = f"uploads/{filename}"
         
         post.updated_at = datetime.utcnow()
@@ -2490,6 +4340,7 @@ def admin_delete_blog_post(post_id):
 @admin_required
 def admin_loyalty():
     """Gestion du programme de fidélité"""
+    from sqlalchemy import func
     rewards = LoyaltyReward.query.order_by(LoyaltyReward.points_cost).all()
     
     # Statistiques
@@ -2497,7 +4348,6 @@ def admin_loyalty():
     total_points_redeemed = db.session.query(func.sum(LoyaltyPoints.total_spent)).scalar() or 0
     active_members = LoyaltyPoints.query.filter(LoyaltyPoints.points > 0).count()
     
-    from sqlalchemy import func
     stats = {
         'total_distributed': total_points_distributed,
         'total_redeemed': total_points_redeemed,
@@ -2581,6 +4431,7 @@ def admin_create_promo():
         
         db.session.add(new_coupon)
         db.session.commit()
+        invalidate_promo_index()
         
         flash(f'Promotion {code} créée avec succès!', 'success')
     except Exception as e:
@@ -2604,22 +4455,242 @@ def admin_newsletter():
                          total_users=total_users,
                          total_customers=total_customers)
 
+# ==================== MAINTENANCE DE LA BASE ====================
+# Rétention, résumés journaliers et optimisation SQLite (lancé par maintenance.py)
+app.config['LOGIN_ATTEMPTS_RETENTION_DAYS'] = int(os.environ.get('LOGIN_ATTEMPTS_RETENTION_DAYS', 30))
+app.config['NOTIFICATIONS_RETENTION_DAYS'] = int(os.environ.get('NOTIFICATIONS_RETENTION_DAYS', 90))  # Notifications lues
+app.config['LOYALTY_COMPACT_AFTER_DAYS'] = int(os.environ.get('LOYALTY_COMPACT_AFTER_DAYS', 730))
+app.config['MAINTENANCE_BATCH_SIZE'] = 500
+app.config['MAINTENANCE_BATCH_PAUSE'] = 0.05  # secondes entre deux lots (laisser passer les écritures du site)
+
+def delete_in_batches(model, *criteria):
+    """Supprimer par petits lots: le verrou d'écriture SQLite n'est jamais tenu longtemps"""
+    total = 0
+    while True:
+        ids = [row[0] for row in db.session.query(model.id).filter(*criteria).limit(app.config['MAINTENANCE_BATCH_SIZE']).all()]
+        if not ids:
+            return total
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        total += len(ids)
+        time.sleep(app.config['MAINTENANCE_BATCH_PAUSE'])
+
+def login_summary_cutoff():
+    """Début du premier jour non résumé (None si aucun résumé)"""
+    from sqlalchemy import func
+    last_day = db.session.query(func.max(LoginAttemptDaily.day)).scalar()
+    if not last_day:
+        return None
+    return datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+
+def rollup_login_attempts():
+    """Résumer par jour et par IP les journées terminées qui ne le sont pas encore"""
+    from sqlalchemy import func, case
+    from datetime import date
+    
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = login_summary_cutoff()
+    day = func.date(LoginAttempt.attempt_time)
+    query = db.session.query(
+        day,
+        LoginAttempt.ip_address,
+        func.sum(case((LoginAttempt.success == True, 1), else_=0)),
+        func.sum(case((LoginAttempt.success == True, 0), else_=1))
+    ).filter(LoginAttempt.attempt_time < today_start)
+    if cutoff:
+        query = query.filter(LoginAttempt.attempt_time >= cutoff)
+    
+    rows = query.group_by(day, LoginAttempt.ip_address).all()
+    for row_day, ip_address, success_count, failed_count in rows:
+        db.session.add(LoginAttemptDaily(
+            day=row_day if isinstance(row_day, date) else date.fromisoformat(row_day),
+            ip_address=ip_address,
+            success_count=success_count,
+            failed_count=failed_count
+        ))
+    db.session.commit()
+    return len(rows)
+
+def purge_login_attempts(days=None):
+    """Résumer puis supprimer les tentatives plus anciennes que la rétention"""
+    days = max(1, days or app.config['LOGIN_ATTEMPTS_RETENTION_DAYS'])  # Jamais la journée en cours (non résumée)
+    rollup_login_attempts()
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return delete_in_batches(LoginAttempt, LoginAttempt.attempt_time < cutoff)
+
+def purge_notifications(days=None):
+    """Supprimer les notifications lues plus anciennes que la rétention"""
+    cutoff = datetime.utcnow() - timedelta(days=days or app.config['NOTIFICATIONS_RETENTION_DAYS'])
+    return delete_in_batches(Notification, Notification.is_read == True, Notification.created_at < cutoff)
+
+def compact_loyalty_transactions(days=None):
+    """
+    Regrouper les anciennes transactions fidélité de chaque compte en une seule
+    ligne de report: la somme des points (et donc le solde) est conservée
+    """
+    from sqlalchemy import func
+    cutoff = datetime.utcnow() - timedelta(days=days or app.config['LOYALTY_COMPACT_AFTER_DAYS'])
+    accounts = db.session.query(
+        LoyaltyTransaction.loyalty_id,
+        func.sum(LoyaltyTransaction.points)
+    ).filter(
+        LoyaltyTransaction.created_at < cutoff
+    ).group_by(LoyaltyTransaction.loyalty_id).having(func.count(LoyaltyTransaction.id) > 1).all()
+    
+    compacted = 0
+    for loyalty_id, points in accounts:
+        # Solde de la dernière transaction regroupée: repris par la ligne de report
+        balance_after = db.session.query(LoyaltyTransaction.balance_after).filter(
+            LoyaltyTransaction.loyalty_id == loyalty_id,
+            LoyaltyTransaction.created_at < cutoff
+        ).order_by(LoyaltyTransaction.created_at.desc(), LoyaltyTransaction.id.desc()).limit(1).scalar()
+        
+        # Un compte par transaction: report et suppression sont atomiques
+        compacted += LoyaltyTransaction.query.filter(
+            LoyaltyTransaction.loyalty_id == loyalty_id,
+            LoyaltyTransaction.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.add(LoyaltyTransaction(
+            loyalty_id=loyalty_id,
+            points=points,
+            balance_after=balance_after,
+            transaction_type='archive',
+            description=f'Report des transactions antérieures au {cutoff.strftime("%d/%m/%Y")}',
+            created_at=cutoff
+        ))
+        db.session.commit()
+        time.sleep(app.config['MAINTENANCE_BATCH_PAUSE'])
+    return compacted
+
+def retier_loyalty_accounts(batch_size=None):
+    """
+    Recalculer le niveau de tous les comptes (après un changement de LOYALTY_TIERS)
+    
+    UPDATE ensembliste par lots: seuls les comptes dont le niveau change sont écrits.
+    
+    Returns:
+        int: nombre de comptes mis à jour
+    """
+    from sqlalchemy import func
+    load_loyalty_tiers()
+    expected_tier = loyalty_tier_expression(func.coalesce(LoyaltyPoints.total_earned, 0))
+    batch_size = batch_size or app.config['MAINTENANCE_BATCH_SIZE']
+    
+    updated = 0
+    while True:
+        ids = [row[0] for row in db.session.query(LoyaltyPoints.id).filter(
+            func.coalesce(LoyaltyPoints.tier, '') != expected_tier
+        ).limit(batch_size).all()]
+        if not ids:
+            return updated
+        LoyaltyPoints.query.filter(LoyaltyPoints.id.in_(ids)).update(
+            {LoyaltyPoints.tier: expected_tier},
+            synchronize_session=False
+        )
+        db.session.commit()
+        updated += len(ids)
+        time.sleep(app.config['MAINTENANCE_BATCH_PAUSE'])
+
+def reconcile_loyalty_accounts(repair=False):
+    """
+    Vérifier que le solde de chaque compte fidélité égale la somme de son journal
+    
+    Une seule requête agrégée sur l'index (loyalty_id, ...). Avec repair=True,
+    l'écart est inscrit au journal par une ligne 'adjustment' (le journal reste
+    en ajout seul et le solde affiché au client ne change pas).
+    
+    Returns:
+        list: comptes en écart (loyalty_id, user_id, points, ledger_points)
+    """
+    from sqlalchemy import func
+    ledger = db.session.query(
+        LoyaltyTransaction.loyalty_id.label('loyalty_id'),
+        func.sum(LoyaltyTransaction.points).label('ledger_points')
+    ).group_by(LoyaltyTransaction.loyalty_id).subquery()
+    ledger_points = func.coalesce(ledger.c.ledger_points, 0)
+    
+    mismatches = db.session.query(
+        LoyaltyPoints.id,
+        LoyaltyPoints.user_id,
+        func.coalesce(LoyaltyPoints.points, 0),
+        ledger_points
+    ).outerjoin(
+        ledger, ledger.c.loyalty_id == LoyaltyPoints.id
+    ).filter(func.coalesce(LoyaltyPoints.points, 0) != ledger_points).all()
+    
+    if repair:
+        for loyalty_id, user_id, points, ledger_total in mismatches:
+            db.session.add(LoyaltyTransaction(
+                loyalty_id=loyalty_id,
+                points=points - ledger_total,
+                balance_after=points,
+                transaction_type='adjustment',
+                description='Régularisation du solde'
+            ))
+        db.session.commit()
+    
+    return [
+        {'loyalty_id': loyalty_id, 'user_id': user_id, 'points': points, 'ledger_points': ledger_total}
+        for loyalty_id, user_id, points, ledger_total in mismatches
+    ]
+
+def optimize_database(vacuum=False):
+    """Mettre à jour les statistiques du planificateur (et compacter le fichier si demandé)"""
+    from sqlalchemy import text
+    statements = ['ANALYZE']
+    if db.engine.dialect.name == 'sqlite':
+        statements.append('PRAGMA optimize')
+    if vacuum:
+        statements.append('VACUUM')
+    
+    # VACUUM ne peut pas s'exécuter dans une transaction
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    return statements
+
+def run_maintenance(vacuum=False, repair_loyalty=False):
+    """Tâche de maintenance complète (planifiée via maintenance.py)"""
+    return {
+        'login_attempts': purge_login_attempts(),
+        'notifications': purge_notifications(),
+        'loyalty_transactions': compact_loyalty_transactions(),
+        'loyalty_mismatches': reconcile_loyalty_accounts(repair=repair_loyalty),
+        'loyalty_tiers': retier_loyalty_accounts(),
+        'sitemap': refresh_sitemap(force=True),
+        'optimize': optimize_database(vacuum)
+    }
+
 @app.route('/admin/security')
 @admin_required
 def admin_security_dashboard():
     """Dashboard de sécurité - Monitoring des tentatives de connexion"""
     from datetime import datetime, timedelta
-    
-    # Statistiques des tentatives de connexion
-    total_attempts = LoginAttempt.query.count()
+    from sqlalchemy import func, case
+    from collections import Counter
+    
+    # Statistiques: résumés journaliers + tentatives brutes pas encore résumées
+    cutoff = login_summary_cutoff()
+    live_filter = [LoginAttempt.attempt_time >= cutoff] if cutoff else []
+    
+    summary_success, summary_failed = db.session.query(
+        func.coalesce(func.sum(LoginAttemptDaily.success_count), 0),
+        func.coalesce(func.sum(LoginAttemptDaily.failed_count), 0)
+    ).one()
+    live_success, live_failed = db.session.query(
+        func.coalesce(func.sum(case((LoginAttempt.success == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((LoginAttempt.success == True, 0), else_=1)), 0)
+    ).filter(*live_filter).one()
     
     # Tentatives échouées
-    failed_attempts = LoginAttempt.query.filter_by(success=False).count()
+    failed_attempts = summary_failed + live_failed
     
     # Tentatives réussies
-    successful_attempts = LoginAttempt.query.filter_by(success=True).count()
+    successful_attempts = summary_success + live_success
+    
+    total_attempts = failed_attempts + successful_attempts
     
-    # Tentatives aujourd'hui
+    # Tentatives aujourd'hui (index sur attempt_time)
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     today_attempts = LoginAttempt.query.filter(
         LoginAttempt.attempt_time >= today_start
@@ -2631,15 +4702,15 @@ def admin_security_dashboard():
     ).limit(50).all()
     
     # Top IPs avec le plus de tentatives échouées
-    from sqlalchemy import func
-    top_ips = db.session.query(
+    failures_by_ip = Counter(dict(db.session.query(
+        LoginAttemptDaily.ip_address,
+        func.sum(LoginAttemptDaily.failed_count)
+    ).group_by(LoginAttemptDaily.ip_address).all()))
+    failures_by_ip.update(dict(db.session.query(
         LoginAttempt.ip_address,
-        func.count(LoginAttempt.id).label('count')
-    ).filter(
-        LoginAttempt.success == False
-    ).group_by(LoginAttempt.ip_address).order_by(
-        func.count(LoginAttempt.id).desc()
-    ).limit(10).all()
+        func.count(LoginAttempt.id)
+    ).filter(LoginAttempt.success == False, *live_filter).group_by(LoginAttempt.ip_address).all()))
+    top_ips = [(ip, count) for ip, count in failures_by_ip.most_common(10) if count > 0]
     
     return render_template('admin/security.html',
                          total_attempts=total_attempts,
@@ -2653,13 +4724,9 @@ def admin_security_dashboard():
 @admin_required
 def clear_old_attempts(days):
     """Supprimer les tentatives de connexion de plus de X jours"""
-    from datetime import datetime, timedelta
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        old_attempts = LoginAttempt.query.filter(
-            LoginAttempt.attempt_time < cutoff_date
-        ).delete()
-        db.session.commit()
+        # Résumer avant de supprimer: les statistiques du dashboard sont conservées
+        old_attempts = purge_login_attempts(days)
         flash(f'{old_attempts} tentatives de plus de {days} jours supprimées.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -2711,16 +4778,7 @@ def admin_send_newsletter():
 def get_notifications():
     """Récupérer les notifications non lues"""
     notifications = Notification.query.filter_by(is_read=False).order_by(Notification.created_at.desc()).limit(10).all()
-    return jsonify([{
-        'id': n.id,
-        'type': n.type,
-        'title': n.title,
-        'message': n.message,
-        'link': n.link,
-        'icon': n.icon,
-        'color': n.color,
-        'created_at': n.created_at.strftime('%d/%m/%Y %H:%M')
-    } for n in notifications])
+    return jsonify([notification_payload(n) for n in notifications])
 
 @app.route('/api/notifications/count')
 @admin_required
@@ -2729,6 +4787,51 @@ def get_notifications_count():
     count = Notification.query.filter_by(is_read=False).count()
     return jsonify({'count': count})
 
+@app.route('/admin/notifications/stream')
+@admin_required
+def admin_notifications_stream():
+    """Flux SSE des notifications: état initial puis nouvelles notifications, sans polling"""
+    from flask import Response
+    
+    try:
+        subscriber = notification_broker.subscribe(app.config['NOTIFICATION_MAX_STREAMS'])
+    except StreamLimitReached:
+        # Le navigateur se rabat sur /api/notifications (voir base_admin.html)
+        return Response('Trop de flux ouverts', status=503, headers={'Retry-After': '60'})
+    
+    # État initial lu une seule fois à la connexion, après l'abonnement
+    try:
+        snapshot = notification_snapshot()
+    except Exception:
+        notification_broker.unsubscribe(subscriber)
+        raise
+    db.session.remove()  # Ne pas garder de connexion SQLite pendant toute la durée du flux
+    
+    def format_event(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    def stream():
+        try:
+            yield "retry: 3000\n"
+            yield format_event('snapshot', snapshot)
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=app.config['NOTIFICATION_HEARTBEAT'])
+                    # Déjà dans l'état initial (abonnement antérieur à sa lecture)
+                    if event == 'notification' and data['id'] <= snapshot['last_id']:
+                        continue
+                    yield format_event(event, data)
+                except queue.Empty:
+                    yield ": ping\n\n"
+        finally:
+            notification_broker.unsubscribe(subscriber)
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Pas de mise en tampon derrière nginx
+    response.call_on_close(lambda: notification_broker.unsubscribe(subscriber))
+    return response
+
 @app.route('/api/notifications/<int:notif_id>/read', methods=['POST'])
 @admin_required
 def mark_notification_read(notif_id):
@@ -2736,6 +4839,8 @@ def mark_notification_read(notif_id):
     notification = Notification.query.get_or_404(notif_id)
     notification.is_read = True
     db.session.commit()
+    bump_notifications_read_version()
+    notification_broker.publish('read', {'ids': [notif_id]})
     return jsonify({'success': True})
 
 @app.route('/api/notifications/mark-all-read', methods=['POST'])
@@ -2744,12 +4849,19 @@ def mark_all_notifications_read():
     """Marquer toutes les notifications comme lues"""
     Notification.query.filter_by(is_read=False).update({'is_read': True})
     db.session.commit()
+    bump_notifications_read_version()
+    notification_broker.publish('read', {'all': True})
     return jsonify({'success': True})
 
 # ========== API RECHERCHE INTELLIGENTE ==========
 @app.route('/api/search/suggestions')
 def search_suggestions():
     """API pour les suggestions de recherche en temps réel"""
+    change = last_change(Product)
+    return conditional_response(content_etag('api_suggestions', request.full_path, change), change[0], render_search_suggestions, private=False)
+
+def render_search_suggestions():
+    """Suggestions de recherche (JSON)"""
     query = request.args.get('q', '').strip()
     
     if len(query) < 2:
@@ -2757,10 +4869,7 @@ def search_suggestions():
     
     # Recherche dans les produits
     search_term = f"%{query}%"
-    products = Product.query.filter(
-        (Product.name.ilike(search_term)) | 
-        (Product.brand.ilike(search_term))
-    ).limit(8).all()
+    products = Product.query.filter(product_search_filter(query, ('name', 'brand'))).limit(8).all()
     
     suggestions = []
     
@@ -2794,6 +4903,16 @@ def search_suggestions():
 @app.route('/api/search/quick')
 def quick_search():
     """Recherche rapide pour affichage en temps réel"""
+    changes = (last_change(Product), last_change(Category))
+    return conditional_response(
+        content_etag('api_quick', request.full_path, changes, review_version()),
+        latest_change(*changes),
+        render_quick_search,
+        private=False
+    )
+
+def render_quick_search():
+    """Résultats de la recherche rapide (JSON)"""
     query = request.args.get('q', '').strip()
     category = request.args.get('category')
     brand = request.args.get('brand')
@@ -2802,12 +4921,7 @@ def quick_search():
         return jsonify({'products': [], 'total': 0})
     
     # Construction de la requête
-    search_term = f"%{query}%"
-    q = Product.query.filter(
-        (Product.name.ilike(search_term)) | 
-        (Product.brand.ilike(search_term)) |
-        (Product.description.ilike(search_term))
-    )
+    q = Product.query.filter(product_search_filter(query))
     
     # Filtres additionnels
     if category:
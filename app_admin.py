@@ -60,6 +60,11 @@ def check_admin_access():
        (request.endpoint and request.endpoint.startswith('admin')):
         return None
     
+    # API des notifications utilisée par le dashboard (protégée par @admin_required)
+    if request.endpoint in ['get_notifications', 'get_notifications_count',
+                            'mark_notification_read', 'mark_all_notifications_read']:
+        return None
+    
     # Rediriger tout le reste vers admin dashboard ou login
     if current_user.is_authenticated and current_user.is_admin:
         return redirect(url_for('admin_dashboard'))
@@ -23,8 +23,8 @@ def disable_admin_routes():
             endpoint = rule.endpoint
             if endpoint in app.view_functions:
                 original_view_functions[endpoint] = app.view_functions[endpoint]
-                # Remplacer par une fonction qui renvoie 404
-                app.view_functions[endpoint] = lambda: abort(404)
+                # Remplacer par une fonction qui renvoie 404 (quels que soient les paramètres de l'URL)
+                app.view_functions[endpoint] = lambda **kwargs: abort(404)
     
     print(f"✅ Routes admin désactivées: {len(original_view_functions)} routes bloquées")
 
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+SCRIPT BUILD ASSETS - QUARTIER D'ARÔMES
+Regroupe, minifie et versionne les fichiers CSS/JS de static/ pour un cache navigateur sûr.
+
+Usage:
+    python build_assets.py                # Construire les bundles et le manifeste
+    python build_assets.py --no-minify    # Concaténer sans minifier
+    python build_assets.py --clean        # Supprimer les anciennes versions de static/dist
+    python build_assets.py --no-compress  # Ne pas générer les fichiers .br/.gz
+
+Features:
+- Bundles CSS/JS (moins de requêtes par page)
+- @import locaux intégrés directement dans le bundle CSS
+- Minification prudente (commentaires, indentation, espaces)
+- Nom de fichier contenant le hash du contenu (cache immuable d'un an)
+- Manifeste JSON lu par asset_url() / asset_tags() dans app.py
+- Versions précompressées .br (brotli) et .gz servies telles quelles par app.py
+
+@version 1.0
+@date 2026-10-19
+"""
+
+import os
+import re
+import gzip
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # Installé avec Flask-Compress, mais optionnel ici
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_PATH = STATIC_DIR / DIST_DIRNAME / MANIFEST_NAME
+
+# Bundles chargés par les templates, dans l'ordre d'inclusion d'origine
+BUNDLES = {
+    'site.css': [
+        'css/design-variables.css',
+        'css/main.css',
+        'css/animations.css'
+    ],
+    'site.js': [
+        'js/main.js',
+        'js/animations.js',
+        'js/search.js',
+        'js/cart-notifications.js',
+        'js/toast.js',
+        'js/theme-toggle.js',
+        'js/lazy-load.js',
+        'js/instant-filters.js',
+        'js/cart-wishlist-animations.js',
+        'js/toast-notifications.js'
+    ]
+}
+
+# Dossiers dont chaque fichier est aussi versionné individuellement
+ASSET_DIRS = ['css', 'js']
+
+# Fichiers texte de static/dist précompressés (dossier généré, ignoré par git)
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.xml', '.txt'}
+PRECOMPRESS_MIN_SIZE = 1024
+
+CSS_IMPORT_RE = re.compile(r"""@import\s+(?:url\(\s*)?['"]?([^'")\s]+)['"]?\s*\)?\s*;""")
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)""", re.S)
+
+
+def is_external(url):
+    """URL absolue, data: ou ancre (à ne pas réécrire)"""
+    return url.startswith(('http://', 'https://', '//', 'data:', '/', '#'))
+
+
+def read_css(path, seen=None):
+    """
+    Lire un fichier CSS en intégrant ses @import locaux (récursivement)
+
+    Les url() relatives sont réécrites pour rester valides depuis static/dist/.
+    """
+    path = Path(path)
+    seen = seen if seen is not None else set()
+    if path in seen:
+        return ''
+    seen.add(path)
+
+    source = path.read_text(encoding='utf-8')
+
+    def rewrite_url(match):
+        quote, url = match.groups()
+        if is_external(url):
+            return match.group(0)
+        target = os.path.relpath(path.parent / url, STATIC_DIR / DIST_DIRNAME).replace(os.sep, '/')
+        return f"url({quote}{target}{quote})"
+
+    children = []
+
+    def inline_import(match):
+        url = match.group(1)
+        if is_external(url):
+            return match.group(0)
+        children.append(read_css(path.parent / url, seen))
+        return f"\0{len(children) - 1}\0"
+
+    # Les imports locaux sont remplacés par des marqueurs pour ne pas
+    # réécrire deux fois les url() des fichiers importés
+    source = CSS_IMPORT_RE.sub(inline_import, source)
+    source = CSS_URL_RE.sub(rewrite_url, source)
+    return re.sub(r'\0(\d+)\0', lambda m: children[int(m.group(1))], source)
+
+
+def minify_css(source):
+    """Supprimer commentaires et espaces superflus (les chaînes sont préservées)"""
+    parts = []
+    last = 0
+    for match in CSS_TOKEN_RE.finditer(source):
+        fragment = compact_css(source[last:match.start()])
+        if fragment:
+            parts.append(fragment)
+        string, comment, _space = match.groups()
+        if string:
+            parts.append(string)
+        elif not comment and parts and not parts[-1].endswith(' '):
+            parts.append(' ')
+        last = match.end()
+    parts.append(compact_css(source[last:]))
+
+    # Deuxième passe sur les espaces laissés autour des chaînes et commentaires
+    return re.sub(r' ?([{};,>]) ?', r'\1', ''.join(parts)).replace(';}', '}').strip()
+
+
+def compact_css(code):
+    """Compacter un fragment CSS sans chaîne ni commentaire"""
+    code = re.sub(r'\s+', ' ', code)
+    return re.sub(r' ?([{};,>]) ?', r'\1', code)
+
+
+def minify_js(source):
+    """
+    Minification prudente ligne par ligne
+
+    Supprime l'indentation, les lignes vides et les commentaires occupant
+    des lignes entières. Les retours à la ligne sont conservés (pas de
+    risque lié à l'insertion automatique de points-virgules) et le contenu
+    des template literals multi-lignes est laissé intact.
+    """
+    lines = []
+    in_template = False
+    in_comment = False
+
+    for line in source.splitlines():
+        stripped = line.strip()
+
+        if in_template:
+            lines.append(line)
+        elif in_comment:
+            if '*/' in stripped:
+                in_comment = False
+                rest = stripped.split('*/', 1)[1].strip()
+                if rest:
+                    lines.append(rest)
+            continue
+        elif not stripped or stripped.startswith('//'):
+            continue
+        elif stripped.startswith('/*') and '*/' not in stripped:
+            in_comment = True
+            continue
+        elif stripped.startswith('/*') and stripped.endswith('*/'):
+            continue
+        else:
+            lines.append(stripped)
+
+        # Compter les backticks non échappés pour suivre les template literals
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+
+    return '\n'.join(lines)
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+
+
+class AssetBuilder:
+    """Construction des bundles et fichiers versionnés"""
+
+    def __init__(self, minify=True):
+        self.minify = minify
+        self.dist_dir = STATIC_DIR / DIST_DIRNAME
+        self.manifest = {}
+        self.stats = {
+            'files': 0,
+            'bundles': 0,
+            'original_size': 0,
+            'built_size': 0,
+            'precompressed': 0
+        }
+
+    def read_asset(self, relative_path):
+        """Lire (et minifier) un fichier CSS ou JS de static/"""
+        path = STATIC_DIR / relative_path
+        if path.suffix == '.css':
+            content = read_css(path)
+            return minify_css(content) if self.minify else content
+        content = path.read_text(encoding='utf-8')
+        return minify_js(content) if self.minify else content
+
+    def write_versioned(self, logical_name, content):
+        """Écrire <nom>.<hash><ext> dans static/dist et l'enregistrer dans le manifeste"""
+        stem, extension = os.path.splitext(logical_name)
+        versioned = f"{stem}.{content_hash(content)}{extension}"
+        path = self.dist_dir / versioned
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+        self.manifest[logical_name] = f"{DIST_DIRNAME}/{versioned}"
+        return path
+
+    def build_bundles(self):
+        for bundle_name, files in BUNDLES.items():
+            separator = '\n' if bundle_name.endswith('.css') else '\n;\n'
+            content = separator.join(self.read_asset(f) for f in files)
+            # Taille avant minification, @import compris
+            self.stats['original_size'] += sum(
+                len((read_css(STATIC_DIR / f) if f.endswith('.css') else (STATIC_DIR / f).read_text(encoding='utf-8')).encode('utf-8'))
+                for f in files
+            )
+            path = self.write_versioned(bundle_name, content)
+            self.stats['built_size'] += path.stat().st_size
+            self.stats['bundles'] += 1
+            print(f"📦 {bundle_name} ({len(files)} fichiers) → {path.name}")
+
+    def build_files(self):
+        for directory in ASSET_DIRS:
+            for path in sorted((STATIC_DIR / directory).glob('*')):
+                if path.suffix not in ('.css', '.js'):
+                    continue
+                relative_path = f"{directory}/{path.name}"
+                self.write_versioned(relative_path, self.read_asset(relative_path))
+                self.stats['files'] += 1
+
+    def write_manifest(self):
+        MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = MANIFEST_PATH.with_name(f"{MANIFEST_NAME}.tmp")
+        tmp_path.write_text(json.dumps(self.manifest, indent=2, sort_keys=True), encoding='utf-8')
+        # Remplacement atomique: l'application ne lit jamais un manifeste partiel
+        os.replace(tmp_path, MANIFEST_PATH)
+
+    def precompress(self):
+        """
+        Écrire les versions .br et .gz des fichiers texte de static/dist
+
+        Niveaux maximaux: le coût n'est payé qu'une fois au build et
+        plus jamais à chaque requête. Les fichiers déjà à jour sont ignorés.
+        Seul static/dist est traité: rien n'est écrit à côté des sources suivies par git.
+        """
+        for path in sorted(self.dist_dir.rglob('*')):
+            if (not path.is_file() or path.suffix not in PRECOMPRESS_EXTENSIONS
+                    or path.stat().st_size < PRECOMPRESS_MIN_SIZE):
+                continue
+
+            data = path.read_bytes()
+            encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+
+            for suffix, encode in encoders:
+                target = path.with_name(path.name + suffix)
+                if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                    continue
+                tmp_path = target.with_name(target.name + '.tmp')
+                tmp_path.write_bytes(encode(data))
+                os.replace(tmp_path, target)
+                self.stats['precompressed'] += 1
+
+    def clean(self):
+        """Supprimer les fichiers de static/dist absents du manifeste courant"""
+        keep = {STATIC_DIR / p for p in self.manifest.values()} | {MANIFEST_PATH}
+        removed = 0
+        for path in self.dist_dir.rglob('*'):
+            if path.is_file() and path not in keep and path.suffix in ('.css', '.js'):
+                path.unlink()
+                removed += 1
+        # Versions compressées dont le fichier source n'existe plus, et celles écrites
+        # à côté des sources par les anciens builds (hors static/dist)
+        for path in STATIC_DIR.rglob('*'):
+            if path.suffix not in ('.br', '.gz') or 'uploads' in path.relative_to(STATIC_DIR).parts:
+                continue
+            if self.dist_dir not in path.parents or not path.with_suffix('').exists():
+                path.unlink()
+                removed += 1
+        return removed
+
+    def print_stats(self):
+        print("\n" + "="*60)
+        print("📊 RAPPORT DE BUILD")
+        print("="*60)
+        print(f"Bundles          : {self.stats['bundles']}")
+        print(f"Fichiers         : {self.stats['files']}")
+        print(f"Bundles (source) : {self.stats['original_size'] / 1024:.1f} KB")
+        print(f"Bundles (générés): {self.stats['built_size'] / 1024:.1f} KB")
+        print(f"Précompressés    : {self.stats['precompressed']} ({'br + gz' if brotli else 'gz uniquement'})")
+        print(f"Manifeste        : {MANIFEST_PATH.relative_to(STATIC_DIR.parent)}")
+        print("="*60)
+
+
+def main():
+    """Point d'entrée principal"""
+
+    parser = argparse.ArgumentParser(
+        description='Bundles CSS/JS versionnés pour Quartier d\'Arômes'
+    )
+
+    parser.add_argument(
+        '--no-minify',
+        action='store_true',
+        help='Concaténer sans minifier'
+    )
+
+    parser.add_argument(
+        '--clean',
+        action='store_true',
+        help='Supprimer les anciennes versions de static/dist'
+    )
+
+    parser.add_argument(
+        '--no-compress',
+        action='store_true',
+        help='Ne pas générer les versions précompressées .br/.gz'
+    )
+
+    args = parser.parse_args()
+
+    print("🧱 BUILD ASSETS - QUARTIER D'ARÔMES")
+    print("="*60)
+
+    builder = AssetBuilder(minify=not args.no_minify)
+    builder.build_bundles()
+    builder.build_files()
+    builder.write_manifest()
+
+    if args.clean:
+        print(f"🧹 Anciennes versions supprimées: {builder.clean()}")
+
+    if not args.no_compress:
+        builder.precompress()
+
+    builder.print_stats()
+    print("\n✨ Terminé!")
+
+
+if __name__ == '__main__':
+    main()
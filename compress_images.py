@@ -11,6 +11,7 @@ Usage:
 Features:
 - Compression intelligente (JPEG 85%, PNG lossless)
 - Création miniatures automatique
+- Déclinaisons responsive (srcset) en WebP et AVIF si supporté
 - Redimensionnement optimal (max 1200px)
 - Préservation EXIF
 - Backup automatique
@@ -27,6 +28,30 @@ from PIL import Image, ImageOps
 import argparse
 from datetime import datetime
 
+# Largeurs générées pour les attributs srcset (en pixels)
+RESPONSIVE_WIDTHS = [160, 320, 640, 1200]
+
+# Dossier des déclinaisons, relatif au dossier de l'image source
+VARIANTS_DIRNAME = 'variants'
+
+
+def variant_formats():
+    """Formats de déclinaison supportés par l'installation Pillow (AVIF en premier)"""
+    Image.init()  # Charger les plugins pour remplir Image.SAVE
+    formats = []
+    if 'AVIF' in Image.SAVE:
+        formats.append('avif')
+    if 'WEBP' in Image.SAVE:
+        formats.append('webp')
+    return formats
+
+
+def variant_path(original_path, width, fmt):
+    """Chemin d'une déclinaison: <dossier>/variants/<nom>_<largeur>w.<format>"""
+    original_path = Path(original_path)
+    return original_path.parent / VARIANTS_DIRNAME / f"{original_path.stem}_{width}w.{fmt}"
+
+
 class ImageCompressor:
     """Compresseur d'images avec options avancées"""
     
@@ -38,6 +63,9 @@ class ImageCompressor:
             'png_optimize': True,
             'create_thumbs': True,
             'thumb_size': (400, 400),
+            'create_variants': True,
+            'variant_widths': RESPONSIVE_WIDTHS,
+            'variant_quality': 80,
             'backup': True,
             'preserve_exif': True,
             'formats': ['.jpg', '.jpeg', '.png', '.webp']
@@ -145,6 +173,11 @@ class ImageCompressor:
             if create_thumb and self.config['create_thumbs']:
                 thumb_path = self.create_thumbnail(img, input_path)
             
+            # Créer les déclinaisons responsive
+            variant_paths = []
+            if self.config.get('create_variants'):
+                variant_paths = self.create_variants(img, input_path)
+            
             # Taille compressée
             compressed_size = output_path.stat().st_size
             reduction = ((original_size - compressed_size) / original_size) * 100
@@ -155,7 +188,8 @@ class ImageCompressor:
                 'compressed_size': compressed_size,
                 'reduction_percent': reduction,
                 'output_path': str(output_path),
-                'thumb_path': str(thumb_path) if thumb_path else None
+                'thumb_path': str(thumb_path) if thumb_path else None,
+                'variant_paths': [str(p) for p in variant_paths]
             }
             
         except Exception as e:
@@ -206,6 +240,47 @@ class ImageCompressor:
         
         return thumb_path
     
+    def create_variants(self, img, original_path):
+        """
+        Créer les déclinaisons responsive d'une image (une par largeur et par format)
+        
+        Les largeurs supérieures à l'image source sont ramenées à sa largeur
+        pour ne jamais agrandir l'image.
+        
+        Args:
+            img: Image PIL (ou chemin de l'image)
+            original_path: Chemin original
+            
+        Returns:
+            list: Chemins des déclinaisons créées
+        """
+        original_path = Path(original_path)
+        
+        if not isinstance(img, Image.Image):
+            img = ImageOps.exif_transpose(Image.open(img))
+        
+        # Les formats WebP/AVIF gèrent la transparence mais pas la palette
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+        
+        widths = sorted({min(w, img.width) for w in self.config.get('variant_widths', RESPONSIVE_WIDTHS)})
+        created = []
+        
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.Resampling.LANCZOS)
+            
+            for fmt in variant_formats():
+                path = variant_path(original_path, width, fmt)
+                path.parent.mkdir(exist_ok=True)
+                # Écriture dans un fichier temporaire puis remplacement atomique
+                tmp_path = path.with_name(f"{path.name}.tmp")
+                resized.save(tmp_path, format=fmt.upper(), quality=self.config.get('variant_quality', 80))
+                os.replace(tmp_path, path)
+                created.append(path)
+        
+        return created
+    
     def compress_directory(self, directory, recursive=False):
         """
         Compresser tout un dossier
@@ -233,8 +308,8 @@ class ImageCompressor:
                 if '_original' in file_path.stem:
                     continue
                 
-                # Skip si dans dossier thumbs
-                if 'thumbs' in file_path.parts:
+                # Skip si dans dossier thumbs ou variants
+                if 'thumbs' in file_path.parts or VARIANTS_DIRNAME in file_path.parts:
                     continue
                 
                 self.stats['total_files'] += 1
@@ -254,6 +329,9 @@ class ImageCompressor:
                     
                     if result['thumb_path']:
                         print(f"   🖼️  Miniature: {Path(result['thumb_path']).name}")
+                    
+                    if result['variant_paths']:
+                        print(f"   📐 Déclinaisons: {len(result['variant_paths'])}")
                 else:
                     self.stats['errors'] += 1
                     print(f"   ❌ Erreur: {result['error']}")
@@ -341,6 +419,12 @@ def main():
         help='Ne pas créer de miniatures'
     )
     
+    parser.add_argument(
+        '--no-variants',
+        action='store_true',
+        help='Ne pas créer de déclinaisons responsive (srcset)'
+    )
+    
     args = parser.parse_args()
     
     # Configuration
@@ -351,6 +435,9 @@ def main():
         'png_optimize': True,
         'create_thumbs': not args.no_thumbs,
         'thumb_size': (400, 400),
+        'create_variants': not args.no_variants,
+        'variant_widths': RESPONSIVE_WIDTHS,
+        'variant_quality': 80,
         'backup': not args.no_backup,
         'preserve_exif': True,
         'formats': ['.jpg', '.jpeg', '.png', '.webp']
@@ -365,6 +452,7 @@ def main():
     print(f"Taille max       : {args.max_size}px")
     print(f"Backup           : {'Oui' if config['backup'] else 'Non'}")
     print(f"Miniatures       : {'Oui' if config['create_thumbs'] else 'Non'}")
+    print(f"Déclinaisons     : {', '.join(variant_formats()) if config['create_variants'] else 'Non'}")
     print("="*60)
     
     # Traiter
@@ -0,0 +1,60 @@
+"""
+CONFIGURATION GUNICORN - Quartier d'Arômes
+Serveur de production: plusieurs processus (workers) de plusieurs threads chacun
+
+- preload_app: l'application est importée une fois dans le maître puis partagée
+  avec les workers par copy-on-write (templates, caches d'import, bytecode)
+- post_fork: chaque worker ouvre ses propres connexions à la base
+- gthread: les flux SSE du dashboard admin occupent un thread, pas un processus
+  (au plus la moitié des threads d'un worker, au-delà le dashboard interroge toutes les 30 s)
+
+Usage:
+    gunicorn -c gunicorn.conf.py                  # Site client sur 127.0.0.1:5000
+    APP_ROLE=admin gunicorn -c gunicorn.conf.py   # Administration sur 127.0.0.1:5001
+    WEB_CONCURRENCY=8 WEB_THREADS=4 BIND=0.0.0.0:8000 gunicorn -c gunicorn.conf.py
+
+Variables d'environnement:
+    APP_ROLE          client (défaut) ou admin
+    BIND              Adresse d'écoute (défaut: 127.0.0.1:5000 client, 127.0.0.1:5001 admin)
+    WEB_CONCURRENCY   Nombre de workers (défaut: 2 × cœurs + 1 client, 2 admin)
+    WEB_THREADS       Threads par worker (défaut: 4 client, 8 admin)
+"""
+
+import os
+
+role = os.environ.get('APP_ROLE', 'client')
+cores = os.cpu_count() or 1
+
+wsgi_app = f"wsgi:create_app('{role}')"
+bind = os.environ.get('BIND', '127.0.0.1:5001' if role == 'admin' else '127.0.0.1:5000')
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 if role == 'admin' else cores * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 8 if role == 'admin' else 4))
+# Lu par l'application (préchargée après cette configuration): un flux SSE du dashboard
+# occupe un thread, NOTIFICATION_MAX_STREAMS en accepte la moitié par worker
+os.environ['WEB_THREADS'] = str(threads)
+worker_class = 'gthread'
+preload_app = True
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycler les workers régulièrement (fuites mémoire éventuelles), sans qu'ils redémarrent tous ensemble
+max_requests = 2000
+max_requests_jitter = 200
+
+proc_name = f'quartier-daromes-{role}'
+accesslog = os.environ.get('ACCESS_LOG', '-')
+
+
+def post_fork(server, worker):
+    """Connexions à la base propres au worker (celles du maître ne sont pas partagées)"""
+    from wsgi import reset_after_fork
+    reset_after_fork()
+
+
+def worker_exit(server, worker):
+    """Ne pas perdre les écritures différées à l'arrêt ou au recyclage d'un worker"""
+    from wsgi import flush_pending_writes
+    flush_pending_writes()
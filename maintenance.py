@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+SCRIPT DE MAINTENANCE - QUARTIER D'ARÔMES
+Rétention et compactage des tables qui grossissent sans fin.
+
+- login_attempts: résumé journalier par IP (login_attempt_daily), puis suppression
+- notifications: suppression des notifications lues anciennes
+- loyalty_transactions: anciennes transactions regroupées en une ligne de report par compte
+- loyalty_points: rapprochement du solde de chaque compte avec la somme de son journal
+- loyalty_points: recalcul des niveaux (après un changement de LOYALTY_TIERS)
+- sitemap: régénération des fichiers dont les lignes ont changé
+- ANALYZE / PRAGMA optimize (et VACUUM avec --vacuum)
+
+Les suppressions se font par lots pour ne jamais bloquer longtemps les écritures du site.
+
+Usage:
+    python maintenance.py                 # Une passe de maintenance
+    python maintenance.py --vacuum        # + VACUUM (compacte le fichier SQLite)
+    python maintenance.py --repair-loyalty  # + Régulariser au journal les écarts de solde fidélité
+    python maintenance.py --every 24      # Boucle: une passe toutes les 24 heures
+
+Planification (cron, tous les jours à 4h, VACUUM le dimanche):
+    0 4 * * 1-6  cd /chemin/quartier_daromes && python maintenance.py
+    0 4 * * 0    cd /chemin/quartier_daromes && python maintenance.py --vacuum
+
+@version 1.0
+@date 2026-10-19
+"""
+
+import time
+import argparse
+from datetime import datetime
+
+from app import app, db, run_maintenance
+from models import LoginAttempt, Notification, LoyaltyTransaction
+
+
+def ensure_schema():
+    """Créer la table de résumés et les index ajoutés sur les tables existantes"""
+    db.create_all()
+    for model in (LoginAttempt, Notification, LoyaltyTransaction):
+        for index in model.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def run_once(vacuum=False, repair_loyalty=False):
+    """Exécuter une passe et afficher le résultat"""
+    start = time.perf_counter()
+    with app.app_context():
+        ensure_schema()
+        results = run_maintenance(vacuum=vacuum, repair_loyalty=repair_loyalty)
+
+    print(f"🕓 {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    print(f"   🔐 Tentatives de connexion supprimées: {results['login_attempts']}")
+    print(f"   🔔 Notifications supprimées: {results['notifications']}")
+    print(f"   🎁 Transactions fidélité compactées: {results['loyalty_transactions']}")
+    mismatches = results['loyalty_mismatches']
+    if mismatches:
+        action = 'régularisés' if repair_loyalty else 'à vérifier (--repair-loyalty pour régulariser)'
+        print(f"   ⚠️  Comptes fidélité en écart avec le journal: {len(mismatches)} {action}")
+        for mismatch in mismatches[:20]:
+            print(f"      - compte {mismatch['loyalty_id']} (utilisateur {mismatch['user_id']}): "
+                  f"solde {mismatch['points']} / journal {mismatch['ledger_points']}")
+    else:
+        print("   🧾 Soldes fidélité conformes au journal")
+    print(f"   🏅 Niveaux fidélité recalculés: {results['loyalty_tiers']}")
+    print(f"   🗺️  Sitemap: {len(results['sitemap']['written'])} fichier(s) régénéré(s), {len(results['sitemap']['removed'])} supprimé(s)")
+    print(f"   ⚙️  Optimisation: {', '.join(results['optimize'])}")
+    print(f"   ✅ Terminé en {time.perf_counter() - start:.2f} s")
+
+
+def main():
+    """Point d'entrée principal"""
+
+    parser = argparse.ArgumentParser(
+        description='Maintenance de la base de données Quartier d\'Arômes'
+    )
+    parser.add_argument('--vacuum', action='store_true', help='Lancer VACUUM après le nettoyage')
+    parser.add_argument('--repair-loyalty', action='store_true', help='Inscrire au journal les écarts de solde fidélité')
+    parser.add_argument('--every', type=float, metavar='HEURES', help='Relancer la maintenance toutes les N heures')
+
+    args = parser.parse_args()
+
+    print("🧹 MAINTENANCE - QUARTIER D'ARÔMES")
+    print("=" * 60)
+
+    if not args.every:
+        run_once(args.vacuum, args.repair_loyalty)
+        print("=" * 60)
+        return
+
+    while True:
+        run_once(args.vacuum, args.repair_loyalty)
+        time.sleep(args.every * 3600)
+
+
+if __name__ == '__main__':
+    main()
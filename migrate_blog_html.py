@@ -0,0 +1,78 @@
+"""
+Script de migration pour ajouter le contenu rendu du blog (content_html, content_en_html)
+Le HTML de l'éditeur est nettoyé une fois à l'enregistrement au lieu d'être servi brut;
+les articles existants sont rendus avec le même nettoyage que l'application.
+
+À relancer après chaque correction du nettoyage: tous les articles sont rendus à
+nouveau, et ceux dont le HTML change sont datés (updated_at) pour invalider les
+listes en cache et les ETags des pages.
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+
+# Chemin vers la base de données
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'database', 'quartier.db')
+
+print("=" * 60)
+print("MIGRATION: Contenu du blog pré-rendu")
+print("=" * 60)
+print()
+
+if not os.path.exists(db_path):
+    print(f"❌ Base de données introuvable: {db_path}")
+    print("Veuillez d'abord créer la base de données.")
+    exit(1)
+
+# Connexion à la base de données
+conn = sqlite3.connect(db_path)
+cursor = conn.cursor()
+
+try:
+    # Étape 1: Ajouter les colonnes
+    cursor.execute("PRAGMA table_info(blog_posts)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    for name in ('content_html', 'content_en_html'):
+        if name in columns:
+            print(f"✅ La colonne {name} existe déjà")
+        else:
+            cursor.execute(f"ALTER TABLE blog_posts ADD COLUMN {name} TEXT")
+            print(f"   ✓ Colonne {name} ajoutée")
+
+    # Étape 2: Rendre le contenu des articles existants
+    from app import render_blog_content
+
+    cursor.execute("SELECT id, content, content_en, content_html, content_en_html FROM blog_posts")
+    posts = cursor.fetchall()
+    now = datetime.utcnow().isoformat(' ')
+    changed = []
+    for post_id, content, content_en, content_html, content_en_html in posts:
+        rendered = (render_blog_content(content), render_blog_content(content_en))
+        if rendered != (content_html, content_en_html):
+            changed.append((*rendered, now, post_id))
+    cursor.executemany(
+        "UPDATE blog_posts SET content_html = ?, content_en_html = ?, updated_at = ? WHERE id = ?",
+        changed
+    )
+    print(f"   ✓ {len(posts)} articles rendus, {len(changed)} modifiés")
+
+    # Commit des changements
+    conn.commit()
+    print()
+    print("✅ Migration terminée avec succès !")
+
+except sqlite3.Error as e:
+    conn.rollback()
+    print(f"❌ ERREUR: {e}")
+    print("   La migration a échoué. La base de données n'a pas été modifiée.")
+
+finally:
+    conn.close()
+
+print()
+print("=" * 60)
+print("Vous pouvez maintenant relancer le serveur Flask")
+print("=" * 60)
@@ -0,0 +1,84 @@
+"""
+Script de migration pour ajouter l'index unique (user_id, product_id) à cart_items
+Nécessaire pour la fusion du panier en un seul INSERT ... ON CONFLICT DO UPDATE
+"""
+
+import sqlite3
+import os
+
+# Chemin vers la base de données
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'database', 'quartier.db')
+
+INDEX_NAME = 'uq_cart_items_user_product'
+
+print("=" * 60)
+print("MIGRATION: Index unique (user_id, product_id) sur cart_items")
+print("=" * 60)
+print()
+
+if not os.path.exists(db_path):
+    print(f"❌ Base de données introuvable: {db_path}")
+    print("Veuillez d'abord créer la base de données.")
+    exit(1)
+
+# Connexion à la base de données
+conn = sqlite3.connect(db_path)
+cursor = conn.cursor()
+
+try:
+    # Vérifier si l'index existe déjà
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = ?", (INDEX_NAME,))
+
+    if cursor.fetchone():
+        print(f"✅ L'index {INDEX_NAME} existe déjà")
+        print("   Aucune migration nécessaire.")
+    else:
+        # Étape 1: Regrouper les doublons sur la ligne la plus ancienne
+        cursor.execute("""
+            UPDATE cart_items
+            SET quantity = (
+                SELECT SUM(COALESCE(ci.quantity, 1))
+                FROM cart_items ci
+                WHERE ci.user_id = cart_items.user_id AND ci.product_id = cart_items.product_id
+            )
+            WHERE id IN (
+                SELECT MIN(id) FROM cart_items
+                GROUP BY user_id, product_id
+                HAVING COUNT(*) > 1
+            )
+        """)
+        merged = cursor.rowcount
+        print(f"   ✓ {merged} lignes en double regroupées")
+
+        # Étape 2: Supprimer les autres lignes des doublons
+        cursor.execute("""
+            DELETE FROM cart_items
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM cart_items
+                GROUP BY user_id, product_id
+            )
+        """)
+        print(f"   ✓ {cursor.rowcount} lignes supprimées")
+
+        # Étape 3: Créer l'index unique
+        cursor.execute(f"CREATE UNIQUE INDEX {INDEX_NAME} ON cart_items (user_id, product_id)")
+        print(f"   ✓ Index {INDEX_NAME} créé")
+
+        # Commit des changements
+        conn.commit()
+        print()
+        print("✅ Migration terminée avec succès !")
+
+except sqlite3.Error as e:
+    conn.rollback()
+    print(f"❌ ERREUR: {e}")
+    print("   La migration a échoué. La base de données n'a pas été modifiée.")
+
+finally:
+    conn.close()
+
+print()
+print("=" * 60)
+print("Vous pouvez maintenant relancer le serveur Flask")
+print("=" * 60)
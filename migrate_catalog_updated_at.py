@@ -0,0 +1,58 @@
+"""
+Script de migration pour ajouter la colonne 'updated_at' aux tables categories et brands
+Utilisée, avec products.updated_at, pour les réponses conditionnelles (ETag / 304)
+du catalogue: une modification de catégorie ou de marque change la page /collections.
+"""
+
+import sqlite3
+import os
+
+# Chemin vers la base de données
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'database', 'quartier.db')
+
+print("=" * 60)
+print("MIGRATION: updated_at sur categories et brands")
+print("=" * 60)
+print()
+
+if not os.path.exists(db_path):
+    print(f"❌ Base de données introuvable: {db_path}")
+    print("Veuillez d'abord créer la base de données.")
+    exit(1)
+
+# Connexion à la base de données
+conn = sqlite3.connect(db_path)
+cursor = conn.cursor()
+
+try:
+    for table in ('categories', 'brands'):
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if 'updated_at' in columns:
+            print(f"✅ La colonne updated_at existe déjà dans {table}")
+            continue
+
+        # SQLite n'accepte pas de valeur par défaut dynamique dans ADD COLUMN
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME")
+        cursor.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+        print(f"   ✓ Colonne updated_at ajoutée à {table} ({cursor.rowcount} lignes)")
+
+    # Commit des changements
+    conn.commit()
+    print()
+    print("✅ Migration terminée avec succès !")
+
+except sqlite3.Error as e:
+    conn.rollback()
+    print(f"❌ ERREUR: {e}")
+    print("   La migration a échoué. La base de données n'a pas été modifiée.")
+
+finally:
+    conn.close()
+
+print()
+print("=" * 60)
+print("Vous pouvez maintenant relancer le serveur Flask")
+print("=" * 60)
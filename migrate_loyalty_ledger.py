@@ -0,0 +1,80 @@
+"""
+Script de migration du journal fidélité (loyalty_transactions)
+- Ajoute les colonnes balance_after (solde après transaction) et reward_id
+- Calcule le solde courant des transactions existantes (ordre created_at, id)
+- Crée l'index (loyalty_id, created_at, id) pour l'historique paginé
+"""
+
+import sqlite3
+import os
+
+# Chemin vers la base de données
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'database', 'quartier.db')
+
+INDEX_NAME = 'ix_loyalty_transactions_loyalty_created'
+
+print("=" * 60)
+print("MIGRATION: Journal fidélité avec solde courant")
+print("=" * 60)
+print()
+
+if not os.path.exists(db_path):
+    print(f"❌ Base de données introuvable: {db_path}")
+    print("Veuillez d'abord créer la base de données.")
+    exit(1)
+
+# Connexion à la base de données
+conn = sqlite3.connect(db_path)
+cursor = conn.cursor()
+
+try:
+    # Étape 1: Ajouter les colonnes manquantes
+    cursor.execute("PRAGMA table_info(loyalty_transactions)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    for name, definition in (('balance_after', 'INTEGER'), ('reward_id', 'INTEGER REFERENCES loyalty_rewards(id)')):
+        if name in columns:
+            print(f"✅ La colonne {name} existe déjà")
+        else:
+            cursor.execute(f"ALTER TABLE loyalty_transactions ADD COLUMN {name} {definition}")
+            print(f"   ✓ Colonne {name} ajoutée")
+
+    # Étape 2: Solde courant par compte (fonction de fenêtre, une seule passe)
+    cursor.execute("""
+        CREATE TEMP TABLE ledger_running AS
+        SELECT id, SUM(points) OVER (
+            PARTITION BY loyalty_id ORDER BY created_at, id
+        ) AS running
+        FROM loyalty_transactions
+    """)
+    cursor.execute("""
+        UPDATE loyalty_transactions
+        SET balance_after = (SELECT running FROM ledger_running WHERE ledger_running.id = loyalty_transactions.id)
+        WHERE balance_after IS NULL
+    """)
+    print(f"   ✓ {cursor.rowcount} soldes calculés")
+    cursor.execute("DROP TABLE ledger_running")
+
+    # Étape 3: Index de l'historique
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON loyalty_transactions (loyalty_id, created_at, id)")
+    print(f"   ✓ Index {INDEX_NAME} prêt")
+
+    # Commit des changements
+    conn.commit()
+    print()
+    print("✅ Migration terminée avec succès !")
+    print("   Lancez `python maintenance.py` pour rapprocher les soldes des comptes du journal.")
+
+except sqlite3.Error as e:
+    conn.rollback()
+    print(f"❌ ERREUR: {e}")
+    print("   La migration a échoué. La base de données n'a pas été modifiée.")
+
+finally:
+    conn.close()
+
+print()
+print("=" * 60)
+print("Vous pouvez maintenant relancer le serveur Flask")
+print("=" * 60)
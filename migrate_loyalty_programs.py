@@ -0,0 +1,100 @@
+"""
+Script de migration: fusion de l'ancienne table loyalty_programs dans loyalty_points
+Le modèle LoyaltyProgram faisait doublon avec LoyaltyPoints; ses soldes sont
+repris sur le compte fidélité de chaque utilisateur avec une ligne au journal,
+puis la table est renommée loyalty_programs_backup.
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+
+# Chemin vers la base de données
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'database', 'quartier.db')
+
+print("=" * 60)
+print("MIGRATION: Fusion de loyalty_programs dans loyalty_points")
+print("=" * 60)
+print()
+
+if not os.path.exists(db_path):
+    print(f"❌ Base de données introuvable: {db_path}")
+    print("Veuillez d'abord créer la base de données.")
+    exit(1)
+
+# Connexion à la base de données
+conn = sqlite3.connect(db_path)
+cursor = conn.cursor()
+
+try:
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'loyalty_programs'")
+
+    if not cursor.fetchone():
+        print("✅ La table loyalty_programs n'existe pas (déjà fusionnée)")
+        print("   Aucune migration nécessaire.")
+    else:
+        cursor.execute("PRAGMA table_info(loyalty_transactions)")
+        if 'balance_after' not in [column[1] for column in cursor.fetchall()]:
+            raise sqlite3.OperationalError("lancez d'abord migrate_loyalty_ledger.py")
+
+        cursor.execute("""
+            SELECT user_id, COALESCE(points, 0), COALESCE(total_points_earned, 0)
+            FROM loyalty_programs
+            WHERE COALESCE(points, 0) != 0 OR COALESCE(total_points_earned, 0) != 0
+        """)
+        programs = cursor.fetchall()
+        now = datetime.utcnow()
+
+        for user_id, points, total_earned in programs:
+            # Compte fidélité de l'utilisateur (créé si absent)
+            cursor.execute("SELECT id FROM loyalty_points WHERE user_id = ?", (user_id,))
+            row = cursor.fetchone()
+            if row:
+                loyalty_id = row[0]
+            else:
+                cursor.execute("""
+                    INSERT INTO loyalty_points (user_id, points, total_earned, total_spent, updated_at)
+                    VALUES (?, 0, 0, 0, ?)
+                """, (user_id, now))
+                loyalty_id = cursor.lastrowid
+
+            cursor.execute("""
+                UPDATE loyalty_points
+                SET points = COALESCE(points, 0) + ?,
+                    total_earned = COALESCE(total_earned, 0) + ?,
+                    total_spent = COALESCE(total_spent, 0) + ?,
+                    updated_at = ?
+                WHERE id = ?
+            """, (points, total_earned, total_earned - points, now, loyalty_id))
+
+            cursor.execute("SELECT points FROM loyalty_points WHERE id = ?", (loyalty_id,))
+            balance_after = cursor.fetchone()[0]
+            cursor.execute("""
+                INSERT INTO loyalty_transactions
+                    (loyalty_id, points, balance_after, transaction_type, description, reason, created_at)
+                VALUES (?, ?, ?, 'transfer', 'Reprise de l''ancien programme fidélité', 'loyalty_programs', ?)
+            """, (loyalty_id, points, balance_after, now))
+
+        print(f"   ✓ {len(programs)} comptes repris dans loyalty_points")
+
+        cursor.execute("ALTER TABLE loyalty_programs RENAME TO loyalty_programs_backup")
+        print("   ✓ Table renommée loyalty_programs_backup")
+
+        # Commit des changements
+        conn.commit()
+        print()
+        print("✅ Migration terminée avec succès !")
+
+except sqlite3.Error as e:
+    conn.rollback()
+    print(f"❌ ERREUR: {e}")
+    print("   La migration a échoué. La base de données n'a pas été modifiée.")
+
+finally:
+    conn.close()
+
+print()
+print("=" * 60)
+print("Vous pouvez maintenant relancer le serveur Flask")
+print("=" * 60)
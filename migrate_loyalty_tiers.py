@@ -0,0 +1,61 @@
+"""
+Script de migration pour ajouter la colonne 'tier' à la table loyalty_points
+Le niveau est stocké sur le compte (recalculé à chaque gain de points) au lieu
+d'être calculé à chaque affichage; les niveaux existants sont calculés ensuite
+avec la table LOYALTY_TIERS de l'application.
+"""
+
+import sqlite3
+import os
+
+# Chemin vers la base de données
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'database', 'quartier.db')
+
+print("=" * 60)
+print("MIGRATION: Niveau fidélité stocké sur loyalty_points")
+print("=" * 60)
+print()
+
+if not os.path.exists(db_path):
+    print(f"❌ Base de données introuvable: {db_path}")
+    print("Veuillez d'abord créer la base de données.")
+    exit(1)
+
+# Connexion à la base de données
+conn = sqlite3.connect(db_path)
+cursor = conn.cursor()
+
+try:
+    # Étape 1: Ajouter la colonne
+    cursor.execute("PRAGMA table_info(loyalty_points)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    if 'tier' in columns:
+        print("✅ La colonne tier existe déjà")
+    else:
+        cursor.execute("ALTER TABLE loyalty_points ADD COLUMN tier VARCHAR(20) DEFAULT 'bronze'")
+        conn.commit()
+        print("   ✓ Colonne tier ajoutée")
+
+except sqlite3.Error as e:
+    conn.rollback()
+    print(f"❌ ERREUR: {e}")
+    print("   La migration a échoué. La base de données n'a pas été modifiée.")
+    exit(1)
+
+finally:
+    conn.close()
+
+# Étape 2: Calculer les niveaux (UPDATE par lots, table LOYALTY_TIERS)
+from app import app, retier_loyalty_accounts
+
+with app.app_context():
+    print(f"   ✓ {retier_loyalty_accounts()} niveaux calculés ({app.config['LOYALTY_TIERS']})")
+
+print()
+print("✅ Migration terminée avec succès !")
+print()
+print("=" * 60)
+print("Vous pouvez maintenant relancer le serveur Flask")
+print("=" * 60)
@@ -0,0 +1,88 @@
+"""
+Script de migration pour créer l'index plein texte FTS5 des produits (SQLite)
+La recherche (/collections, /api/search, suggestions, recherche rapide) utilise
+products_fts au lieu de LIKE '%...%' qui parcourt toute la table à chaque frappe.
+Les triggers tiennent l'index à jour à chaque ajout / modification / suppression.
+
+Sur PostgreSQL, les index GIN équivalents sont créés par db.create_all().
+"""
+
+import sqlite3
+import os
+
+# Chemin vers la base de données
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'database', 'quartier.db')
+
+FTS_COLUMNS = 'name, brand, description'
+NEW_VALUES = 'new.id, new.name, new.brand, new.description'
+OLD_VALUES = 'old.id, old.name, old.brand, old.description'
+
+STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE products_fts USING fts5(
+        {FTS_COLUMNS},
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, {FTS_COLUMNS}) VALUES ({NEW_VALUES});
+    END""",
+    f"""CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', {OLD_VALUES});
+    END""",
+    # Seulement si une colonne indexée change (pas à chaque mise à jour du stock)
+    f"""CREATE TRIGGER products_fts_update AFTER UPDATE OF {FTS_COLUMNS} ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, {FTS_COLUMNS}) VALUES ('delete', {OLD_VALUES});
+        INSERT INTO products_fts(rowid, {FTS_COLUMNS}) VALUES ({NEW_VALUES});
+    END""",
+]
+
+print("=" * 60)
+print("MIGRATION: Index plein texte FTS5 des produits")
+print("=" * 60)
+print()
+
+if not os.path.exists(db_path):
+    print(f"❌ Base de données introuvable: {db_path}")
+    print("Veuillez d'abord créer la base de données.")
+    exit(1)
+
+# Connexion à la base de données
+conn = sqlite3.connect(db_path)
+cursor = conn.cursor()
+
+try:
+    # Vérifier si la table existe déjà
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+
+    if cursor.fetchone():
+        print("✅ La table products_fts existe déjà")
+        print("   Aucune migration nécessaire.")
+    else:
+        # Étape 1: Table FTS5 et triggers de synchronisation
+        for statement in STATEMENTS:
+            cursor.execute(statement)
+        print("   ✓ Table products_fts et triggers créés")
+
+        # Étape 2: Indexer les produits existants
+        cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        cursor.execute("SELECT COUNT(*) FROM products")
+        print(f"   ✓ {cursor.fetchone()[0]} produits indexés")
+
+        # Commit des changements
+        conn.commit()
+        print()
+        print("✅ Migration terminée avec succès !")
+
+except sqlite3.Error as e:
+    conn.rollback()
+    print(f"❌ ERREUR: {e}")
+    print("   La migration a échoué. La base de données n'a pas été modifiée.")
+
+finally:
+    conn.close()
+
+print()
+print("=" * 60)
+print("La recherche utilise l'index dans la minute, sans redémarrer le serveur")
+print("=" * 60)
@@ -1,8 +1,29 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import UserMixin
 from datetime import datetime
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """
+    Session qui envoie les SELECT des routes catalogue vers le moteur en lecture
+    seule (bind 'reader'), quand la requête l'a demandé (g.db_reader).
+    
+    Tout le reste va au moteur principal: flush, INSERT/UPDATE/DELETE, SQL brut,
+    tâches de fond et routes qui ne sont pas en lecture seule.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None
+                and not self._flushing
+                and getattr(clause, 'is_select', False)
+                and has_app_context()
+                and g.get('db_reader')
+                and 'reader' in self._db.engines):
+            return self._db.engines['reader']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -36,6 +57,7 @@ class Category(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     show_in_menu = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relations
     products = db.relationship('Product', backref='category', lazy=True)
@@ -53,6 +75,7 @@ class Brand(db.Model):
     logo_url = db.Column(db.String(255))
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Brand {self.name}>'
@@ -137,6 +160,28 @@ class Product(db.Model):
     def __repr__(self):
         return f'<Product {self.name}>'
 
+# Recherche plein texte PostgreSQL: un index GIN par jeu de colonnes recherché
+# (SQLite utilise la table FTS5 products_fts, voir migrate_search_fts.py)
+PRODUCT_SEARCH_COLUMNS = ('name', 'brand', 'description')
+PRODUCT_SEARCH_INDEXES = (PRODUCT_SEARCH_COLUMNS, ('name', 'brand'), ('name',))
+
+def product_search_document(columns=PRODUCT_SEARCH_COLUMNS):
+    """to_tsvector des colonnes produit (expression identique dans les index et les requêtes)"""
+    from sqlalchemy import func, text
+    import sqlalchemy.dialects.postgresql  # Enregistre les fonctions to_tsvector / to_tsquery typées
+    document = None
+    for name in columns:
+        value = func.coalesce(getattr(Product, name), text("''"))
+        document = value if document is None else document.op('||')(text("' '")).op('||')(value)
+    return func.to_tsvector(text("'simple'"), document)
+
+for search_columns in PRODUCT_SEARCH_INDEXES:
+    db.Index(
+        'ix_products_search_' + '_'.join(search_columns),
+        product_search_document(search_columns),
+        postgresql_using='gin'
+    ).ddl_if(dialect='postgresql')
+
 class Order(db.Model):
     __tablename__ = 'orders'
     
@@ -174,6 +219,10 @@ class OrderItem(db.Model):
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        # Une seule ligne par produit et par utilisateur (fusion du panier par upsert)
+        db.Index('uq_cart_items_user_product', 'user_id', 'product_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -226,6 +275,8 @@ class BlogPost(db.Model):
     slug = db.Column(db.String(250), unique=True, nullable=False)
     content = db.Column(db.Text, nullable=False)
     content_en = db.Column(db.Text)  # Contenu en anglais
+    content_html = db.Column(db.Text)  # Contenu nettoyé, rendu à l'enregistrement
+    content_en_html = db.Column(db.Text)  # Contenu anglais nettoyé
     excerpt = db.Column(db.String(500))  # Court résumé
     excerpt_en = db.Column(db.String(500))  # Résumé en anglais
     image_url = db.Column(db.String(500))
@@ -247,37 +298,33 @@ class LoyaltyPoints(db.Model):
     points = db.Column(db.Integer, default=0)
     total_earned = db.Column(db.Integer, default=0)  # Total des points gagnés
     total_spent = db.Column(db.Integer, default=0)  # Total des points dépensés
+    # Niveau selon total_earned (table LOYALTY_TIERS), recalculé à chaque gain de points
+    tier = db.Column(db.String(20), default='bronze')
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relations
     user = db.relationship('User', backref=db.backref('loyalty_points', uselist=False))
     transactions = db.relationship('LoyaltyTransaction', backref='loyalty_account', lazy=True)
     
-    @property
-    def tier(self):
-        """Calculer le tier basé sur le total des points gagnés"""
-        if self.total_earned >= 2000:
-            return 'platinum'
-        elif self.total_earned >= 1000:
-            return 'gold'
-        elif self.total_earned >= 500:
-            return 'silver'
-        else:
-            return 'bronze'
-    
     def __repr__(self):
         return f'<LoyaltyPoints User:{self.user_id} Points:{self.points}>'
 
 class LoyaltyTransaction(db.Model):
     __tablename__ = 'loyalty_transactions'
+    __table_args__ = (
+        # Historique paginé par curseur (created_at, id) pour un compte
+        db.Index('ix_loyalty_transactions_loyalty_created', 'loyalty_id', 'created_at', 'id'),
+    )
     
+    # Journal en ajout seul: une ligne n'est jamais modifiée après insertion
     id = db.Column(db.Integer, primary_key=True)
     loyalty_id = db.Column(db.Integer, db.ForeignKey('loyalty_points.id'))
     points = db.Column(db.Integer, nullable=False)  # Positif = gagné, Négatif = dépensé
-    # balance_after et reward_id supprimés car colonnes n'existent pas dans la table
+    balance_after = db.Column(db.Integer)  # Solde du compte après cette transaction (migrate_loyalty_ledger.py)
+    reward_id = db.Column(db.Integer, db.ForeignKey('loyalty_rewards.id'))
     transaction_type = db.Column(db.String(50))  # 'purchase', 'reward', 'refund', 'redemption', 'earn', 'redeem'
     description = db.Column(db.String(200))
-    reason = db.Column(db.String(200))  # Pour compatibilité avec LoyaltyProgram
+    reason = db.Column(db.String(200))  # Ancien libellé (transactions reprises de loyalty_programs)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -320,6 +367,10 @@ class LoyaltyReward(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_created_at', 'created_at'),
+        db.Index('ix_notifications_is_read_created_at', 'is_read', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(50), nullable=False)  # 'order', 'message', 'review', 'stock'
@@ -337,6 +388,9 @@ class Notification(db.Model):
 class LoginAttempt(db.Model):
     """Modèle pour tracker les tentatives de connexion échouées"""
     __tablename__ = 'login_attempts'
+    __table_args__ = (
+        db.Index('ix_login_attempts_attempt_time', 'attempt_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     ip_address = db.Column(db.String(45), nullable=False)  # Support IPv4 et IPv6
@@ -348,6 +402,22 @@ class LoginAttempt(db.Model):
     def __repr__(self):
         return f'<LoginAttempt {self.ip_address} at {self.attempt_time}>'
 
+class LoginAttemptDaily(db.Model):
+    """Résumé journalier des tentatives de connexion par IP (alimenté par maintenance.py)"""
+    __tablename__ = 'login_attempt_daily'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'ip_address', name='uq_login_attempt_daily_day_ip'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    ip_address = db.Column(db.String(45), nullable=False)
+    success_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<LoginAttemptDaily {self.day} {self.ip_address}>'
+
 class ContactMessage(db.Model):
     """Modèle pour les messages de contact"""
     __tablename__ = 'contact_messages'
@@ -406,50 +476,6 @@ class Promotion(db.Model):
     def __repr__(self):
         return f'<Promotion {self.code}>'
 
-class LoyaltyProgram(db.Model):
-    """Modèle pour le programme de fidélité"""
-    __tablename__ = 'loyalty_programs'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
-    points = db.Column(db.Integer, default=0)
-    total_points_earned = db.Column(db.Integer, default=0)
-    level = db.Column(db.String(20), default='Bronze')  # Bronze, Silver, Gold, Platinum
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # Relations
-    user = db.relationship('User', backref=db.backref('loyalty', uselist=False))
-    
-    def add_points(self, points, reason):
-        """Ajouter des points"""
-        self.points += points
-        self.total_points_earned += points
-        self.update_level()
-        self.updated_at = datetime.utcnow()
-    
-    def redeem_points(self, points, reason):
-        """Utiliser des points"""
-        if self.points >= points:
-            self.points -= points
-            self.updated_at = datetime.utcnow()
-            return True
-        return False
-    
-    def update_level(self):
-        """Mettre à jour le niveau en fonction des points totaux"""
-        if self.total_points_earned >= 10000:
-            self.level = 'Platinum'
-        elif self.total_points_earned >= 5000:
-            self.level = 'Gold'
-        elif self.total_points_earned >= 2000:
-            self.level = 'Silver'
-        else:
-            self.level = 'Bronze'
-    
-    def __repr__(self):
-        return f'<LoyaltyProgram User {self.user_id}: {self.points} pts>'
-
 class ProductComparison(db.Model):
     """Modèle pour le comparateur de produits"""
     __tablename__ = 'product_comparisons'
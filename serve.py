@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+LANCEUR PRODUCTION - QUARTIER D'ARÔMES
+Démarre le site client et/ou l'administration avec gunicorn (multi-processus,
+multi-threads, application préchargée), à la place du serveur de développement.
+
+Usage:
+    python serve.py                       # Client (5000) + admin (5001)
+    python serve.py client                # Client uniquement
+    python serve.py client --workers 8 --threads 4
+    python serve.py all --host 0.0.0.0    # Écouter sur toutes les interfaces
+
+Réglages détaillés: gunicorn.conf.py. Arrêt: Ctrl+C (arrêt propre des workers).
+
+@version 1.0
+@date 2026-10-19
+"""
+
+import os
+import sys
+import signal
+import argparse
+import subprocess
+
+PORTS = {'client': 5000, 'admin': 5001}
+
+
+def start_server(role, args):
+    """Lancer le serveur gunicorn d'un rôle dans son propre processus"""
+    env = dict(os.environ, APP_ROLE=role, BIND=f"{args.host}:{PORTS[role]}")
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    if args.threads:
+        env['WEB_THREADS'] = str(args.threads)
+
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(basedir, 'gunicorn.conf.py')]
+    print(f"   🚀 {role.upper():<7} http://{args.host}:{PORTS[role]}")
+    return subprocess.Popen(command, cwd=basedir, env=env)
+
+
+def main():
+    """Point d'entrée principal"""
+
+    parser = argparse.ArgumentParser(
+        description='Serveur de production Quartier d\'Arômes (gunicorn)'
+    )
+    parser.add_argument('role', nargs='?', choices=['client', 'admin', 'all'], default='all',
+                        help='Application à servir (défaut: all)')
+    parser.add_argument('--host', default='127.0.0.1', help='Adresse d\'écoute (défaut: 127.0.0.1)')
+    parser.add_argument('--workers', type=int, help='Workers par application (défaut: gunicorn.conf.py)')
+    parser.add_argument('--threads', type=int, help='Threads par worker (défaut: gunicorn.conf.py)')
+
+    args = parser.parse_args()
+
+    if os.name == 'nt':
+        print("❌ gunicorn ne fonctionne pas sous Windows: utilisez start_apps.bat (développement)")
+        sys.exit(1)
+
+    print("🌐 SERVEUR DE PRODUCTION - QUARTIER D'ARÔMES")
+    print("=" * 60)
+    roles = ['client', 'admin'] if args.role == 'all' else [args.role]
+    servers = [start_server(role, args) for role in roles]
+    print("=" * 60)
+
+    # Transmettre l'arrêt aux serveurs (gunicorn termine proprement ses workers sur SIGTERM)
+    def stop(signum, frame):
+        for server in servers:
+            if server.poll() is None:
+                server.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    exit_code = 0
+    for server in servers:
+        exit_code = server.wait() or exit_code
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
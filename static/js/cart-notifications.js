@@ -385,9 +385,11 @@ function interceptAddToCart() {
             
             const action = form.dataset.action || (form.action.includes('wishlist') ? 'wishlist' : 'cart');
             
-            // Envoyer le formulaire via AJAX
+            // Envoyer le formulaire via AJAX (ajout au panier: variante JSON, sans redirection)
             const formData = new FormData(form);
-            const url = form.action;
+            const url = action === 'cart' && form.action.includes('/add_to_cart/')
+                ? form.action.replace('/add_to_cart/', '/api/cart/add/')
+                : form.action;
             
             try {
                 const response = await fetch(url, {
@@ -450,9 +452,12 @@ function interceptAddToCart() {
                         image: productImage
                     }, action === 'wishlist' ? 'wishlist' : 'added');
                     
-                    // Mettre à jour le badge du panier
+                    // Mettre à jour le badge du panier avec les totaux renvoyés par l'API
                     if (action === 'cart') {
-                        updateCartCount();
+                        const data = response.headers.get('Content-Type')?.includes('application/json')
+                            ? await response.json()
+                            : null;
+                        updateCartCount(data?.count);
                     }
                 } else {
                     // Autre erreur
@@ -489,20 +494,15 @@ function interceptAddToCart() {
 }
 
 // ============ METTRE À JOUR LE COMPTEUR DU PANIER ============
-async function updateCartCount() {
-    try {
-        const response = await fetch('/api/cart/count');
-        const data = await response.json();
-        
-        const badge = document.querySelector('.cart-badge');
-        if (badge && data.count !== undefined) {
-            badge.textContent = data.count;
-            badge.classList.add('badge-pulse');
-            setTimeout(() => badge.classList.remove('badge-pulse'), 300);
-        }
-    } catch (error) {
-        console.log('Erreur lors de la mise à jour du compteur');
-    }
+function updateCartCount(count) {
+    if (count === undefined || count === null) return;
+    
+    document.querySelectorAll('[data-cart-count], .cart-badge').forEach(badge => {
+        badge.textContent = count;
+        badge.classList.toggle('d-none', count === 0);
+        badge.classList.add('badge-pulse');
+        setTimeout(() => badge.classList.remove('badge-pulse'), 300);
+    });
 }
 
 // ============ STYLES CSS ============
@@ -0,0 +1,200 @@
+"""
+Fixtures communes des tests - Quartier d'Arômes
+
+Les tests tournent sur une base temporaire (DATABASE_URL est fixée avant l'import
+de l'application): la base du site (database/quartier.db) n'est jamais ouverte.
+Lancer depuis la racine du projet:
+
+    python -m pytest                  # SQLite temporaire
+    python -m pytest --db=postgres    # Mêmes tests sur PostgreSQL
+
+PostgreSQL: une base temporaire est créée sur le serveur TEST_POSTGRES_URL (ex:
+postgresql://postgres@localhost/postgres), sinon dans un cluster démarré avec
+initdb / pg_ctl s'ils sont dans le PATH (hors root). Le moteur de lecture pointe
+sur la même base, en transactions lecture seule.
+"""
+
+import os
+import sys
+import uuid
+import shutil
+import socket
+import tempfile
+import itertools
+import subprocess
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='quartier-tests-')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+unique_ids = itertools.count(1)
+
+
+def pytest_addoption(parser):
+    parser.addoption('--db', choices=('sqlite', 'postgres'), default=os.environ.get('TEST_DB', 'sqlite'),
+                     help='Moteur de la base de test (défaut: sqlite, ou TEST_DB)')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_postgres_cluster(config):
+    """Cluster PostgreSQL temporaire (initdb / pg_ctl), arrêté en fin de session"""
+    if not (shutil.which('initdb') and shutil.which('pg_ctl')):
+        raise pytest.UsageError('--db=postgres: définissez TEST_POSTGRES_URL ou mettez initdb / pg_ctl dans le PATH')
+    if hasattr(os, 'geteuid') and os.geteuid() == 0:
+        raise pytest.UsageError('--db=postgres: initdb refuse de tourner en root, définissez TEST_POSTGRES_URL')
+
+    data_dir = os.path.join(TEST_DIR, 'postgres')
+    port = free_port()
+    try:
+        subprocess.run(['initdb', '-D', data_dir, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'],
+                       check=True, capture_output=True)
+        subprocess.run(['pg_ctl', '-D', data_dir, '-l', os.path.join(TEST_DIR, 'postgres.log'), '-w',
+                        '-o', f"-p {port} -k {TEST_DIR} -c listen_addresses=''", 'start'],
+                       check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        raise pytest.UsageError(f"Démarrage de PostgreSQL impossible: {e.stderr.decode(errors='replace')}")
+
+    config.add_cleanup(lambda: subprocess.run(['pg_ctl', '-D', data_dir, '-m', 'fast', '-w', 'stop'],
+                                              capture_output=True))
+    return f'postgresql://postgres@/postgres?host={TEST_DIR}&port={port}'
+
+
+def create_postgres_database(config):
+    """Base vide sur le serveur de test, supprimée en fin de session: son URL"""
+    import psycopg2
+    from sqlalchemy.engine import make_url
+
+    server_url = os.environ.get('TEST_POSTGRES_URL') or start_postgres_cluster(config)
+    name = f'quartier_test_{uuid.uuid4().hex[:12]}'
+
+    def execute(statement):
+        connection = psycopg2.connect(server_url.replace('postgresql+psycopg2://', 'postgresql://'))
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+        finally:
+            connection.close()
+
+    execute(f"CREATE DATABASE {name} ENCODING 'UTF8' TEMPLATE template0")
+    config.add_cleanup(lambda: execute(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)'))
+    return make_url(server_url).set(database=name).render_as_string(hide_password=False)
+
+
+def pytest_configure(config):
+    """Choisir la base avant que les modules de test importent l'application"""
+    config.add_cleanup(lambda: shutil.rmtree(TEST_DIR, ignore_errors=True))
+    if config.getoption('--db') == 'postgres':
+        database_url = create_postgres_database(config)
+        os.environ['DATABASE_URL'] = database_url
+        os.environ['DATABASE_READER_URL'] = database_url
+    else:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEST_DIR, 'quartier.db')
+        os.environ.pop('DATABASE_READER_URL', None)
+    os.environ['CACHE_DIR'] = os.path.join(TEST_DIR, 'cache')
+    os.environ.pop('CACHE_TYPE', None)
+    os.environ.pop('CACHE_REDIS_URL', None)
+
+
+def pytest_report_header(config):
+    return f"base de test: {config.getoption('--db')}"
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Application configurée pour les tests, schéma créé dans la base temporaire"""
+    from app import app as flask_app, db
+    flask_app.config.update(
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        SITEMAP_FOLDER=os.path.join(TEST_DIR, 'sitemap'),
+        UPLOAD_FOLDER=os.path.join(TEST_DIR, 'uploads'),
+        IMAGE_CACHE_FOLDER=os.path.join(TEST_DIR, 'images')
+    )
+    for folder in ('SITEMAP_FOLDER', 'UPLOAD_FOLDER', 'IMAGE_CACHE_FOLDER'):
+        os.makedirs(flask_app.config[folder], exist_ok=True)
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def dialect(app):
+    """Nom du moteur de la base de test ('sqlite' ou 'postgresql')"""
+    from app import db
+    with app.app_context():
+        return db.engine.dialect.name
+
+
+@pytest.fixture
+def other_process_cache(app):
+    """Stockage du cache d'un autre processus (autre worker ou application admin), même configuration"""
+    from flask import Flask
+    from flask_caching import Cache
+    other = Flask('other')
+    other.config.update({key: value for key, value in app.config.items() if key.startswith('CACHE_')})
+    with other.app_context():
+        return Cache(other).cache
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def make_user(app):
+    """Créer un utilisateur (identifiant renvoyé: les objets ne survivent pas au contexte)"""
+    from app import db
+    from models import User
+
+    def make(**fields):
+        suffix = next(unique_ids)
+        with app.app_context():
+            user = User(username=f'test{suffix}', email=f'test{suffix}@example.com', password='!', **fields)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make
+
+
+@pytest.fixture
+def make_product(app):
+    """Créer un produit (identifiant renvoyé)"""
+    from app import db
+    from models import Product
+
+    def make(**fields):
+        suffix = next(unique_ids)
+        fields.setdefault('name', f'Parfum test {suffix}')
+        fields.setdefault('price', 100.0)
+        fields.setdefault('stock', 10)
+        with app.app_context():
+            product = Product(**fields)
+            db.session.add(product)
+            db.session.commit()
+            return product.id
+    return make
+
+
+@pytest.fixture
+def login(app):
+    """Client de test connecté en tant qu'utilisateur donné"""
+    def log_in(user_id):
+        client = app.test_client()
+        with client.session_transaction() as flask_session:
+            flask_session['_user_id'] = str(user_id)
+            flask_session['_fresh'] = True
+        return client
+    return log_in
@@ -0,0 +1,90 @@
+"""Blog: le cache des listes suit la base, pas la mémoire du processus qui a modifié"""
+
+import itertools
+
+import pytest
+
+from app import db, flush_blog_views, record_blog_view, render_blog_content
+from models import BlogPost
+
+slugs = itertools.count(1)
+
+
+@pytest.fixture
+def make_post(app):
+    """Article publié, écrit directement en base (comme depuis le processus admin)"""
+    def make(**fields):
+        n = next(slugs)
+        fields.setdefault('title', f'Article {n}')
+        fields.setdefault('content', '<p>Contenu</p>')
+        fields.setdefault('is_published', True)
+        with app.app_context():
+            post = BlogPost(slug=f'article-{n}', **fields)
+            db.session.add(post)
+            db.session.commit()
+            return post.id
+    return make
+
+
+def test_edit_from_another_process_invalidates_list(app, make_post):
+    post_id = make_post(title='Titre avant')
+    client = app.test_client()
+    assert 'Titre avant' in client.get('/blog').get_data(as_text=True)
+
+    with app.app_context():
+        db.session.get(BlogPost, post_id).title = 'Titre après'
+        db.session.commit()
+
+    page = client.get('/blog').get_data(as_text=True)
+    assert 'Titre après' in page
+    assert 'Titre avant' not in page
+
+
+def test_publish_from_another_process_invalidates_list(app, make_post):
+    client = app.test_client()
+    client.get('/blog')
+
+    make_post(title='Nouvel article publié')
+
+    assert 'Nouvel article publié' in client.get('/blog').get_data(as_text=True)
+
+
+def test_views_do_not_touch_updated_at(app, make_post):
+    post_id = make_post()
+    with app.app_context():
+        updated_at = db.session.get(BlogPost, post_id).updated_at
+
+    record_blog_view(post_id)
+    flush_blog_views()
+
+    with app.app_context():
+        post = db.session.get(BlogPost, post_id)
+        assert post.views == 1
+        assert post.updated_at == updated_at
+
+
+@pytest.mark.parametrize('url', [
+    'javascript:alert(1)',
+    ' JaVaScRiPt:alert(1)',
+    'java&#9;script:alert(1)',
+    'java&#10;script:alert(1)',
+    'java\nscript:alert(1)',
+    'java&#13;script:alert(1)',
+    '&#0;javascript:alert(1)',
+    '&#1;javascript:alert(1)',
+    '&#x6A;avascript&colon;alert(1)',
+    'vbscript:msgbox(1)',
+    'data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==',
+])
+def test_script_urls_are_dropped(url):
+    assert render_blog_content(f'<a href="{url}">lien</a>') == '<a>lien</a>'
+    assert 'src' not in render_blog_content(f'<img src="{url}">')
+
+
+@pytest.mark.parametrize('url', ['https://example.com/a?b=c#d', '/blog/article-1', 'article-2', 'mailto:contact@example.com'])
+def test_safe_urls_are_kept(url):
+    assert render_blog_content(f'<a href="{url}">lien</a>') == f'<a href="{url}">lien</a>'
+
+
+def test_obfuscated_style_url_is_dropped():
+    assert render_blog_content('<p style="background: u&#9;rl(javascript:alert(1))">x</p>') == '<p>x</p>'
@@ -0,0 +1,68 @@
+"""Cache partagé: une invalidation faite par un processus est vue par les autres"""
+
+import time
+
+from app import (db, bump_cart_version, cart_version, find_promo_code, login_limiter,
+                 SlidingWindowLimiter, check_login_attempts, load_user)
+from models import Coupon, User
+
+
+def test_cart_version_is_shared(app, make_user, other_process_cache):
+    user_id = make_user()
+    bump_cart_version(user_id)
+
+    assert other_process_cache.get(f'cart_version_{user_id}') == cart_version(user_id)
+
+
+def test_promo_change_in_another_process_reloads_index(app, other_process_cache):
+    with app.app_context():
+        coupon = Coupon(code='PARTAGE10', discount_type='percentage', discount_value=10)
+        db.session.add(coupon)
+        db.session.commit()
+        assert find_promo_code('partage10').is_valid()
+
+        # L'administration désactive le code (invalidate_promo_index de son processus)
+        coupon.is_active = False
+        db.session.commit()
+        other_process_cache.set('promo_index_version', time.time_ns(), timeout=0)
+
+        assert not find_promo_code('partage10').is_valid()
+
+
+def test_login_failures_are_counted_across_processes(app, other_process_cache):
+    window = app.config['LOGIN_LOCKOUT_MINUTES'] * 60
+    other_limiter = SlidingWindowLimiter(other_process_cache, buckets=app.config['LOGIN_WINDOW_BUCKETS'])
+    key = ('ip', '203.0.113.7')
+
+    # Les requêtes d'un même client réparties entre deux workers
+    for attempt in range(app.config['LOGIN_MAX_ATTEMPTS_IP']):
+        limiter = login_limiter if attempt % 2 else other_limiter
+        assert limiter.hit(key, window) == attempt + 1
+    assert other_limiter.count(key, window) == login_limiter.count(key, window) == app.config['LOGIN_MAX_ATTEMPTS_IP']
+
+    with app.app_context():
+        allowed, _ = check_login_attempts('203.0.113.7')
+    assert not allowed
+
+    other_limiter.reset(key, window)
+    assert login_limiter.count(key, window) == 0
+
+
+def test_user_change_in_another_process_invalidates_user_cache(app, make_user, other_process_cache):
+    user_id = make_user(is_admin=True)
+
+    def loaded_is_admin():
+        with app.test_request_context():
+            return load_user(str(user_id)).is_admin
+
+    assert loaded_is_admin()
+
+    # L'administration retire les droits: modification en base, copie en cache inchangée
+    with app.app_context():
+        db.session.get(User, user_id).is_admin = False
+        db.session.commit()
+    assert loaded_is_admin()
+
+    # ... jusqu'à l'invalidation faite par l'autre processus
+    other_process_cache.set(f'user_version_{user_id}', time.time_ns(), timeout=0)
+    assert not loaded_is_admin()
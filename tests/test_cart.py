@@ -0,0 +1,34 @@
+"""Page panier: le montant affiché vient du même moteur que la commande (price_cart)"""
+
+import re
+
+from app import db, price_cart
+from models import CartItem
+
+
+def displayed_subtotal(response):
+    return re.search(r'id="cartSubtotal">([^<]*) DH', response.get_data(as_text=True)).group(1)
+
+
+def test_cart_page_uses_cart_quote(app, make_user, make_product, login):
+    user_id = make_user()
+    product_id = make_product(price=0.1)
+    with app.app_context():
+        db.session.add(CartItem(user_id=user_id, product_id=product_id, quantity=3))
+        db.session.commit()
+        quote = price_cart(user_id)
+
+    response = login(user_id).get('/cart')
+    assert response.status_code == 200
+    assert displayed_subtotal(response) == str(quote['subtotal']) == '0.3'
+
+
+def test_session_cart_page_uses_cart_totals(app, make_product):
+    product_id = make_product(price=0.1)
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['cart'] = {str(product_id): 3}
+
+    response = client.get('/cart')
+    assert response.status_code == 200
+    assert displayed_subtotal(response) == '0.3'
@@ -0,0 +1,66 @@
+"""Compatibilité SQLite / PostgreSQL: recherche, tris, upsert et pages du catalogue sur les deux moteurs"""
+
+import pytest
+from sqlalchemy import func, text
+
+from app import db, search_backend, product_search_filter, order_nulls_last, upsert_cart_items
+from models import PRODUCT_SEARCH_INDEXES, Product, Review, CartItem
+
+
+def test_search_indexes(app, dialect):
+    if dialect != 'postgresql':
+        pytest.skip('Index GIN: PostgreSQL uniquement (SQLite: migrate_search_fts.py)')
+    with app.app_context():
+        indexes = dict(db.session.execute(text(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'products'"
+        )).all())
+    for columns in PRODUCT_SEARCH_INDEXES:
+        assert 'USING gin' in indexes['ix_products_search_' + '_'.join(columns)]
+
+
+def test_product_search(app, make_product):
+    product_id = make_product(name='Zéphyr Sauvageon', brand='Maison Test', description='Boisé épicé')
+    make_product(name='Aventus Test', brand='Creed')
+
+    with app.app_context():
+        def search(query):
+            return [product.id for product in Product.query.filter(product_search_filter(query))]
+
+        assert search('sauvageon') == [product_id]
+        if search_backend() != 'like':
+            # Plein texte: chaque mot commence un mot du produit, toutes colonnes
+            assert search('sauvag mais') == [product_id]
+
+
+def test_order_nulls_last(app, make_user, make_product):
+    user_id = make_user()
+    good, best, unrated = make_product(), make_product(), make_product()
+    with app.app_context():
+        db.session.add_all([
+            Review(product_id=good, user_id=user_id, rating=4),
+            Review(product_id=best, user_id=user_id, rating=5),
+        ])
+        db.session.commit()
+
+        ranked = db.session.query(Product.id).outerjoin(Review).filter(
+            Product.id.in_([good, best, unrated])
+        ).group_by(Product.id).order_by(*order_nulls_last(func.avg(Review.rating))).all()
+    assert [row.id for row in ranked] == [best, good, unrated]
+
+
+def test_upsert_cart_items_adds_quantities(app, make_user, make_product):
+    user_id, product_id = make_user(), make_product()
+    with app.app_context():
+        upsert_cart_items([{'user_id': user_id, 'product_id': product_id, 'quantity': 1}])
+        upsert_cart_items([{'user_id': user_id, 'product_id': product_id, 'quantity': 2}])
+        db.session.commit()
+        assert CartItem.query.filter_by(user_id=user_id).one().quantity == 3
+
+
+def test_catalog_pages(app, make_product):
+    product_id = make_product(name='Oud Catalogue')
+    client = app.test_client()
+    for path in ['/', '/collections?sort=rating', '/collections?search=oud', '/api/search?q=oud',
+                 '/sitemap.xml', f'/product/{product_id}']:
+        response = client.get(path)
+        assert response.status_code == 200, path
@@ -0,0 +1,53 @@
+"""Réponses conditionnelles (304): ETag propre au visiteur, jeton CSRF jamais périmé"""
+
+import app as app_module
+
+
+def test_product_page_revalidates(app, make_product):
+    product_id = make_product()
+    client = app.test_client()
+
+    first = client.get(f'/product/{product_id}')
+    assert first.status_code == 200
+    etag = first.headers['ETag'].strip('"')
+    # Le jeton CSRF est créé au premier rendu: la page suivante a l'ETag stable
+    second = client.get(f'/product/{product_id}', headers={'If-None-Match': f'"{etag}"'})
+    etag = second.headers['ETag'].strip('"')
+
+    assert client.get(f'/product/{product_id}', headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+
+
+def test_cached_page_expires_before_csrf_token(app, make_product, monkeypatch):
+    product_id = make_product()
+    client = app.test_client()
+    client.get(f'/product/{product_id}')
+    now = app_module.time.time()
+    etag = client.get(f'/product/{product_id}').headers['ETag']
+
+    # Moitié de WTF_CSRF_TIME_LIMIT plus tard: nouvelle page, nouveau jeton de formulaire
+    later = now + app.config.get('WTF_CSRF_TIME_LIMIT', 3600) // 2
+    monkeypatch.setattr(app_module.time, 'time', lambda: later)
+    response = client.get(f'/product/{product_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_if_modified_since_ignored_on_private_pages(app, make_product):
+    product_id = make_product()
+    client = app.test_client()
+    response = client.get(f'/product/{product_id}')
+    assert response.headers.get('Last-Modified')
+
+    response = client.get(f'/product/{product_id}', headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert response.status_code == 200
+
+
+def test_if_modified_since_on_public_api(app, make_product):
+    make_product(name='Oud Royal')
+    client = app.test_client()
+    response = client.get('/api/search?q=oud')
+    assert response.status_code == 200
+    assert response.cache_control.public
+
+    response = client.get('/api/search?q=oud', headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert response.status_code == 304
@@ -0,0 +1,72 @@
+"""Codes promo: un code limité utilisé par des commandes simultanées n'est jamais sur-utilisé"""
+
+import threading
+
+from app import db, redeem_promo_code, find_promo_code, invalidate_promo_index
+from models import Coupon
+
+THREADS = 8
+ATTEMPTS = 10
+MAX_USES = 25
+
+
+def test_concurrent_redemptions_never_exceed_max_uses(app):
+    with app.app_context():
+        coupon = Coupon(code='LIMITE25', discount_type='fixed', discount_value=1, max_uses=MAX_USES)
+        db.session.add(coupon)
+        db.session.commit()
+        coupon_id = coupon.id
+
+    results = {'redeemed': 0, 'refused': 0, 'errors': []}
+    results_lock = threading.Lock()
+    start_barrier = threading.Barrier(THREADS)
+
+    def worker():
+        start_barrier.wait()
+        for _ in range(ATTEMPTS):
+            with app.app_context():
+                try:
+                    redeemed = redeem_promo_code('coupon', coupon_id)
+                    db.session.commit()
+                    outcome = 'redeemed' if redeemed else 'refused'
+                except Exception as e:
+                    db.session.rollback()
+                    with results_lock:
+                        results['errors'].append(e)
+                    continue
+            with results_lock:
+                results[outcome] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        used_count = db.session.get(Coupon, coupon_id).used_count
+
+    assert results['errors'] == []
+    assert results['redeemed'] == used_count == MAX_USES
+    assert results['refused'] == THREADS * ATTEMPTS - MAX_USES
+
+
+def test_rolled_back_redemption_keeps_code_valid(app):
+    with app.app_context():
+        coupon = Coupon(code='UNIQUE1', discount_type='fixed', discount_value=1, max_uses=1)
+        db.session.add(coupon)
+        db.session.commit()
+        coupon_id = coupon.id
+        invalidate_promo_index()  # Comme après une création depuis l'admin
+        assert find_promo_code('UNIQUE1').is_valid()
+
+        # Commande annulée après la consommation du code (ex: erreur avant le commit)
+        assert redeem_promo_code('coupon', coupon_id)
+        db.session.rollback()
+        assert find_promo_code('UNIQUE1').is_valid()
+
+        # Commande validée: l'index est rechargé après le commit
+        assert redeem_promo_code('coupon', coupon_id)
+        db.session.commit()
+        invalidate_promo_index()
+        assert not find_promo_code('UNIQUE1').is_valid()
@@ -0,0 +1,71 @@
+"""Images redimensionnées: le cache disque n'est parcouru qu'au besoin, aucun verrou ni fichier temporaire oublié"""
+
+import os
+import shutil
+
+import pytest
+from PIL import Image
+
+import app as app_module
+from app import resize_locks, image_cache_usage
+
+
+@pytest.fixture
+def image_cache(app):
+    """Cache d'images vide, taille pas encore comptée"""
+    folder = app.config['IMAGE_CACHE_FOLDER']
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    image_cache_usage.update({'bytes': None, 'scanned_at': 0})
+    yield folder
+    image_cache_usage.update({'bytes': None, 'scanned_at': 0})
+
+
+@pytest.fixture
+def upload(app):
+    def save(name, content=None):
+        path = os.path.join(app.config['UPLOAD_FOLDER'], name)
+        if content is None:
+            Image.new('RGB', (800, 600), (180, 120, 60)).save(path, format='JPEG')
+        else:
+            with open(path, 'wb') as f:
+                f.write(content)
+        return name
+    return save
+
+
+def cached_files(folder):
+    return [name for _root, _dirs, files in os.walk(folder) for name in files]
+
+
+def test_disk_is_scanned_only_when_needed(app, image_cache, upload, monkeypatch):
+    scans = []
+    evict = app_module.evict_image_cache
+
+    def counting_evict():
+        scans.append(1)
+        return evict()
+    monkeypatch.setattr(app_module, 'evict_image_cache', counting_evict)
+    client = app.test_client()
+    names = [upload(f'scan{index}.jpg') for index in range(3)]
+
+    for name in names:
+        assert client.get(f'/img/{name}?w=160&fmt=jpeg').status_code == 200
+    assert len(scans) == 1  # Premier comptage seulement, ensuite taille suivie en mémoire
+
+    # Quota dépassé: l'éviction parcourt le disque et redescend sous le quota
+    monkeypatch.setitem(app.config, 'IMAGE_CACHE_MAX_BYTES', image_cache_usage['bytes'] + 1)
+    assert client.get(f'/img/{names[0]}?w=320&fmt=jpeg').status_code == 200
+    assert len(scans) == 2
+    on_disk = sum(os.path.getsize(os.path.join(root, name))
+                  for root, _dirs, files in os.walk(image_cache) for name in files)
+    assert on_disk == image_cache_usage['bytes'] <= app.config['IMAGE_CACHE_MAX_BYTES']
+
+
+def test_broken_source_releases_lock_and_temp_file(app, image_cache, upload):
+    name = upload('broken.jpg', b'pas une image')
+
+    response = app.test_client().get(f'/img/{name}?w=160&fmt=jpeg')
+    assert response.status_code == 404
+    assert resize_locks == {}
+    assert cached_files(image_cache) == []
@@ -0,0 +1,101 @@
+"""Fidélité: le coût déduit est celui vérifié, le solde ne devient jamais négatif"""
+
+import threading
+
+import pytest
+
+from app import db, record_loyalty_transaction
+from models import LoyaltyPoints, LoyaltyReward, LoyaltyTransaction
+
+
+@pytest.fixture
+def make_account(app, make_user):
+    """Compte fidélité avec un solde initial inscrit au journal: (user_id, account_id)"""
+    def make(balance):
+        user_id = make_user()
+        with app.app_context():
+            account = LoyaltyPoints(user_id=user_id, points=0, total_earned=0, total_spent=0)
+            db.session.add(account)
+            db.session.flush()
+            record_loyalty_transaction(account.id, balance, 'purchase', 'Solde initial')
+            db.session.commit()
+            return user_id, account.id
+    return make
+
+
+@pytest.fixture
+def reward(app):
+    """Récompense dont les deux colonnes de coût divergent (ancienne donnée)"""
+    with app.app_context():
+        reward = LoyaltyReward(name='Échantillon', points_required=100, points_cost=300, is_active=True)
+        db.session.add(reward)
+        db.session.commit()
+        return reward.id
+
+
+def balance(app, account_id):
+    with app.app_context():
+        return db.session.get(LoyaltyPoints, account_id).points
+
+
+@pytest.mark.parametrize('route, balance_before, balance_after', [
+    ('/rewards/redeem/{}', 200, 100),    # Coût affiché par rewards.html: points_required
+    ('/loyalty/redeem/{}', 400, 100),    # Coût saisi par l'admin: points_cost
+    ('/loyalty/redeem/{}', 200, 200),    # Vérifié sur points_cost: refusé, rien n'est déduit
+])
+def test_redeem_charges_the_checked_cost(app, make_account, login, reward, route, balance_before, balance_after):
+    user_id, account_id = make_account(balance_before)
+    response = login(user_id).post(route.format(reward))
+    assert response.status_code == 302
+    assert balance(app, account_id) == balance_after
+
+    with app.app_context():
+        ledger = db.session.query(db.func.sum(LoyaltyTransaction.points)).filter_by(loyalty_id=account_id).scalar()
+    assert ledger == balance_after
+
+
+def test_concurrent_spending_never_goes_negative(app, make_account):
+    """Dépenses et gains simultanés sur un compte: solde jamais négatif, journal cohérent"""
+    threads_count, attempts, cost, initial = 8, 20, 50, 500
+    _, account_id = make_account(initial)
+    results = {'spent': 0, 'refused': 0, 'earned': 0, 'errors': []}
+    results_lock = threading.Lock()
+    start_barrier = threading.Barrier(threads_count)
+
+    def worker(index):
+        start_barrier.wait()
+        for attempt in range(attempts):
+            # Un thread sur quatre gagne des points pendant que les autres en dépensent
+            earn = index % 4 == 0 and attempt % 2 == 0
+            with app.app_context():
+                try:
+                    transaction = record_loyalty_transaction(
+                        account_id, cost if earn else -cost, 'earn' if earn else 'redeem', 'Test concurrence'
+                    )
+                    db.session.commit()
+                    outcome = 'earned' if earn else ('spent' if transaction else 'refused')
+                except Exception as e:
+                    db.session.rollback()
+                    with results_lock:
+                        results['errors'].append(e)
+                    continue
+            with results_lock:
+                results[outcome] += 1
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results['errors'] == []
+    assert results['refused'] > 0  # Le solde a bien été épuisé pendant le test
+    expected = initial + (results['earned'] - results['spent']) * cost
+    assert balance(app, account_id) == expected >= 0
+
+    with app.app_context():
+        ledger = LoyaltyTransaction.query.filter_by(loyalty_id=account_id)
+        assert db.session.query(db.func.sum(LoyaltyTransaction.points)).filter_by(loyalty_id=account_id).scalar() == expected
+        assert ledger.filter(LoyaltyTransaction.balance_after < 0).count() == 0
+        last = ledger.order_by(LoyaltyTransaction.created_at.desc(), LoyaltyTransaction.id.desc()).first()
+        assert last.balance_after == expected
@@ -0,0 +1,90 @@
+"""Notifications temps réel: rien ne se perd entre processus, nombre de flux borné"""
+
+import time
+import queue
+
+import pytest
+
+from app import db, NotificationBroker, notification_broker
+from models import Notification
+
+
+@pytest.fixture
+def broker(app):
+    """Broker neuf (son thread de suivi interroge la base comme en production)"""
+    broker = NotificationBroker()
+    subscribers = []
+
+    def subscribe():
+        with app.test_request_context():
+            subscriber = broker.subscribe()
+        subscribers.append(subscriber)
+        return subscriber
+    yield subscribe
+    for subscriber in subscribers:
+        broker.unsubscribe(subscriber)
+
+
+def create_in_other_process(app, **fields):
+    """Notification écrite sans passer par create_notification (autre processus)"""
+    fields.setdefault('type', 'order')
+    fields.setdefault('title', 'Nouvelle commande')
+    fields.setdefault('message', 'Commande reçue')
+    with app.app_context():
+        notification = Notification(**fields)
+        db.session.add(notification)
+        db.session.commit()
+        return notification.id
+
+
+def next_event(subscriber, event_name):
+    """Prochain événement d'un type donné (les autres sont ignorés)"""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            event, data = subscriber.get(timeout=deadline - time.monotonic())
+        except queue.Empty:
+            break
+        if event == event_name:
+            return data
+    raise AssertionError(f"Aucun événement {event_name}")
+
+
+def test_notification_before_first_tick_is_delivered(app, broker):
+    subscriber = broker()
+    notification_id = create_in_other_process(app)
+
+    assert next_event(subscriber, 'notification')['id'] == notification_id
+
+
+def test_read_in_other_process_resends_state(app, broker, other_process_cache):
+    notification_id = create_in_other_process(app)
+    subscriber = broker()
+
+    # Un autre worker admin marque la notification comme lue
+    with app.app_context():
+        db.session.get(Notification, notification_id).is_read = True
+        db.session.commit()
+    other_process_cache.set('notifications_read_version', time.time_ns(), timeout=0)
+
+    snapshot = next_event(subscriber, 'snapshot')
+    assert notification_id not in [n['id'] for n in snapshot['notifications']]
+    with app.app_context():
+        assert snapshot['count'] == Notification.query.filter_by(is_read=False).count()
+
+
+def test_streams_are_capped_per_worker(app, make_user, login, monkeypatch):
+    monkeypatch.setitem(app.config, 'NOTIFICATION_MAX_STREAMS', 1)
+    client = login(make_user(is_admin=True))
+
+    first = client.get('/admin/notifications/stream', buffered=False)
+    assert first.status_code == 200
+    refused = client.get('/admin/notifications/stream', buffered=False)
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After']
+
+    first.close()  # Page fermée: le thread et la place sont libérés
+    assert not notification_broker.subscribers
+    again = client.get('/admin/notifications/stream', buffered=False)
+    assert again.status_code == 200
+    again.close()
@@ -0,0 +1,80 @@
+"""Moteur de lecture: les pages du catalogue lisent via le reader, qui ne reçoit jamais d'écriture"""
+
+import threading
+
+import pytest
+from sqlalchemy import event, text
+
+from app import db
+
+THREADS = 8
+ATTEMPTS = 20
+
+
+@pytest.fixture
+def engines(app):
+    with app.app_context():
+        assert 'reader' in db.engines
+        return db.engines['reader'], db.engines[None]
+
+
+@pytest.fixture
+def statements(engines):
+    """Verbes SQL exécutés par moteur: {'reader': {'SELECT': n}, 'writer': {...}}"""
+    counts = {'reader': {}, 'writer': {}}
+    lock = threading.Lock()
+
+    def counter(name):
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            verb = statement.split(None, 1)[0].upper()
+            with lock:
+                counts[name][verb] = counts[name].get(verb, 0) + 1
+        return before_cursor_execute
+
+    listeners = [(engine, counter(name)) for name, engine in zip(('reader', 'writer'), engines)]
+    for engine, listener in listeners:
+        event.listen(engine, 'before_cursor_execute', listener)
+    yield counts
+    for engine, listener in listeners:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+def test_catalog_reads_and_cart_writes(app, make_user, make_product, login, statements):
+    user_id = make_user()
+    product_ids = [make_product() for _ in range(3)]
+    paths = ['/', '/collections', '/api/search?q=produit'] + [f'/product/{product_id}' for product_id in product_ids]
+    errors = []
+    errors_lock = threading.Lock()
+    start_barrier = threading.Barrier(THREADS)
+
+    def worker(index):
+        client = login(user_id)
+        start_barrier.wait()
+        for attempt in range(ATTEMPTS):
+            # Un client sur deux ajoute au panier pendant que les autres parcourent le catalogue
+            if index % 2 == 0:
+                response = client.post(f'/api/cart/add/{product_ids[attempt % len(product_ids)]}', json={'quantity': 1})
+            else:
+                response = client.get(paths[attempt % len(paths)])
+            response.close()
+            if response.status_code >= 400:
+                with errors_lock:
+                    errors.append((response.request.path, response.status_code))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert statements['reader'].get('SELECT')
+    assert set(statements['reader']) == {'SELECT'}
+    assert statements['writer'].get('INSERT') or statements['writer'].get('UPDATE')
+
+
+def test_direct_write_on_reader_is_refused(app, engines):
+    reader_engine, _ = engines
+    with pytest.raises(Exception, match='readonly|read-only'):  # SQLite mode=ro, PostgreSQL READ ONLY
+        with reader_engine.begin() as connection:
+            connection.execute(text('UPDATE users SET username = username'))
@@ -0,0 +1,35 @@
+"""Recherche: l'index plein texte créé serveur démarré est pris en compte sans redémarrage"""
+
+import pytest
+from sqlalchemy import text
+
+from app import db, search_backend, search_backends, product_search_filter
+from models import Product
+
+
+def test_like_backend_is_rechecked(app, dialect, make_product, monkeypatch):
+    if dialect != 'sqlite':
+        pytest.skip('Index FTS5: SQLite uniquement')
+    product_id = make_product(name='Sauvage Elixir')
+    search_backends.clear()
+    try:
+        with app.app_context():
+            assert search_backend() == 'like'
+
+            # migrate_search_fts.py lancé pendant que le serveur tourne
+            db.session.execute(text(
+                "CREATE VIRTUAL TABLE products_fts USING fts5(name, brand, description, "
+                "content='products', content_rowid='id')"
+            ))
+            db.session.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            db.session.commit()
+            assert search_backend() == 'like'  # Vérifié il y a moins de SEARCH_BACKEND_RECHECK
+
+            monkeypatch.setitem(app.config, 'SEARCH_BACKEND_RECHECK', 0)
+            assert search_backend() == 'fts5'
+            assert [product.id for product in Product.query.filter(product_search_filter('sauv eli'))] == [product_id]
+    finally:
+        with app.app_context():
+            db.session.execute(text('DROP TABLE IF EXISTS products_fts'))
+            db.session.commit()
+        search_backends.clear()
@@ -0,0 +1,66 @@
+"""Sitemap: chaque fichier contient exactement les lignes de sa section"""
+
+import os
+import re
+
+from app import db, refresh_sitemap, sitemap_sources, sitemap_shard_signatures
+
+
+def url_count(client, filename):
+    response = client.get(f'/sitemap/{filename}')
+    assert response.status_code == 200
+    return len(re.findall(r'<url>', response.get_data(as_text=True)))
+
+
+def test_every_row_is_listed(app, make_product):
+    for _ in range(5):
+        make_product()
+    client = app.test_client()
+
+    with app.test_request_context():
+        refresh_sitemap(force=True)
+        for section, (query, _) in sitemap_sources().items():
+            shards = sitemap_shard_signatures(query)
+            assert sum(count for count, *_ in shards.values()) == query.count()
+            for shard, (count, _, first_id, last_id) in shards.items():
+                assert url_count(client, f'{section}-{shard + 1}.xml') == count
+
+
+def test_shards_split_at_max_urls(app, make_product):
+    for _ in range(5):
+        make_product()
+    client = app.test_client()
+    app.config['SITEMAP_MAX_URLS'] = 2
+    try:
+        with app.test_request_context():
+            refresh_sitemap(force=True)
+            query = sitemap_sources()['produits'][0]
+            total = query.count()
+            shards = sitemap_shard_signatures(query)
+            assert sorted(shards) == list(range((total + 1) // 2))
+            assert [shards[shard][0] for shard in sorted(shards)] == [2] * (total // 2) + [1] * (total % 2)
+            assert sum(url_count(client, f'produits-{shard + 1}.xml') for shard in shards) == total
+
+            # Rien n'a changé: aucun fichier réécrit
+            assert refresh_sitemap(force=True)['written'] == []
+    finally:
+        app.config['SITEMAP_MAX_URLS'] = 50000
+        with app.test_request_context():
+            refresh_sitemap(force=True)
+
+
+def test_changed_row_rewrites_only_its_shard(app, make_product):
+    from models import Product
+    product_ids = [make_product() for _ in range(4)]
+    app.config['SITEMAP_MAX_URLS'] = 2
+    try:
+        with app.test_request_context():
+            refresh_sitemap(force=True)
+            product = db.session.get(Product, product_ids[-1])
+            product.name = product.name + ' (modifié)'
+            db.session.commit()
+            written = refresh_sitemap(force=True)['written']
+            assert len([filename for filename in written if filename.startswith('produits-')]) == 1
+            assert os.path.exists(os.path.join(app.config['SITEMAP_FOLDER'], 'sitemap.xml'))
+    finally:
+        app.config['SITEMAP_MAX_URLS'] = 50000
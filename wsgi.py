@@ -0,0 +1,71 @@
+"""
+POINT D'ENTRÉE WSGI - Quartier d'Arômes
+Application client ou admin pour un serveur WSGI de production (gunicorn)
+
+create_app() n'est pas une fabrique: les routes sont déclarées sur l'unique
+application de app.py, que create_app() configure une fois pour un rôle (client:
+routes /admin désactivées, admin: seules les routes d'administration). Un processus
+ne sert donc qu'un rôle, et chaque rôle tourne dans son propre serveur (ses propres
+processus). Voir gunicorn.conf.py, serve.py et le README.
+
+Usage:
+    gunicorn -c gunicorn.conf.py                  # Site client (port 5000)
+    APP_ROLE=admin gunicorn -c gunicorn.conf.py   # Administration (port 5001)
+"""
+
+import os
+
+ROLES = ('client', 'admin')
+
+configured_role = None
+
+
+def create_app(role=None):
+    """
+    Construire l'application d'un rôle ('client' ou 'admin', défaut: APP_ROLE)
+
+    Un seul rôle par processus: l'application admin ajoute un before_request
+    qui redirige toutes les routes publiques.
+    """
+    global configured_role
+    role = role or os.environ.get('APP_ROLE', 'client')
+    if role not in ROLES:
+        raise ValueError(f"Rôle inconnu: {role} (attendu: {', '.join(ROLES)})")
+    if configured_role not in (None, role):
+        raise RuntimeError(f"Ce processus sert déjà l'application {configured_role}")
+
+    if configured_role is None:
+        if role == 'admin':
+            import app_admin  # Enregistre check_admin_access (before_request)
+        else:
+            from app_client import disable_admin_routes
+            disable_admin_routes()
+        configured_role = role
+
+    from app import app
+    return app
+
+
+def reset_after_fork():
+    """
+    Dans chaque worker, juste après le fork: ne pas réutiliser les connexions du
+    processus maître (préchargement de l'application) ni ses threads de fond
+    """
+    from app import app, db, login_audit_state, blog_views_state, notification_broker
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: les connexions héritées restent au maître, le worker ouvre les siennes
+            engine.dispose(close=False)
+
+    # Les threads ne survivent pas au fork: ils seront relancés à la première utilisation
+    login_audit_state['thread'] = None
+    blog_views_state['thread'] = None
+    notification_broker.tail_thread = None
+
+
+def flush_pending_writes():
+    """Écrire les tentatives de connexion et vues d'articles en attente (arrêt d'un worker)"""
+    from app import flush_login_attempts, flush_blog_views
+    flush_login_attempts()
+    flush_blog_views()